@@ -0,0 +1,147 @@
+# --- ANALITIK PERFORMA LIVE ---
+# Statistik trading per instrumen yang diperbarui inkremental (O(1) per bar dan per trade): equity curve
+# (compounding PnL%, mark-to-market saat posisi terbuka), peak + drawdown berjalan, win rate, profit factor,
+# rata-rata holding time, exposure, dan statistik per alasan exit (Emergency SL / Trailing Stop).
+# Hanya agregat + sampel N trade terakhir yang disimpan, jadi memori tetap walau proses berjalan lama.
+# Semua instrumen yang hidup terdaftar di registry modul -> snapshot_all() bisa dipanggil kapan saja
+# (mis. dari endpoint /analytics exporter metrics) tanpa membaca ulang trading_log.txt.
+import threading
+import weakref
+from collections import deque
+
+DEFAULT_RECENT_TRADES = 50
+
+_registry = weakref.WeakValueDictionary() # label -> TradeAnalytics (hilang otomatis saat runner dibuang)
+_registry_lock = threading.Lock()
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+def _seconds(start, end):
+    return max(0.0, (end - start).total_seconds()) if start is not None and end is not None else 0.0
+
+
+class TradeAnalytics:
+    def __init__(self, label="", recent_trades=DEFAULT_RECENT_TRADES):
+        self.label = label
+        self._lock = threading.Lock() # Ditulis thread runner, dibaca thread exporter
+        self.trades = 0; self.wins = 0
+        self.gross_profit = 0.0; self.gross_loss = 0.0 # Jumlah PnL% trade untung / |rugi|
+        self.realized_equity = 1.0 # Equity relatif (1.0 = awal), compounding PnL% tiap trade
+        self.equity = 1.0; self.peak_equity = 1.0; self.max_drawdown = 0.0
+        self.holding_seconds = 0.0
+        self.by_reason = {} # alasan exit -> [trades, wins, total PnL%, PnL% terbaik, PnL% terburuk]
+        self.recent = deque(maxlen=recent_trades)
+        self.bars = 0; self.bars_in_position = 0
+        self.first_bar_time = None; self.last_bar_time = None
+        self.entry_time = None; self.entry_price = None # Posisi terbuka
+
+    def _mark(self, equity):
+        self.equity = equity
+        if equity > self.peak_equity: self.peak_equity = equity
+        drawdown = 1.0 - equity / self.peak_equity
+        if drawdown > self.max_drawdown: self.max_drawdown = drawdown
+
+    def on_entry(self, bar_time, price):
+        with self._lock:
+            self.entry_time, self.entry_price = bar_time, price
+
+    def on_bar(self, bar_time, close, state):
+        """Satu bar diproses: exposure + equity mark-to-market. Posisi terbuka tanpa entry tercatat (state
+        dipulihkan dari checkpoint) dianggap mulai di bar ini."""
+        with self._lock:
+            if self.first_bar_time is None: self.first_bar_time = bar_time
+            self.last_bar_time = bar_time
+            self.bars += 1
+            if state["position_size"] > 0 and state["entry_price_custom"]:
+                if self.entry_price is None: self.entry_time, self.entry_price = bar_time, state["entry_price_custom"]
+                self.bars_in_position += 1
+                self._mark(self.realized_equity * close / self.entry_price)
+            else:
+                self._mark(self.realized_equity)
+
+    def on_exit(self, bar_time, entry_price, exit_price, reason, pnl_percent):
+        with self._lock:
+            entry_time = self.entry_time if self.entry_price is not None else bar_time
+            holding = _seconds(entry_time, bar_time)
+            self.trades += 1
+            self.holding_seconds += holding
+            if pnl_percent > 0: self.wins += 1; self.gross_profit += pnl_percent
+            else: self.gross_loss -= pnl_percent
+            stats = self.by_reason.get(reason)
+            if stats is None: stats = self.by_reason[reason] = [0, 0, 0.0, pnl_percent, pnl_percent]
+            stats[0] += 1; stats[1] += pnl_percent > 0; stats[2] += pnl_percent
+            stats[3] = max(stats[3], pnl_percent); stats[4] = min(stats[4], pnl_percent)
+            self.realized_equity *= 1.0 + pnl_percent / 100.0
+            self._mark(self.realized_equity)
+            self.recent.append({"entry_time": entry_time, "exit_time": bar_time, "entry_price": entry_price,
+                                "exit_price": exit_price, "reason": reason, "pnl_percent": pnl_percent,
+                                "holding_hours": holding / 3600.0})
+            self.entry_time = self.entry_price = None
+
+    def snapshot(self):
+        """Ringkasan saat ini (dict siap JSON kecuali datetime)."""
+        with self._lock:
+            span = _seconds(self.first_bar_time, self.last_bar_time)
+            open_position = None
+            if self.entry_price is not None:
+                open_position = {"entry_time": self.entry_time, "entry_price": self.entry_price,
+                                 "unrealized_percent": (self.equity / self.realized_equity - 1.0) * 100.0}
+            return {
+                "trades": self.trades, "wins": self.wins, "win_rate": _ratio(self.wins, self.trades),
+                "total_return_percent": (self.equity - 1.0) * 100.0,
+                "realized_return_percent": (self.realized_equity - 1.0) * 100.0,
+                "drawdown_percent": (1.0 - self.equity / self.peak_equity) * 100.0,
+                "max_drawdown_percent": self.max_drawdown * 100.0,
+                "profit_factor": _ratio(self.gross_profit, self.gross_loss),
+                "gross_profit_percent": self.gross_profit, "gross_loss_percent": self.gross_loss,
+                "avg_pnl_percent": _ratio(self.gross_profit - self.gross_loss, self.trades),
+                "avg_holding_hours": _ratio(self.holding_seconds / 3600.0, self.trades),
+                "exposure_percent": (_ratio(self.bars_in_position, self.bars) or 0.0) * 100.0,
+                "bars": self.bars, "span_hours": span / 3600.0,
+                "by_reason": {reason: {"trades": s[0], "win_rate": s[1] / s[0], "total_pnl_percent": s[2],
+                                       "avg_pnl_percent": s[2] / s[0], "best_percent": s[3], "worst_percent": s[4]}
+                              for reason, s in self.by_reason.items()},
+                "open_position": open_position,
+                "recent_trades": list(self.recent),
+            }
+
+
+# --- REGISTRY ---
+def register(label, recent_trades=DEFAULT_RECENT_TRADES):
+    """TradeAnalytics baru yang terdaftar di registry. Label yang sudah dipakai diberi akhiran #2, #3, ..."""
+    with _registry_lock:
+        key, n = label, 1
+        while key in _registry:
+            n += 1; key = f"{label}#{n}"
+        analytics = TradeAnalytics(key, recent_trades)
+        _registry[key] = analytics
+    return analytics
+
+def snapshot_all():
+    """{"instruments": {label: snapshot}, "total": agregat semua instrumen}."""
+    with _registry_lock:
+        items = sorted(_registry.items())
+    instruments = {label: analytics.snapshot() for label, analytics in items}
+    trades = sum(s["trades"] for s in instruments.values())
+    wins = sum(s["wins"] for s in instruments.values())
+    gross_profit = sum(s["gross_profit_percent"] for s in instruments.values())
+    gross_loss = sum(s["gross_loss_percent"] for s in instruments.values())
+    total = {"instruments": len(instruments), "trades": trades, "wins": wins, "win_rate": _ratio(wins, trades),
+             "profit_factor": _ratio(gross_profit, gross_loss),
+             "total_pnl_percent": gross_profit - gross_loss,
+             "open_positions": sum(1 for s in instruments.values() if s["open_position"]),
+             "worst_max_drawdown_percent": max((s["max_drawdown_percent"] for s in instruments.values()), default=0.0)}
+    return {"instruments": instruments, "total": total}
+
+def format_summary(snapshot):
+    """Satu baris ringkasan untuk log."""
+    def fmt(value, spec, scale=1.0):
+        return "N/A" if value is None else format(value * scale, spec)
+    text = (f"{snapshot['trades']} trade, win rate {fmt(snapshot['win_rate'], '.1f', 100.0)}%, "
+            f"return {snapshot['total_return_percent']:.2f}%, max DD {snapshot['max_drawdown_percent']:.2f}%, "
+            f"PF {fmt(snapshot['profit_factor'], '.2f')}, hold rata2 {fmt(snapshot['avg_holding_hours'], '.1f')} jam, "
+            f"exposure {snapshot['exposure_percent']:.1f}%")
+    reasons = ", ".join(f"{reason}: {s['trades']}x avg {s['avg_pnl_percent']:.2f}%" for reason, s in snapshot["by_reason"].items())
+    return f"{text} | {reasons}" if reasons else text
@@ -0,0 +1,299 @@
+# --- BACKTEST OFFLINE ---
+# Replay strategi pivot -> FIB 0.5 -> entry bullish close -> trailing TP / emergency SL atas file OHLCV.
+# Keputusan identik dengan run_strategy_logic (strategy_runner.py) yang dipanggil bar per bar,
+# tapi pivot dihitung vektor dengan NumPy dan state machine hanya berjalan di bar "event"
+# (pivot terkonfirmasi, FIB aktif, posisi terbuka), sehingga jutaan bar selesai dalam hitungan detik.
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+EXIT_EMERGENCY_SL = "Emergency SL"
+EXIT_TRAILING_STOP = "Trailing Stop"
+EXIT_OPEN = "Open" # Posisi masih terbuka di akhir data
+
+
+# --- LOAD DATA ---
+def load_ohlcv(path):
+    """Baca file .csv / .npz jadi dict array: time (int64 epoch detik) + open/high/low/close/volume (float64)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npz':
+        with np.load(path) as npz:
+            raw = {key: npz[key] for key in npz.files}
+    elif ext == '.csv':
+        import pandas as pd # Hanya dibutuhkan untuk parsing CSV
+        df = pd.read_csv(path)
+        df.columns = [str(col).strip().lower() for col in df.columns]
+        raw = {col: df[col].to_numpy() for col in df.columns}
+    else:
+        raise ValueError(f"Format file tidak didukung: {path} (gunakan .csv atau .npz)")
+
+    if 'volumefrom' in raw and 'volume' not in raw: raw['volume'] = raw['volumefrom']
+    time_col = 'time' if 'time' in raw else ('timestamp' if 'timestamp' in raw else None)
+    if time_col is None:
+        raise ValueError(f"Kolom 'time' / 'timestamp' tidak ditemukan di {path}")
+    times = raw[time_col]
+    if not np.issubdtype(times.dtype, np.number):
+        times = np.asarray(times, dtype='datetime64[s]').astype(np.int64)
+    for col in ('open', 'high', 'low', 'close'):
+        if col not in raw: raise ValueError(f"Kolom '{col}' tidak ditemukan di {path}")
+
+    data = {'time': np.asarray(times, dtype=np.int64)}
+    for col in OHLCV_COLUMNS:
+        data[col] = np.asarray(raw[col], dtype=np.float64) if col in raw else np.full(len(times), np.nan)
+
+    order = np.argsort(data['time'], kind='stable')
+    valid = ~np.isnan(np.column_stack([data[col][order] for col in ('open', 'high', 'low', 'close')])).any(axis=1)
+    return {key: np.ascontiguousarray(arr[order][valid]) for key, arr in data.items()}
+
+
+# --- PIVOT VEKTOR ---
+def sliding_max(values, window):
+    """max(values[j:j+window]) untuk j = 0 .. n-window, O(n) dengan algoritma van Herk/Gil-Werman."""
+    n = len(values)
+    if window <= 0 or n < window: return np.empty(0, dtype=np.float64)
+    if window == 1: return np.asarray(values, dtype=np.float64).copy()
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, -np.inf)
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+
+def find_pivots_np(values, left_strength, right_strength, is_high=True):
+    """Mask boolean pivot, aturan sama dengan find_pivots: kiri strict, kanan non-strict."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    mask = np.zeros(n, dtype=bool)
+    if n < left_strength + right_strength + 1: return mask
+    signed = values if is_high else -values
+    center = signed[left_strength:n - right_strength]
+    ok = np.ones(len(center), dtype=bool)
+    if left_strength > 0:
+        ok &= center > sliding_max(signed, left_strength)[:len(center)]
+    if right_strength > 0:
+        ok &= center >= sliding_max(signed, right_strength)[left_strength + 1:]
+    mask[left_strength:n - right_strength] = ok
+    return mask
+
+
+# --- STATE MACHINE ---
+def _secure_fib_column(settings):
+    # Sama dengan run_strategy_logic: nama kolom tidak dikenal -> pakai close
+    col = str(settings.get("secure_fib_check_price", "Close")).lower()
+    return col if col in OHLCV_COLUMNS else 'close'
+
+def _first_entry_bar(data, fib_level, start, stop):
+    """Bar pertama di [start, stop) dengan candle bullish yang close di atas FIB, atau None."""
+    if start >= stop: return None
+    close = data['close'][start:stop]
+    hits = np.flatnonzero((close > data['open'][start:stop]) & (close > fib_level))
+    return start + int(hits[0]) if len(hits) else None
+
+def compute_entry_signals(data, left_strength, right_strength, enable_secure_fib=True, secure_fib_check_price="Close",
+                          pivot_highs=None, pivot_lows=None):
+    """
+    Jalankan bagian pivot/FIB dari state machine. Return list (bar_entry, fib_level): bar di mana FIB aktif
+    "terpakai" oleh candle bullish (entry terjadi jika saat itu tidak ada posisi).
+    Bagian ini tidak bergantung pada posisi, jadi bisa di-cache per (left, right, secure fib).
+    """
+    high, low = data['high'], data['low']
+    n = len(high)
+    if pivot_highs is None: pivot_highs = find_pivots_np(high, left_strength, right_strength, True)
+    if pivot_lows is None: pivot_lows = find_pivots_np(low, left_strength, right_strength, False)
+    check_values = data[_secure_fib_column({"secure_fib_check_price": secure_fib_check_price})]
+
+    signals = []
+    last_signal_type = 0
+    high_price_for_fib = None; high_bar_index_for_fib = None
+    active_fib_level = None; active_from_bar = None
+    for e in np.flatnonzero(pivot_highs | pivot_lows).tolist():
+        bar = e + right_strength # Bar saat pivot di e terkonfirmasi
+        is_high = bool(pivot_highs[e]) and last_signal_type != 1
+        if is_high: last_signal_type = 1
+        is_low = bool(pivot_lows[e]) and last_signal_type != -1
+        if is_low: last_signal_type = -1
+        changes_fib = is_high or (is_low and high_price_for_fib is not None and e > high_bar_index_for_fib)
+        if not changes_fib: continue
+
+        if active_fib_level is not None: # FIB lama berlaku sampai bar sebelum event ini
+            entry_bar = _first_entry_bar(data, active_fib_level, active_from_bar, bar)
+            if entry_bar is not None: signals.append((entry_bar, active_fib_level))
+            active_fib_level = None; active_from_bar = None
+
+        if is_high:
+            high_price_for_fib = float(high[e]); high_bar_index_for_fib = e
+        if is_low and high_price_for_fib is not None and e > high_bar_index_for_fib:
+            fib_level = (high_price_for_fib + float(low[e])) / 2.0
+            if not (enable_secure_fib and check_values[bar] > fib_level):
+                active_fib_level = fib_level; active_from_bar = bar
+            high_price_for_fib = None; high_bar_index_for_fib = None
+
+    if active_fib_level is not None:
+        entry_bar = _first_entry_bar(data, active_fib_level, active_from_bar, n)
+        if entry_bar is not None: signals.append((entry_bar, active_fib_level))
+    return signals
+
+def _find_exit(data, entry_bar, entry_price, emergency_sl, activation_percent, trailing_gap_percent):
+    """Cari bar exit pertama mulai dari bar entry. Return (bar, harga, alasan) atau None jika tidak pernah kena."""
+    high, low, open_ = data['high'], data['low'], data['open']
+    n = len(high)
+    trail_factor = 1 - (trailing_gap_percent / 100.0)
+    highest = entry_price; trailing_active = False; trailing_stop = -np.inf
+    start, chunk = entry_bar, 64
+    while start < n:
+        stop = min(n, start + chunk)
+        running_high = np.maximum.accumulate(np.maximum(high[start:stop], highest))
+        if entry_price != 0:
+            profit = ((running_high - entry_price) / entry_price) * 100.0
+        else:
+            profit = np.zeros(stop - start)
+        active = np.logical_or.accumulate((profit >= activation_percent) | trailing_active)
+        trail = np.maximum.accumulate(np.maximum(np.where(active, running_high * trail_factor, -np.inf), trailing_stop))
+        use_trailing = active & (trail > emergency_sl)
+        final_stop = np.where(use_trailing, trail, emergency_sl)
+        hits = np.flatnonzero(low[start:stop] <= final_stop)
+        if len(hits):
+            j = int(hits[0])
+            stop_level = float(final_stop[j])
+            reason = EXIT_TRAILING_STOP if use_trailing[j] else EXIT_EMERGENCY_SL
+            return start + j, min(float(open_[start + j]), stop_level), reason
+        highest = float(running_high[-1]); trailing_active = bool(active[-1]); trailing_stop = float(trail[-1])
+        start, chunk = stop, min(chunk * 4, 1 << 16)
+    return None
+
+def simulate_trades(data, signals, profit_target_percent_activation, trailing_stop_gap_percent, emergency_sl_percent):
+    """Jalankan manajemen posisi atas sinyal entry. Return list trade (dict) termasuk posisi yang masih terbuka."""
+    trades = []
+    flat_from_bar = 0 # Bar pertama di mana cek entry melihat posisi kosong
+    for entry_bar, fib_level in signals:
+        if entry_bar < flat_from_bar: continue
+        entry_price = float(data['close'][entry_bar])
+        emergency_sl = entry_price * (1 - emergency_sl_percent / 100.0)
+        trade = {"entry_bar": entry_bar, "entry_time": int(data['time'][entry_bar]), "entry_price": entry_price,
+                 "fib_level": fib_level, "emergency_sl": emergency_sl}
+        exit_info = _find_exit(data, entry_bar, entry_price, emergency_sl,
+                               profit_target_percent_activation, trailing_stop_gap_percent)
+        if exit_info is None:
+            last_bar = len(data['close']) - 1
+            exit_bar, exit_price, reason = last_bar, float(data['close'][last_bar]), EXIT_OPEN
+        else:
+            exit_bar, exit_price, reason = exit_info
+        pnl = (exit_price - entry_price) / entry_price * 100.0 if entry_price != 0 else 0.0
+        trade.update({"exit_bar": exit_bar, "exit_time": int(data['time'][exit_bar]), "exit_price": exit_price,
+                      "exit_reason": reason, "pnl_percent": pnl})
+        trades.append(trade)
+        if exit_info is None: break
+        flat_from_bar = exit_bar + 1
+    return trades
+
+
+# --- STATISTIK ---
+def summarize_trades(trades, n_bars=0):
+    closed = [t for t in trades if t["exit_reason"] != EXIT_OPEN]
+    pnls = np.array([t["pnl_percent"] for t in closed], dtype=np.float64)
+    wins = pnls[pnls > 0]; losses = pnls[pnls <= 0]
+    equity = np.cumprod(1 + pnls / 100.0) if len(pnls) else np.ones(0)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:] if len(equity) else equity
+    drawdown = (equity / peak - 1) * 100.0 if len(equity) else equity
+    gross_loss = -losses.sum()
+    summary = {
+        "bars": n_bars,
+        "trades": len(closed),
+        "wins": len(wins), "losses": len(losses),
+        "win_rate_percent": len(wins) / len(closed) * 100.0 if closed else 0.0,
+        "total_pnl_percent": float(pnls.sum()),
+        "compounded_return_percent": float((equity[-1] - 1) * 100.0) if len(equity) else 0.0,
+        "avg_pnl_percent": float(pnls.mean()) if len(pnls) else 0.0,
+        "best_trade_percent": float(pnls.max()) if len(pnls) else 0.0,
+        "worst_trade_percent": float(pnls.min()) if len(pnls) else 0.0,
+        "max_drawdown_percent": float(-drawdown.min()) if len(drawdown) else 0.0,
+        "profit_factor": float(wins.sum() / gross_loss) if gross_loss > 0 else (float('inf') if len(wins) else 0.0),
+        "avg_bars_held": float(np.mean([t["exit_bar"] - t["entry_bar"] for t in closed])) if closed else 0.0,
+        "exit_reasons": {reason: sum(1 for t in closed if t["exit_reason"] == reason)
+                         for reason in (EXIT_EMERGENCY_SL, EXIT_TRAILING_STOP)},
+        "open_position": len(closed) != len(trades),
+    }
+    return summary
+
+def run_backtest(data, settings):
+    """Backtest satu set parameter atas dict array OHLCV. Return (trades, summary)."""
+    signals = compute_entry_signals(data, settings['left_strength'], settings['right_strength'],
+                                    settings.get('enable_secure_fib', True), settings.get('secure_fib_check_price', 'Close'))
+    trades = simulate_trades(data, signals, settings['profit_target_percent_activation'],
+                             settings['trailing_stop_gap_percent'], settings['emergency_sl_percent'])
+    return trades, summarize_trades(trades, len(data['close']))
+
+
+# --- OUTPUT ---
+def _format_time(epoch_seconds):
+    return str(np.datetime64(int(epoch_seconds), 's')).replace('T', ' ')
+
+def write_ledger(trades, path):
+    fields = ["entry_time", "entry_price", "exit_time", "exit_price", "exit_reason", "pnl_percent",
+              "entry_bar", "exit_bar", "fib_level", "emergency_sl"]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for trade in trades:
+            row = dict(trade)
+            row["entry_time"] = _format_time(trade["entry_time"]); row["exit_time"] = _format_time(trade["exit_time"])
+            writer.writerow(row)
+
+def print_report(trades, summary, elapsed_seconds=None, max_rows=20):
+    print(f"\n--- Ledger Trade ({len(trades)} trade) ---")
+    shown = trades if len(trades) <= max_rows else trades[-max_rows:]
+    if len(shown) < len(trades): print(f"(menampilkan {len(shown)} trade terakhir)")
+    for t in shown:
+        print(f"{_format_time(t['entry_time'])} BUY @ {t['entry_price']:.5f} -> {_format_time(t['exit_time'])} "
+              f"EXIT @ {t['exit_price']:.5f} ({t['exit_reason']}) PnL: {t['pnl_percent']:.2f}%")
+    print("\n--- Ringkasan ---")
+    for key, value in summary.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+    if elapsed_seconds is not None: print(f"Waktu proses: {elapsed_seconds:.3f} detik")
+
+def backtest(path, settings, ledger_path=None, verbose=True):
+    """Entry point: load file OHLCV, jalankan backtest, tampilkan ringkasan & simpan ledger (opsional)."""
+    data = load_ohlcv(path)
+    started = time.perf_counter()
+    trades, summary = run_backtest(data, settings)
+    elapsed = time.perf_counter() - started
+    if ledger_path: write_ledger(trades, ledger_path)
+    if verbose: print_report(trades, summary, elapsed)
+    return trades, summary
+
+
+def parse_setting_overrides(pairs):
+    """Parse ['left_strength=20', 'enable_secure_fib=false'] jadi dict bertipe."""
+    overrides = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep: raise ValueError(f"Override harus berbentuk key=value: {pair}")
+        lowered = value.strip().lower()
+        if lowered in ('true', 'false'): overrides[key.strip()] = lowered == 'true'
+        else:
+            try: overrides[key.strip()] = int(value)
+            except ValueError:
+                try: overrides[key.strip()] = float(value)
+                except ValueError: overrides[key.strip()] = value.strip()
+    return overrides
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest offline strategi pivot/FIB atas file OHLCV (.csv/.npz)")
+    parser.add_argument("data_file")
+    parser.add_argument("--ledger", help="Simpan ledger trade ke file CSV")
+    parser.add_argument("--set", dest="overrides", action="append", metavar="KEY=VALUE",
+                        help="Override parameter strategi, misal --set left_strength=20")
+    args = parser.parse_args(argv)
+    from strategy_runner import load_settings
+    settings = load_settings()
+    settings.update(parse_setting_overrides(args.overrides))
+    backtest(args.data_file, settings, ledger_path=args.ledger)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+# --- BENCHMARK ---
+# Ukur latency per bar dan peak memory tiap tahap strategi atas data OHLCV sintetis (random walk ber-seed):
+#   find_pivots        : deteksi pivot pure-Python atas seluruh seri (high + low)
+#   run_strategy_logic : satu panggilan per bar dengan DataFrame yang tumbuh (jalur DataFrame)
+#   warmup             : InstrumentRunner.initialize() (fetch + replay histori lewat ring buffer)
+#   fetch              : fetch_candle_arrays, decode JSON CryptoCompare -> array kolom (jalur live)
+#   vector_step        : VectorStrategyEngine.step() untuk VECTOR_INSTRUMENTS instrumen sekaligus (latency per bar)
+#   startup            : cold start interpreter baru sampai `import strategy_runner` selesai (latency per proses)
+# HTTP diganti stub (tidak ada koneksi jaringan). Hasil bisa disimpan sebagai baseline JSON; run berikutnya
+# gagal (exit code 1) jika ada tahap yang lebih lambat / lebih boros memori dari baseline melebihi toleransi.
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+STAGE_NAMES = ("find_pivots", "run_strategy_logic", "warmup", "fetch", "vector_step", "startup")
+VECTOR_INSTRUMENTS = 1000
+TIMING_METRICS = {"p50_us": 1.0, "p95_us": 2.0} # Pengali toleransi: persentil ekor lebih berisik
+BENCH_SETTINGS = {
+    "api_key": "benchmark", "symbol": "BTC", "currency": "USD", "exchange": "CCCAGG", "timeframe": "hour",
+    "profit_target_percent_activation": 5.0, "trailing_stop_gap_percent": 5.0, "emergency_sl_percent": 10.0,
+    "enable_secure_fib": True, "secure_fib_check_price": "Close", "enable_email_notifications": False,
+    "enable_candle_store": False, "enable_checkpoint": False, "ring_buffer_margin": 64,
+}
+
+
+# --- DATA SINTETIS ---
+def generate_ohlcv(n_bars, seed=0, volatility=0.01, start_price=100.0, start_time=1_600_000_000, timeframe_seconds=3600):
+    """Random walk log-return N(0, volatility); format sama dengan backtest.load_ohlcv."""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, n_bars)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, n_bars)))
+    return {"time": start_time + timeframe_seconds * np.arange(n_bars, dtype=np.int64),
+            "open": open_, "high": np.maximum(open_, close) * (1 + wick[0]),
+            "low": np.minimum(open_, close) * (1 - wick[1]), "close": close,
+            "volume": rng.lognormal(3.0, 1.0, n_bars)}
+
+def to_api_payload(data):
+    """Bentuk respons histohour/histominute CryptoCompare (Data.Data = list dict per candle)."""
+    rows = [{"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c),
+             "volumefrom": float(v), "volumeto": float(v * c)}
+            for t, o, h, l, c, v in zip(data["time"], data["open"], data["high"], data["low"], data["close"], data["volume"])]
+    return {"Response": "Success", "Data": {"Data": rows}}
+
+
+# --- STUB / LINGKUNGAN ---
+class StubClient:
+    """Pengganti CryptoCompareClient: mengembalikan limit+1 candle terakhir dari payload (seperti API asli)."""
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def get_histo(self, endpoint, params):
+        self.calls += 1
+        rows = self.payload["Data"]["Data"]
+        return {"Response": "Success", "Data": {"Data": rows[-(int(params["limit"]) + 1):]}}
+
+@contextmanager
+def offline_runner(payload):
+    """strategy_runner tanpa jaringan, tanpa notifikasi, dan tanpa log INFO (log ke konsol/file ikut terukur)."""
+    import strategy_runner as runner
+    saved = (runner.get_client, runner.notify_signal)
+    stub = StubClient(payload)
+    runner.get_client = lambda: stub
+    runner.notify_signal = lambda *args, **kwargs: None
+    logging.disable(logging.INFO)
+    try:
+        yield runner
+    finally:
+        runner.get_client, runner.notify_signal = saved
+        logging.disable(logging.NOTSET)
+
+
+# --- TAHAP ---
+# Tiap fungsi tahap return list latency per bar (detik). Tahap batch (find_pivots, fetch) memberi satu
+# sampel per repeat (durasi / jumlah bar); tahap per bar memberi satu sampel per bar yang diproses.
+def bench_find_pivots(runner, data, settings, repeat):
+    highs, lows = data["high"].tolist(), data["low"].tolist()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        runner.find_pivots(highs, settings["left_strength"], settings["right_strength"], True)
+        runner.find_pivots(lows, settings["left_strength"], settings["right_strength"], False)
+        samples.append((time.perf_counter() - started) / len(highs))
+    return samples
+
+def bench_run_strategy_logic(runner, data, settings, repeat):
+    from candle_store import arrays_to_frame
+    df = arrays_to_frame(data)
+    samples = []
+    for _ in range(repeat):
+        context = runner.StrategyContext()
+        for i in range(len(df)):
+            window = df.iloc[:i + 1]
+            started = time.perf_counter()
+            runner.run_strategy_logic(window, settings, context)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+def bench_warmup(runner, data, settings, repeat):
+    samples = []
+    for _ in range(repeat):
+        instrument = runner.InstrumentRunner(settings)
+        instrument.fetch_limit = len(data["time"]) - 1
+        process_bar = instrument._process_bar
+        def timed_process_bar(bar_index):
+            started = time.perf_counter()
+            process_bar(bar_index)
+            samples.append(time.perf_counter() - started)
+        instrument._process_bar = timed_process_bar
+        if not instrument.initialize(): raise RuntimeError("Warmup gagal: tidak ada data dari stub")
+    return samples
+
+def bench_fetch(runner, data, settings, repeat):
+    n_bars = len(data["time"])
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        candles = runner.fetch_candle_arrays(settings["symbol"], settings["currency"], n_bars - 1, settings["exchange"],
+                                             settings["api_key"], settings["timeframe"])
+        samples.append((time.perf_counter() - started) / n_bars)
+        if candles is None or len(candles["time"]) != n_bars:
+            raise RuntimeError(f"fetch_candle_arrays tidak mengembalikan {n_bars} candle")
+    return samples
+
+def bench_vector_step(runner, data, settings, repeat):
+    from vector_engine import VectorStrategyEngine
+    n_bars = len(data["time"])
+    # Tiap instrumen = seri yang sama dengan offset waktu berbeda (tanpa matriks bar x instrumen penuh)
+    offsets = np.random.default_rng(1).integers(0, n_bars, VECTOR_INSTRUMENTS)
+    samples = []
+    for _ in range(repeat):
+        engine = VectorStrategyEngine([settings] * VECTOR_INSTRUMENTS)
+        for t in range(n_bars):
+            rows = (offsets + t) % n_bars
+            bar = [data[name][rows] for name in ("open", "high", "low", "close", "volume")]
+            started = time.perf_counter()
+            engine.step(*bar)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+def bench_startup(runner, data, settings, repeat):
+    # Proses terpisah: modul yang sudah ter-import di proses benchmark tidak ikut terhitung
+    module_dir = os.path.dirname(os.path.abspath(runner.__file__))
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import strategy_runner"], cwd=module_dir, check=True)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+STAGES = {"find_pivots": bench_find_pivots, "run_strategy_logic": bench_run_strategy_logic,
+          "warmup": bench_warmup, "fetch": bench_fetch, "vector_step": bench_vector_step,
+          "startup": bench_startup}
+
+
+# --- PENGUKURAN ---
+def case_key(stage, n_bars, left_strength, right_strength):
+    if stage == "startup": return stage # Tidak bergantung data maupun parameter
+    if stage == "fetch": return f"{stage}|bars={n_bars}" # Tidak bergantung parameter strategi
+    if stage == "vector_step": return f"{stage}|bars={n_bars}|L={left_strength}|R={right_strength}|N={VECTOR_INSTRUMENTS}"
+    return f"{stage}|bars={n_bars}|L={left_strength}|R={right_strength}"
+
+def measure_case(stage, data, settings, repeat=3):
+    """Satu kali run di bawah tracemalloc untuk peak memory, lalu `repeat` run tanpa tracing untuk latency."""
+    bench = STAGES[stage]
+    with offline_runner(to_api_payload(data)) as runner:
+        tracemalloc.start()
+        try:
+            bench(runner, data, settings, 1)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        started = time.perf_counter()
+        samples = np.asarray(bench(runner, data, settings, repeat)) * 1e6
+        total = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50_us": round(float(p50), 3), "p95_us": round(float(p95), 3), "p99_us": round(float(p99), 3),
+            "max_us": round(float(samples.max()), 3), "samples": int(len(samples)),
+            "total_s": round(total, 4), "peak_kb": round(peak / 1024, 1)}
+
+def run_benchmarks(bar_counts, strengths, stages=STAGE_NAMES, seed=0, volatility=0.01, repeat=3, progress=True):
+    results = {}
+    for n_bars in bar_counts:
+        data = generate_ohlcv(n_bars, seed=seed, volatility=volatility)
+        for left_strength, right_strength in strengths:
+            settings = dict(BENCH_SETTINGS, left_strength=left_strength, right_strength=right_strength)
+            for stage in stages:
+                key = case_key(stage, n_bars, left_strength, right_strength)
+                if key in results: continue
+                results[key] = measure_case(stage, data, settings, repeat)
+                if progress: print(f"  {key:<48} {format_row(results[key])}", flush=True)
+    return results
+
+
+# --- BASELINE ---
+def load_baseline(path):
+    if not os.path.exists(path): return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_baseline(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+def compare_to_baseline(results, baseline, tolerance=0.3, memory_tolerance=0.3, min_delta_us=2.0):
+    """Return list pesan regresi: latency p50 (p95: 2x toleransi) atau peak memory naik lebih dari toleransi relatif.
+    Selisih latency di bawah min_delta_us diabaikan (noise timer untuk tahap yang sangat cepat)."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None: continue
+        for metric, scale in TIMING_METRICS.items():
+            if current[metric] > base[metric] * (1 + tolerance * scale) and current[metric] - base[metric] > min_delta_us:
+                regressions.append(f"{key}: {metric} {base[metric]:.2f} -> {current[metric]:.2f} us (+{(current[metric] / base[metric] - 1) * 100:.0f}%)")
+        if current["peak_kb"] > base["peak_kb"] * (1 + memory_tolerance) and current["peak_kb"] - base["peak_kb"] > 64:
+            regressions.append(f"{key}: peak memory {base['peak_kb']:.0f} -> {current['peak_kb']:.0f} KB")
+    return regressions
+
+
+# --- OUTPUT / CLI ---
+def format_row(result):
+    return (f"p50 {result['p50_us']:9.2f} us | p95 {result['p95_us']:9.2f} us | p99 {result['p99_us']:9.2f} us | "
+            f"max {result['max_us']:9.2f} us | peak {result['peak_kb']:9.1f} KB")
+
+def parse_strengths(spec):
+    """'10:10,50:150' -> [(10, 10), (50, 150)]"""
+    pairs = []
+    for item in spec.split(','):
+        left, sep, right = item.strip().partition(':')
+        if not sep: raise ValueError(f"Strength harus berbentuk LEFT:RIGHT: {item}")
+        pairs.append((int(left), int(right)))
+    return pairs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark latency per bar & memory tahap strategi (offline, data sintetis)")
+    parser.add_argument("--bars", default="500,2000", help="Daftar jumlah bar, misal 500,2000,10000")
+    parser.add_argument("--strengths", default="10:10,50:150", help="Daftar LEFT:RIGHT, misal 10:10,50:150")
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES), help=f"Subset dari {','.join(STAGE_NAMES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--volatility", type=float, default=0.01, help="Std log-return per bar")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="File baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil run ini sebagai baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Toleransi kenaikan latency (0.3 = +30%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.3)
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="Selisih latency absolut minimum untuk dianggap regresi")
+    parser.add_argument("--json", help="Simpan hasil lengkap ke file JSON")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown: parser.error(f"Tahap tidak dikenal: {', '.join(unknown)}")
+    bar_counts = [int(n) for n in args.bars.split(',')]
+    print(f"Benchmark {len(bar_counts)} ukuran x {len(parse_strengths(args.strengths))} strength, tahap: {', '.join(stages)}")
+    results = run_benchmarks(bar_counts, parse_strengths(args.strengths), stages, args.seed, args.volatility, args.repeat)
+    if args.json: save_baseline(results, args.json)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline disimpan ke {args.baseline}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nBaseline {args.baseline} belum ada (buat dengan --save-baseline). Tidak ada pengecekan regresi.")
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.memory_tolerance, args.min_delta_us)
+    if regressions:
+        print(f"\nREGRESI terhadap {args.baseline}:")
+        for message in regressions: print(f"  {message}")
+        return 1
+    print(f"\nTidak ada regresi terhadap {args.baseline}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
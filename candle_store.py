@@ -0,0 +1,221 @@
+# --- CANDLE STORE LOKAL ---
+# Penyimpanan candle per (symbol, currency, exchange, timeframe) di disk, format kolom biner
+# (int64 epoch detik + float64 OHLCV) yang dibaca via memory-map, plus index.json kecil.
+# Data disimpan dalam beberapa segmen yang masing-masing terurut waktu dan hanya di-append:
+#   - candle baru di-append ke segmen terbaru,
+#   - backfill histori lama (paging toTs) ditulis sebagai segmen baru yang lebih tua.
+# index.json ditulis atomik dan menjadi titik commit: byte sisa setelah 'count' (mis. crash saat append) diabaikan.
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+TIMEFRAME_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+STORE_COLUMNS = (("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"))
+INDEX_FILE = "index.json"
+
+
+# --- KONVERSI DATAFRAME <-> ARRAY ---
+def frame_to_arrays(df):
+    """DataFrame hasil fetch_candles (index timestamp) -> dict array kolom store."""
+    if df is None or df.empty: return None
+    data = {"time": df.index.values.astype("datetime64[s]").astype(np.int64)}
+    for name, dtype in STORE_COLUMNS[1:]:
+        data[name] = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    return data
+
+def arrays_to_frame(data):
+    import pandas as pd
+    if data is None or len(data["time"]) == 0: return pd.DataFrame()
+    index = pd.DatetimeIndex(pd.to_datetime(data["time"], unit='s'), name='timestamp')
+    return pd.DataFrame({name: data[name] for name, _ in STORE_COLUMNS[1:]}, index=index)
+
+def _empty_arrays():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in STORE_COLUMNS}
+
+def _concat_arrays(parts):
+    parts = [p for p in parts if p is not None and len(p["time"])]
+    if not parts: return _empty_arrays()
+    return {name: np.concatenate([p[name] for p in parts]) for name, _ in STORE_COLUMNS}
+
+def _select(data, mask):
+    return {name: data[name][mask] for name, _ in STORE_COLUMNS}
+
+def _sorted_unique(data):
+    """Urutkan berdasarkan waktu; jika timestamp dobel, baris terakhir yang dipakai."""
+    order = np.argsort(data["time"], kind='stable')
+    data = {name: np.asarray(data[name], dtype=dtype)[order] for name, dtype in STORE_COLUMNS}
+    keep = np.ones(len(data["time"]), dtype=bool)
+    keep[:-1] = data["time"][1:] != data["time"][:-1]
+    return _select(data, keep)
+
+
+class CandleStore:
+    def __init__(self, root, symbol, currency, exchange, timeframe):
+        self.timeframe = timeframe
+        self.timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 3600)
+        key = "_".join([symbol or "NA", currency or "NA", exchange or "CCCAGG", timeframe or "hour"])
+        self.path = os.path.join(root, re.sub(r'[^A-Za-z0-9_.-]', '-', key))
+        os.makedirs(self.path, exist_ok=True)
+        self.lock = threading.RLock() # Dipegang pemanggil saat menulis (beberapa strategi bisa berbagi satu store)
+        self._load_index()
+
+    # --- INDEX ---
+    def _load_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"version": 1, "timeframe": self.timeframe, "next_segment_id": 0, "segments": []}
+
+    def _save_index(self):
+        self.index["segments"].sort(key=lambda seg: seg["first"])
+        tmp_path = os.path.join(self.path, INDEX_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=1)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
+
+    @property
+    def count(self):
+        return sum(seg["count"] for seg in self.index["segments"])
+
+    @property
+    def first_time(self):
+        return self.index["segments"][0]["first"] if self.index["segments"] else None
+
+    @property
+    def last_time(self):
+        return self.index["segments"][-1]["last"] if self.index["segments"] else None
+
+    # --- FILE SEGMEN ---
+    def _column_path(self, segment_id, name):
+        return os.path.join(self.path, f"seg{segment_id:05d}_{name}.bin")
+
+    def _write_rows(self, segment, data):
+        """Append baris ke file kolom segmen (buang byte sisa yang belum ter-commit di index)."""
+        for name, dtype in STORE_COLUMNS:
+            with open(self._column_path(segment["id"], name), 'ab') as f:
+                f.truncate(segment["count"] * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+        segment["count"] += len(data["time"])
+        segment["last"] = int(data["time"][-1])
+        if segment["first"] is None: segment["first"] = int(data["time"][0])
+
+    def _new_segment(self):
+        segment = {"id": self.index["next_segment_id"], "count": 0, "first": None, "last": None}
+        self.index["next_segment_id"] += 1
+        return segment
+
+    def _memmap(self, segment, name, dtype):
+        if segment["count"] == 0: return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(segment["id"], name), dtype=dtype, mode='r', shape=(segment["count"],))
+
+    # --- TULIS ---
+    def append(self, data):
+        """Simpan candle (sebaiknya yang sudah close). Candle baru di-append, yang lebih tua dari isi store jadi segmen backfill,
+        sedangkan yang timestamp-nya sudah ada diabaikan. Return jumlah baris yang ditulis."""
+        if data is None or len(data["time"]) == 0: return 0
+        data = _sorted_unique(data)
+        written = 0
+        if not self.index["segments"]:
+            segment = self._new_segment()
+            self._write_rows(segment, data)
+            self.index["segments"].append(segment)
+            written = len(data["time"])
+        else:
+            newer = _select(data, data["time"] > self.last_time)
+            older = _select(data, data["time"] < self.first_time)
+            if len(newer["time"]):
+                self._write_rows(self.index["segments"][-1], newer)
+                written += len(newer["time"])
+            if len(older["time"]):
+                segment = self._new_segment()
+                self._write_rows(segment, older)
+                self.index["segments"].append(segment)
+                written += len(older["time"])
+        if written: self._save_index()
+        return written
+
+    def contiguous(self, data):
+        """Bagian `data` yang menyambung store tanpa lubang: dimulai tepat satu timeframe sesudah last_time dan
+        berjarak satu timeframe per baris (store kosong: run berurutan terakhir). Candle yang sudah ada dibuang."""
+        data = _sorted_unique(data)
+        times = data["time"]
+        breaks = np.flatnonzero(np.diff(times) != self.timeframe_seconds) # Lubang antara baris i dan i + 1
+        if self.last_time is None:
+            return _select(data, slice(breaks[-1] + 1 if len(breaks) else 0, None))
+        start = int(np.searchsorted(times, self.last_time, side='right'))
+        if start == len(times) or times[start] != self.last_time + self.timeframe_seconds: return _empty_arrays()
+        later = breaks[breaks >= start]
+        return _select(data, slice(start, later[0] + 1 if len(later) else None))
+
+    # --- BACA ---
+    def read(self, start=None, end=None):
+        """Candle dengan start <= time <= end (epoch detik, None = tanpa batas); hanya bagian yang dibutuhkan yang dibaca."""
+        parts = []
+        for segment in self.index["segments"]:
+            if segment["count"] == 0: continue
+            if start is not None and segment["last"] < start: continue
+            if end is not None and segment["first"] > end: continue
+            times = self._memmap(segment, "time", "<i8")
+            lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+            hi = segment["count"] if end is None else int(np.searchsorted(times, end, side='right'))
+            if hi <= lo: continue
+            parts.append({name: np.array(self._memmap(segment, name, dtype)[lo:hi]) for name, dtype in STORE_COLUMNS})
+        return _concat_arrays(parts)
+
+    def tail(self, n_bars):
+        """n_bars candle terakhir."""
+        parts, remaining = [], n_bars
+        for segment in reversed(self.index["segments"]):
+            if remaining <= 0: break
+            take = min(remaining, segment["count"])
+            lo = segment["count"] - take
+            parts.append({name: np.array(self._memmap(segment, name, dtype)[lo:]) for name, dtype in STORE_COLUMNS})
+            remaining -= take
+        return _concat_arrays(list(reversed(parts)))
+
+    # --- SINKRONISASI DENGAN API ---
+    def fill_gap(self, fetch_page, now_ts, max_limit):
+        """
+        Ambil hanya candle sejak timestamp terakhir di store (paging mundur dengan toTs jika gap > max_limit).
+        fetch_page(limit, to_ts) -> dict array (atau None). Return dict array hasil fetch, termasuk candle
+        yang masih terbentuk; penyimpanan diserahkan ke pemanggil. Jika paging berhenti sebelum menyambung
+        last_time (page gagal / kosong / histori habis), return kosong: halaman yang lebih baru tidak boleh
+        tersimpan karena lubang di belakangnya tidak akan bisa diisi lagi (append hanya menerima time > last_time).
+        """
+        pages, to_ts = [], None
+        while True:
+            upper = now_ts if to_ts is None else to_ts
+            missing = (upper - self.last_time) // self.timeframe_seconds if self.last_time is not None else max_limit
+            limit = int(min(max(missing, 1), max_limit))
+            page = fetch_page(limit, to_ts)
+            if page is None or len(page["time"]) == 0: break
+            pages.append(page)
+            first = int(page["time"][0])
+            if self.last_time is None or first <= self.last_time + self.timeframe_seconds: break
+            if len(page["time"]) < limit: break
+            to_ts = first - self.timeframe_seconds
+        if not pages or (self.last_time is not None and int(pages[-1]["time"][0]) > self.last_time + self.timeframe_seconds):
+            return _empty_arrays()
+        return _sorted_unique(_concat_arrays(pages))
+
+    def backfill(self, fetch_page, n_bars, max_limit):
+        """Tambah sampai n_bars candle lebih tua dari isi store dengan paging toTs. Return jumlah baris baru."""
+        if self.first_time is None or n_bars <= 0: return 0
+        pages, fetched, to_ts = [], 0, self.first_time - self.timeframe_seconds
+        while fetched < n_bars:
+            page = fetch_page(int(min(max_limit, n_bars - fetched)), to_ts)
+            if page is None or len(page["time"]) == 0: break
+            # Sebelum pair listing CryptoCompare mengembalikan candle bernilai 0 -> histori sudah habis
+            real = (page["open"] != 0) | (page["high"] != 0) | (page["low"] != 0) | (page["close"] != 0)
+            page = _select(page, real & (page["time"] < self.first_time))
+            if len(page["time"]) == 0: break
+            pages.append(page)
+            fetched += len(page["time"])
+            to_ts = int(page["time"][0]) - self.timeframe_seconds
+        return self.append(_concat_arrays(pages)) if pages else 0
@@ -0,0 +1,54 @@
+# --- CHECKPOINT STATE STRATEGI ---
+# Snapshot kecil (.npz) per instrumen: isi ring buffer candle + state strategi + posisi pivot engine +
+# bar terakhir yang sudah diproses. Saat restart snapshot dipulihkan sehingga tidak perlu replay warmup,
+# dan posisi yang masih terbuka tetap dilanjutkan. Snapshot hanya dipakai jika fingerprint settings
+# strategi sama (parameter berbeda -> state lama tidak valid). Nama file memuat fingerprint, jadi beberapa
+# konfigurasi strategi pada feed yang sama masing-masing punya checkpoint sendiri.
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+# Settings yang menentukan hasil strategi; perubahan salah satunya membuat snapshot tidak dipakai
+FINGERPRINT_KEYS = ("symbol", "currency", "exchange", "timeframe", "left_strength", "right_strength",
+                    "profit_target_percent_activation", "trailing_stop_gap_percent", "emergency_sl_percent",
+                    "enable_secure_fib", "secure_fib_check_price")
+BUFFER_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+
+def settings_fingerprint(settings):
+    relevant = {key: settings.get(key) for key in FINGERPRINT_KEYS}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:16]
+
+def checkpoint_path(settings):
+    key = "_".join([settings.get('symbol') or "NA", settings.get('currency') or "NA",
+                    settings.get('exchange') or "CCCAGG", settings.get('timeframe') or "hour", settings_fingerprint(settings)[:8]])
+    return os.path.join(settings.get("checkpoint_dir", "checkpoints"), re.sub(r'[^A-Za-z0-9_.-]', '-', key) + ".npz")
+
+def _json_default(value):
+    if isinstance(value, np.generic): return value.item()
+    raise TypeError(f"Tidak bisa disimpan ke checkpoint: {type(value).__name__}")
+
+
+def save_checkpoint(path, meta, arrays):
+    """Tulis snapshot secara atomik (file sementara + fsync + os.replace)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    meta = dict(meta, version=CHECKPOINT_VERSION)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta, default=_json_default)),
+                 **{name: arrays[name] for name in BUFFER_COLUMNS})
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    """Return (meta, arrays) atau None jika file tidak ada / versi berbeda."""
+    if not os.path.exists(path): return None
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["meta"]))
+        if meta.get("version") != CHECKPOINT_VERSION: return None
+        arrays = {name: npz[name] for name in BUFFER_COLUMNS}
+    return meta, arrays
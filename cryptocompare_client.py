@@ -0,0 +1,180 @@
+# --- HTTP CLIENT CRYPTOCOMPARE ---
+# Satu requests.Session keep-alive untuk semua panggilan API (connection pool dipakai ulang),
+# retry dengan exponential backoff + jitter untuk error koneksi / 5xx / rate limit,
+# dan budget rate limit per jendela waktu agar client melambat SEBELUM limit CryptoCompare tercapai.
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import inc, time_stage
+
+BASE_URL = "https://min-api.cryptocompare.com/data/v2"
+# Limit default (kira-kira tier gratis); bisa di-override lewat settings "api_rate_limits"
+DEFAULT_RATE_LIMITS = {"second": 20, "minute": 300, "hour": 3000, "day": 7500}
+WINDOW_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# (nama kolom array, key di Data.Data CryptoCompare)
+HISTO_COLUMNS = (("time", "time"), ("open", "open"), ("high", "high"), ("low", "low"), ("close", "close"), ("volume", "volumefrom"))
+
+
+class RateLimitBudget:
+    """Hitung panggilan per jendela waktu. Di atas soft_ratio sisa kuota jendela disebar merata (pacing)."""
+    def __init__(self, limits=None, soft_ratio=0.8, clock=time.monotonic):
+        limits = DEFAULT_RATE_LIMITS if limits is None else limits
+        self.windows = [(name, WINDOW_SECONDS[name], int(limit), deque()) for name, limit in limits.items()
+                        if name in WINDOW_SECONDS and limit]
+        self.soft_ratio = soft_ratio
+        self.clock = clock
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        for _, seconds, _, calls in self.windows:
+            while calls and calls[0] <= now - seconds: calls.popleft()
+
+    def _delay(self, now):
+        delay = max(0.0, self.blocked_until - now)
+        for _, seconds, limit, calls in self.windows:
+            used = len(calls)
+            if used == 0: continue
+            window_left = calls[0] + seconds - now
+            if used >= limit:
+                delay = max(delay, window_left)
+            elif used >= self.soft_ratio * limit:
+                delay = max(delay, window_left / (limit - used + 1))
+        return delay
+
+    def reserve(self):
+        """Catat satu panggilan dan return berapa detik harus menunggu sebelum panggilan itu boleh dilakukan."""
+        with self._lock:
+            now = self.clock()
+            self._prune(now)
+            delay = self._delay(now)
+            for _, _, _, calls in self.windows: calls.append(now + delay)
+            return delay
+
+    def penalize(self, seconds):
+        """Tahan semua panggilan selama `seconds` (mis. setelah API membalas rate limit)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+    def usage(self):
+        with self._lock:
+            self._prune(self.clock())
+            return {name: (len(calls), limit) for name, _, limit, calls in self.windows}
+
+
+def _is_rate_limit_message(message):
+    message = str(message or "").lower()
+    return "rate limit" in message or "too many" in message
+
+
+class CryptoCompareClient:
+    def __init__(self, rate_limits=None, timeout=15, max_retries=4, backoff_base=1.0, backoff_cap=30.0,
+                 pool_size=32, sleep=time.sleep, clock=time.monotonic):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self.budget = RateLimitBudget(rate_limits, clock=clock)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.calls = 0
+        self.retries = 0
+
+    def backoff_delay(self, attempt):
+        """Full jitter: acak antara 0 dan base * 2^attempt (dibatasi cap)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get_json(self, url, params):
+        """GET dengan budget + retry. Return dict JSON; RequestException dilempar jika semua percobaan gagal."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.retries += 1
+                self.sleep(self.backoff_delay(attempt - 1))
+            wait = self.budget.reserve()
+            if wait > 0:
+                logging.debug(f"Rate limit budget: menunggu {wait:.2f} detik sebelum request")
+                self.sleep(wait)
+            self.calls += 1
+            try:
+                with time_stage("http"):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+                inc("strategy_api_errors_total", kind=e.__class__.__name__.lower())
+                logging.warning(f"Request gagal ({e.__class__.__name__}), percobaan {attempt + 1}/{self.max_retries + 1}")
+                continue
+            if response.status_code in RETRY_STATUS_CODES:
+                last_error = requests.exceptions.HTTPError(f"HTTP {response.status_code}", response=response)
+                inc("strategy_api_errors_total", kind=f"http_{response.status_code}")
+                if response.status_code == 429: self.budget.penalize(self.backoff_delay(attempt + 1))
+                logging.warning(f"HTTP {response.status_code} dari API, percobaan {attempt + 1}/{self.max_retries + 1}")
+                continue
+            response.raise_for_status()
+            with time_stage("json"):
+                data = response.json()
+            if data.get('Response') == 'Error' and _is_rate_limit_message(data.get('Message')) and attempt < self.max_retries:
+                inc("strategy_api_errors_total", kind="rate_limit")
+                self.budget.penalize(self.backoff_delay(attempt + 1))
+                logging.warning(f"Rate limit API: {data.get('Message')}. Melambat dan mencoba lagi...")
+                continue
+            return data
+        raise last_error if last_error is not None else requests.exceptions.RequestException("Request gagal")
+
+    def get_histo(self, endpoint, params):
+        return self.get_json(f"{BASE_URL}/{endpoint}", params)
+
+
+# --- DECODE RESPONS ---
+def decode_histo(rows):
+    """Data.Data histo* (list dict per candle) -> dict array kolom (time int64, OHLCV float64) tanpa DataFrame.
+    Kolom yang tidak ada di respons diisi NaN, nilai null jadi NaN; baris tanpa 'time' dibuang (tidak bisa
+    diletakkan di store / ring buffer). Return None jika tidak ada candle."""
+    if not rows: return None
+    timed = [row for row in rows if row.get("time") is not None]
+    if not timed: raise ValueError("Kolom 'time' tidak ditemukan di respons API")
+    if len(timed) < len(rows):
+        logging.warning(f"{len(rows) - len(timed)} candle tanpa 'time' di respons API dibuang.")
+        rows = timed
+    n_rows = len(rows)
+    data = {}
+    for name, key in HISTO_COLUMNS:
+        dtype = np.int64 if name == "time" else np.float64
+        try:
+            data[name] = np.fromiter((row[key] for row in rows), dtype, n_rows)
+        except (KeyError, TypeError): # Key hilang di sebagian / semua baris, atau nilai null
+            if not any(key in row for row in rows):
+                logging.warning(f"Kolom '{key}' tidak ditemukan! Mengisi dengan NA.")
+                data[name] = np.full(n_rows, np.nan)
+            else:
+                data[name] = np.array([row.get(key) for row in rows], dtype=np.float64).astype(dtype)
+    return data
+
+
+# --- CLIENT BERSAMA ---
+# Satu client per proses: semua fetch berbagi connection pool dan budget rate limit yang sama.
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_client():
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None: _shared_client = CryptoCompareClient()
+        return _shared_client
+
+def configure_client(**kwargs):
+    """Ganti client bersama (mis. dengan rate_limits dari settings). Return client baru."""
+    global _shared_client
+    with _shared_lock:
+        _shared_client = CryptoCompareClient(**kwargs)
+        return _shared_client
@@ -0,0 +1,118 @@
+# --- LOGGING ASINKRON + STREAM EVENT TRADE ---
+# Jalur strategi hanya membuat LogRecord dan memasukkannya ke antrian (QueueHandler); format pesan, strip kode
+# ANSI, tulis ke konsol / file, dan rotasi file dikerjakan thread QueueListener di belakang. Record tidak
+# diformat di thread pemanggil, jadi argumen gaya %-format (log.debug("... %.5f", nilai)) baru dirender
+# oleh writer, dan sama sekali tidak dirender jika level-nya nonaktif.
+# Event trade (pivot, FIB aktif/terlambat, entry, exit + PnL) dikirim lewat logger "trade_events" yang
+# terpisah dan ditulis sebagai JSONL (satu objek per baris) -> bisa di-tail atau dimuat massal untuk analisa.
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+from datetime import datetime
+
+ANSI_PATTERN = re.compile(r'\033\[[0-9;]*m')
+TRADE_EVENT_LOGGER = "trade_events"
+DEFAULT_LOG_SETTINGS = {
+    "log_file": "trading_log.txt", "log_max_bytes": 10 * 1024 * 1024, "log_backup_count": 5,
+    "log_rotate_when": "", "log_level": "INFO", "trade_events_file": "trade_events.jsonl",
+}
+
+_listener = None
+_config_key = None
+_console_formatter = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler tanpa format di thread pemanggil (bawaan: self.format(record) sebelum masuk antrian).
+    Aman karena listener ada di proses yang sama dan argumen log tidak diubah sesudah dipanggil."""
+    def prepare(self, record):
+        return record
+
+class PlainFormatter(logging.Formatter):
+    """Formatter file: sama dengan konsol tapi tanpa kode warna ANSI."""
+    def format(self, record):
+        return ANSI_PATTERN.sub('', super().format(record))
+
+class JsonLineFormatter(logging.Formatter):
+    """record.msg = dict event -> satu baris JSON (+ waktu log)."""
+    def format(self, record):
+        event = dict(record.msg, logged_at=round(record.created, 3))
+        return json.dumps(event, default=_json_default, separators=(',', ':'))
+
+def _json_default(value):
+    if isinstance(value, datetime): return value.isoformat()
+    if hasattr(value, "item"): return value.item() # Skalar NumPy
+    return str(value)
+
+
+def _file_handler(path, settings):
+    if settings.get("log_rotate_when"): # Rotasi berdasarkan waktu, mis. "midnight" / "H"
+        return logging.handlers.TimedRotatingFileHandler(path, when=settings["log_rotate_when"],
+                                                         backupCount=settings.get("log_backup_count", 5), delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=settings.get("log_max_bytes", 0),
+                                                backupCount=settings.get("log_backup_count", 5), delay=True)
+
+def configure_logging(settings=None, console_formatter=None):
+    """Pasang QueueHandler di root logger + logger trade_events, dengan satu QueueListener untuk semua
+    handler tujuan. Dipanggil ulang dengan settings berbeda -> listener lama dihentikan (antrian dikosongkan) dulu."""
+    global _listener, _config_key, _console_formatter
+    if console_formatter is not None: _console_formatter = console_formatter
+    settings = dict(DEFAULT_LOG_SETTINGS, **{k: v for k, v in (settings or {}).items() if k in DEFAULT_LOG_SETTINGS})
+    key = tuple(sorted(settings.items()))
+    if _listener is not None and key == _config_key: return _listener
+    stop_logging()
+
+    console = logging.StreamHandler()
+    if _console_formatter is not None: console.setFormatter(_console_formatter)
+    handlers = [console]
+    if settings["log_file"]:
+        file_handler = _file_handler(settings["log_file"], settings)
+        file_handler.setFormatter(PlainFormatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(file_handler)
+    # Handler diberi filter nama logger: event trade tidak masuk log teks, log teks tidak masuk JSONL
+    for handler in handlers: handler.addFilter(lambda record: record.name != TRADE_EVENT_LOGGER)
+    if settings["trade_events_file"]:
+        events_handler = _file_handler(settings["trade_events_file"], settings)
+        events_handler.setFormatter(JsonLineFormatter())
+        events_handler.addFilter(lambda record: record.name == TRADE_EVENT_LOGGER)
+        handlers.append(events_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers): root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(settings["log_level"])
+    events_logger = logging.getLogger(TRADE_EVENT_LOGGER)
+    events_logger.setLevel(logging.INFO if settings["trade_events_file"] else logging.CRITICAL + 1)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _config_key = key
+    return _listener
+
+def stop_logging():
+    """Tulis sisa antrian lalu tutup file log (dipanggil otomatis saat proses keluar)."""
+    global _listener, _config_key
+    if _listener is None: return
+    _listener.stop()
+    for handler in _listener.handlers: handler.close()
+    _listener, _config_key = None, None
+
+atexit.register(stop_logging)
+
+
+def trade_event(event, settings, bar_time=None, **fields):
+    """Kirim satu event trade ke stream JSONL. Dict dirender jadi JSON oleh thread writer."""
+    events_logger = logging.getLogger(TRADE_EVENT_LOGGER)
+    if not events_logger.isEnabledFor(logging.INFO): return
+    events_logger.info(dict(event=event, symbol=settings.get('symbol'), currency=settings.get('currency'),
+                            exchange=settings.get('exchange'), timeframe=settings.get('timeframe'),
+                            bar_time=bar_time, **fields))
+
+def read_trade_events(path):
+    """Muat file JSONL event trade (untuk analisa) -> list dict."""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,168 @@
+# --- CACHE FEED BERSAMA ---
+# Beberapa strategi yang memantau feed yang sama (symbol, currency, exchange, timeframe) -- mis. parameter
+# left/right strength atau trailing berbeda -- berbagi satu salinan candle hasil fetch dan satu request HTTP:
+# - Request bersamaan untuk feed yang sama digabung (coalescing): satu thread fetch, sisanya menunggu hasilnya.
+# - Hasil disimpan sebagai array read-only (tail maksimal `capacity` candle) dan dibagikan ke semua pemanggil.
+# - Cache valid selama candle terakhirnya masih candle berjalan (TTL mengikuti timeframe: kedaluwarsa saat
+#   candle baru dibuka) dan umurnya tidak lebih dari max_age detik (update candle yang masih terbentuk).
+# - Feed tanpa subscriber dibuang LRU jika jumlah feed melebihi max_feeds.
+# API call dan memori jadi sebanding dengan jumlah feed berbeda, bukan jumlah strategi.
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import inc
+
+DEFAULT_MAX_FEEDS = 32
+DEFAULT_MAX_AGE_SECONDS = 5.0
+DEFAULT_CAPACITY = 2000 # = limit maksimum CryptoCompare + 1
+
+
+def feed_key(symbol, currency, exchange, timeframe):
+    return (symbol, currency, (exchange or "CCCAGG").upper(), timeframe or "hour")
+
+
+class _Feed:
+    __slots__ = ("data", "fetched_at", "failed", "inflight", "subscribers")
+
+    def __init__(self):
+        self.data = None      # dict array read-only (terurut waktu) atau None
+        self.fetched_at = 0.0
+        self.failed = False   # Fetch terakhir gagal (dibagikan ke pemanggil yang menunggu fetch tsb.)
+        self.inflight = None  # threading.Event selama ada fetch berjalan untuk feed ini
+        self.subscribers = 0
+
+
+def _read_only(data):
+    for values in data.values(): values.setflags(write=False)
+    return data
+
+def _tail(data, n_rows):
+    if len(data["time"]) <= n_rows: return data
+    return {name: values[-n_rows:] for name, values in data.items()} # View: tetap read-only, tanpa copy
+
+def _merge(cached, fresh, capacity):
+    """Candle lama yang lebih tua dari fetch baru + hasil fetch baru (yang terakhir selalu menang). Jika fetch baru
+    tidak bersambung dengan cache (ada gap), cache lama dibuang."""
+    if cached is None or len(cached["time"]) == 0 or cached["time"][-1] < fresh["time"][0]:
+        merged = {name: np.array(values[-capacity:]) for name, values in fresh.items()}
+    else:
+        older = cached["time"] < fresh["time"][0]
+        merged = {name: np.concatenate([cached[name][older], fresh[name]])[-capacity:] for name in fresh}
+    return _read_only(merged)
+
+
+class FeedCache:
+    def __init__(self, max_feeds=DEFAULT_MAX_FEEDS, max_age=DEFAULT_MAX_AGE_SECONDS, capacity=DEFAULT_CAPACITY, clock=None):
+        self.max_feeds = max_feeds
+        self.max_age = max_age
+        self.capacity = capacity
+        self.clock = clock # None = time.time() modul ini, dicari saat dipanggil (replay.py mengganti `time` dgn clock virtual)
+        self._feeds = OrderedDict() # key -> _Feed, urutan LRU (paling baru dipakai di akhir)
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "miss": 0, "coalesced": 0, "evicted": 0}
+
+    def _now(self):
+        return time.time() if self.clock is None else self.clock()
+
+    def _feed(self, key):
+        feed = self._feeds.get(key)
+        if feed is None:
+            self._evict(self.max_feeds - 1)
+            feed = self._feeds[key] = _Feed()
+        self._feeds.move_to_end(key)
+        return feed
+
+    def _evict(self, max_feeds):
+        """Buang feed tanpa subscriber (dan tanpa fetch berjalan) mulai dari yang paling lama tidak dipakai."""
+        if len(self._feeds) <= max_feeds: return
+        for key in [k for k, f in self._feeds.items() if f.subscribers == 0 and f.inflight is None]:
+            del self._feeds[key]
+            self.stats["evicted"] += 1
+            if len(self._feeds) <= max_feeds: return
+
+    def subscribe(self, key, owner=None):
+        """Tandai feed sedang dipakai (tidak di-evict). Jika owner diberikan, subscription lepas otomatis saat
+        owner dibuang garbage collector."""
+        with self._lock:
+            self._feed(key).subscribers += 1
+        if owner is not None: weakref.finalize(owner, self.unsubscribe, key)
+
+    def unsubscribe(self, key):
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is not None and feed.subscribers > 0: feed.subscribers -= 1
+            self._evict(self.max_feeds)
+
+    def _covers(self, feed, n_rows):
+        return feed.data is not None and len(feed.data["time"]) >= n_rows
+
+    def _fresh(self, feed, n_rows, timeframe_seconds, now):
+        if not self._covers(feed, n_rows): return False
+        return now - feed.fetched_at <= self.max_age and now < int(feed.data["time"][-1]) + timeframe_seconds
+
+    def get(self, key, timeframe_seconds, limit, fetch):
+        """limit+1 candle terakhir untuk feed `key` (seperti respons CryptoCompare). fetch(limit) -> dict array
+        atau None, hanya dipanggil jika cache kedaluwarsa dan tidak ada fetch lain yang sedang berjalan."""
+        n_rows = limit + 1
+        while True:
+            with self._lock:
+                feed = self._feed(key)
+                if self._fresh(feed, n_rows, timeframe_seconds, self._now()):
+                    self.stats["hit"] += 1; inc("strategy_feed_cache_total", result="hit")
+                    return _tail(feed.data, n_rows)
+                leader = feed.inflight is None
+                if leader: feed.inflight = threading.Event()
+                inflight = feed.inflight
+            if leader: break
+            inflight.wait() # Fetch yang sedang berjalan untuk feed ini
+            with self._lock:
+                if feed.failed or self._covers(feed, n_rows):
+                    self.stats["coalesced"] += 1; inc("strategy_feed_cache_total", result="coalesced")
+                    return None if feed.failed else _tail(feed.data, n_rows)
+            # Fetch tadi lebih pendek dari kebutuhan pemanggil ini: ulangi (mungkin jadi leader)
+
+        data = None
+        try:
+            data = fetch(limit)
+        finally:
+            with self._lock:
+                feed.failed = data is None or len(data["time"]) == 0
+                if not feed.failed:
+                    feed.data = _merge(feed.data, data, max(self.capacity, n_rows))
+                    feed.fetched_at = self._now()
+                feed.inflight = None
+                inflight.set()
+                self.stats["miss"] += 1
+        inc("strategy_feed_cache_total", result="miss")
+        return data if feed.failed else _tail(feed.data, n_rows)
+
+    def info(self):
+        """Ringkasan isi cache: jumlah feed, candle tersimpan, subscriber per feed."""
+        with self._lock:
+            return {"feeds": {key: {"rows": 0 if f.data is None else len(f.data["time"]), "subscribers": f.subscribers}
+                              for key, f in self._feeds.items()}, **self.stats}
+
+
+# Satu cache per proses (seperti client CryptoCompare bersama). None = nonaktif.
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def shared_feed_cache():
+    return _shared_cache
+
+def configure_feed_cache(settings):
+    """Aktifkan cache bersama sesuai settings (dibuat sekali per proses), atau buang cache yang ada jika
+    enable_feed_cache = false. Return cache atau None jika nonaktif."""
+    global _shared_cache
+    with _shared_lock:
+        if not settings.get("enable_feed_cache", True):
+            _shared_cache = None
+            return None
+        if _shared_cache is None:
+            _shared_cache = FeedCache(settings.get("feed_cache_max_feeds", DEFAULT_MAX_FEEDS),
+                                      settings.get("feed_cache_max_age_seconds", DEFAULT_MAX_AGE_SECONDS))
+        return _shared_cache
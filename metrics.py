@@ -0,0 +1,185 @@
+# --- METRICS ---
+# Histogram + counter ringan untuk jalur panas (HTTP, decode JSON, merge, strategi, email, lag keputusan),
+# diekspor dalam format teks Prometheus lewat endpoint HTTP lokal dan/atau file yang ditulis ulang berkala.
+# Endpoint HTTP yang sama juga melayani /analytics: snapshot JSON analitik live (analytics.py).
+# Saat nonaktif (default) setiap hook hanya satu cek boolean: time_stage() mengembalikan timer kosong
+# yang sama, inc()/observe() langsung return.
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+METRIC_INFO = { # nama -> (tipe, help, bucket histogram)
+    "strategy_stage_seconds": ("histogram", "Durasi per tahap (http, json, decode, merge, strategy, email, poll)", STAGE_BUCKETS),
+    "strategy_decision_lag_seconds": ("histogram", "Jeda dari candle close sampai keputusan strategi untuk bar baru", LAG_BUCKETS),
+    "strategy_bars_processed_total": ("counter", "Jumlah bar yang diproses logika strategi", None),
+    "strategy_api_errors_total": ("counter", "Error API / koneksi CryptoCompare per jenis", None),
+    "strategy_signals_total": ("counter", "Sinyal entry / exit yang terpicu", None),
+    "strategy_notifications_dropped_total": ("counter", "Notifikasi yang dibuang karena antrian penuh", None),
+    "strategy_feed_cache_total": ("counter", "Fetch candle lewat cache feed bersama (hit / miss / coalesced)", None),
+}
+
+enabled = False
+_lock = threading.Lock()
+_counters = {}   # (nama, label) -> nilai
+_histograms = {} # (nama, label) -> [jumlah per bucket (+Inf terakhir), sum, count]
+_exporters = []
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def inc(name, amount=1, **labels):
+    if not enabled: return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    if not enabled: return
+    buckets = METRIC_INFO[name][2]
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(buckets, value)] += 1
+        histogram[1] += value; histogram[2] += 1
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("strategy_stage_seconds", time.perf_counter() - self.started, stage=self.stage)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_TIMER = _NullTimer()
+
+def time_stage(stage):
+    """with time_stage("http"): ... -> durasi masuk histogram strategy_stage_seconds{stage="http"}."""
+    return _StageTimer(stage) if enabled else _NULL_TIMER
+
+
+def reset():
+    with _lock:
+        _counters.clear(); _histograms.clear()
+
+
+# --- FORMAT PROMETHEUS ---
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+    lines = []
+    for name, (kind, help_text, buckets) in METRIC_INFO.items():
+        series = counters if kind == "counter" else histograms
+        keys = sorted(key for key in series if key[0] == name)
+        if not keys: continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key in keys:
+            labels = key[1]
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series[key])}")
+                continue
+            bucket_counts, total, count = series[key]
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ["+Inf"], bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+# --- EXPORTER ---
+# http.server baru di-import saat exporter HTTP dinyalakan (import metrics tetap ringan saat startup)
+def _metrics_handler_class():
+    from http.server import BaseHTTPRequestHandler
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == "/analytics": # Snapshot analitik live semua instrumen (analytics.py) sebagai JSON
+                from analytics import snapshot_all
+                body, content_type = json.dumps(snapshot_all(), default=str).encode(), "application/json"
+            elif path in ("/", "/metrics"):
+                body, content_type = render_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404); return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args): # Jangan ramaikan log trading dengan akses scrape
+            pass
+    return _MetricsHandler
+
+def start_http_exporter(port, host="127.0.0.1"):
+    """Endpoint /metrics di thread daemon. Return server (server.server_address untuk port sebenarnya)."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, port), _metrics_handler_class())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    _exporters.append(server)
+    return server
+
+def write_metrics_file(path):
+    """Tulis atomik (cocok untuk textfile collector node_exporter)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+def start_file_exporter(path, interval=15.0):
+    stop = threading.Event()
+    def loop():
+        while not stop.wait(interval):
+            try: write_metrics_file(path)
+            except OSError as e: logging.warning(f"Gagal menulis file metrics {path}: {e}")
+    threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+    _exporters.append(stop)
+    return stop
+
+def configure_metrics(settings):
+    """Aktifkan metrics + exporter sesuai settings (sekali per proses). Return True jika aktif."""
+    global enabled
+    if not settings.get("enable_metrics", False) or enabled: return enabled
+    enabled = True
+    port = settings.get("metrics_http_port", 0)
+    if port:
+        try:
+            server = start_http_exporter(port, settings.get("metrics_http_host", "127.0.0.1"))
+            logging.info(f"Metrics Prometheus: http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+        except OSError as e:
+            logging.warning(f"Endpoint metrics tidak bisa dibuka di port {port}: {e}")
+    if settings.get("metrics_file"):
+        start_file_exporter(settings["metrics_file"], settings.get("metrics_file_interval_seconds", 15))
+        logging.info(f"Metrics Prometheus ditulis ke {settings['metrics_file']}")
+    return True
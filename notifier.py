@@ -0,0 +1,195 @@
+# --- NOTIFICATION DISPATCHER ---
+# Notifikasi (email + beep) dikirim oleh thread background, bukan di jalur keputusan strategi.
+# - Antrian dibatasi (max_queue); jika penuh, pesan tertua/terbaru dibuang sesuai overflow_policy.
+# - Koneksi SMTP yang sudah login dipakai ulang dan otomatis reconnect jika terputus.
+# - Sinyal yang datang berdekatan (batch_window detik) digabung menjadi satu email digest per penerima.
+# smtplib / email hanya di-import oleh thread worker saat email pertama dikirim (startup tetap cepat).
+import logging
+import queue
+import threading
+import time
+
+from metrics import inc, time_stage
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+_SOUND = object() # Penanda event beep di antrian
+
+
+def email_config(settings):
+    """Ambil konfigurasi SMTP dari settings. Return None jika email nonaktif / tidak lengkap."""
+    if not settings.get("enable_email_notifications", False): return None
+    config = (settings.get("smtp_host", "smtp.gmail.com"), int(settings.get("smtp_port", 465)),
+              bool(settings.get("smtp_use_ssl", True)), settings.get("email_sender_address"),
+              settings.get("email_sender_app_password"), settings.get("email_receiver_address"))
+    return config if all(config[3:]) else None
+
+
+class NotificationDispatcher:
+    def __init__(self, max_queue=100, overflow_policy=OVERFLOW_DROP_OLDEST, batch_window=2.0,
+                 sound_fn=None, smtp_timeout=30, smtp_factory=None):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflow_policy = overflow_policy
+        self.batch_window = batch_window
+        self.sound_fn = sound_fn
+        self.smtp_timeout = smtp_timeout
+        self.smtp_factory = smtp_factory # Untuk test / SMTP lokal: fungsi (host, port, use_ssl, timeout) -> koneksi
+        self.stats = {"queued": 0, "dropped": 0, "emails_sent": 0, "messages_sent": 0, "send_errors": 0, "connects": 0}
+        self._stats_lock = threading.Lock() # stats ditulis thread produsen (banyak runner) dan thread worker
+        self._connections = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="notifier", daemon=True)
+        self._thread.start()
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    # --- SISI PRODUSEN (thread strategi, tidak pernah blocking) ---
+    def _enqueue(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                self._count("queued")
+                return True
+            except queue.Full:
+                if self.overflow_policy == OVERFLOW_DROP_NEWEST:
+                    self._count("dropped"); inc("strategy_notifications_dropped_total")
+                    logging.warning("Antrian notifikasi penuh, notifikasi baru dibuang.")
+                    return False
+                try:
+                    self.queue.get_nowait(); self.queue.task_done()
+                    self._count("dropped"); inc("strategy_notifications_dropped_total")
+                    logging.warning("Antrian notifikasi penuh, notifikasi tertua dibuang.")
+                except queue.Empty:
+                    pass
+
+    def submit_email(self, subject, body_text, settings):
+        config = email_config(settings)
+        if config is None:
+            if settings.get("enable_email_notifications", False):
+                logging.warning("Konfigurasi email tidak lengkap. Notifikasi email dilewati.")
+            return False
+        return self._enqueue((config, subject, body_text))
+
+    def submit_sound(self):
+        return self.sound_fn is not None and self._enqueue(_SOUND)
+
+    # --- SISI WORKER ---
+    def _collect_batch(self, first_item):
+        batch = [first_item]
+        deadline = time.monotonic() + self.batch_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set(): break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set(): break
+                continue
+            batch = self._collect_batch(item)
+            try:
+                self._handle_batch(batch)
+            except Exception as e: # Worker tidak boleh mati
+                logging.error(f"Error di dispatcher notifikasi: {e}")
+            finally:
+                for _ in batch: self.queue.task_done()
+        self._close_connections()
+
+    def _handle_batch(self, batch):
+        if any(item is _SOUND for item in batch):
+            try: self.sound_fn()
+            except Exception as e: logging.warning(f"Tidak bisa memainkan suara notifikasi: {e}")
+        grouped = {}
+        for item in batch:
+            if item is _SOUND: continue
+            config, subject, body_text = item
+            grouped.setdefault(config, []).append((subject, body_text))
+        for config, messages in grouped.items():
+            if len(messages) == 1:
+                subject, body_text = messages[0]
+            else:
+                subject = f"{len(messages)} sinyal trading: " + "; ".join(m[0] for m in messages[:3]) + (" ..." if len(messages) > 3 else "")
+                body_text = "\n\n".join(f"=== {i}. {s} ===\n{b}" for i, (s, b) in enumerate(messages, start=1))
+            if self._send(config, subject, body_text):
+                self._count("emails_sent"); self._count("messages_sent", len(messages))
+
+    def _connect(self, config):
+        import smtplib
+        host, port, use_ssl, sender, password, _ = config
+        if self.smtp_factory is not None:
+            conn = self.smtp_factory(host, port, use_ssl, self.smtp_timeout)
+        elif use_ssl:
+            conn = smtplib.SMTP_SSL(host, port, timeout=self.smtp_timeout)
+        else:
+            conn = smtplib.SMTP(host, port, timeout=self.smtp_timeout)
+        conn.ehlo_or_helo_if_needed()
+        if password and conn.has_extn("auth"): conn.login(sender, password) # SMTP lokal untuk test biasanya tanpa AUTH
+        self._count("connects")
+        return conn
+
+    def _send(self, config, subject, body_text):
+        import smtplib
+        from email.mime.text import MIMEText
+        _, _, _, sender, _, receiver = config
+        msg = MIMEText(body_text)
+        msg['Subject'] = subject; msg['From'] = sender; msg['To'] = receiver
+        key = config[:5]
+        for attempt in range(2): # Sekali reconnect jika koneksi lama sudah diputus server
+            try:
+                with time_stage("email"):
+                    conn = self._connections.get(key)
+                    if conn is None:
+                        conn = self._connections[key] = self._connect(config)
+                    conn.sendmail(sender, receiver, msg.as_string())
+                logging.info(f"Notifikasi email berhasil dikirim ke {receiver}")
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, OSError) as e:
+                self._drop_connection(key)
+                if attempt == 0:
+                    logging.debug(f"Koneksi SMTP terputus ({e}), reconnect...")
+                    continue
+                error = e
+            except smtplib.SMTPException as e:
+                self._drop_connection(key)
+                error = e
+                break
+        self._count("send_errors")
+        logging.error(f"Gagal mengirim email notifikasi: {error}")
+        return False
+
+    def _drop_connection(self, key):
+        conn = self._connections.pop(key, None)
+        if conn is not None:
+            try: conn.close()
+            except Exception: pass
+
+    def _close_connections(self):
+        for key, conn in list(self._connections.items()):
+            try: conn.quit()
+            except Exception: pass
+            self._connections.pop(key, None)
+
+    # --- KONTROL ---
+    def flush(self, timeout=None):
+        """Tunggu sampai antrian kosong dan batch terakhir terkirim. Return True jika selesai sebelum timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=10):
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
@@ -0,0 +1,283 @@
+# --- PARAMETER SWEEP OPTIMIZER ---
+# Sweep parameter strategi (grid / random / successive halving) memakai backtest vektor di backtest.py,
+# dibagi ke semua core. Array OHLC ditaruh di shared memory sehingga worker membacanya zero-copy,
+# dan mask pivot (yang hanya bergantung pada left/right strength) dihitung sekali per pasangan (left, right)
+# lalu dipakai ulang oleh semua kombinasi parameter trading.
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from backtest import OHLCV_COLUMNS, compute_entry_signals, find_pivots_np, load_ohlcv, simulate_trades, summarize_trades
+
+SWEEP_KEYS = ("left_strength", "right_strength", "profit_target_percent_activation", "trailing_stop_gap_percent",
+              "emergency_sl_percent", "enable_secure_fib", "secure_fib_check_price")
+INT_KEYS = ("left_strength", "right_strength")
+BOOL_KEYS = ("enable_secure_fib",)
+DEFAULT_RANK_BY = "compounded_return_percent"
+DATA_COLUMNS = ("time",) + OHLCV_COLUMNS # volume ikut: secure_fib_check_price boleh "Volume"
+MAX_COMBOS_PER_TASK = 64
+
+
+# --- PARSING RANGE ---
+def _convert(key, value):
+    if key in BOOL_KEYS:
+        if isinstance(value, bool): return value
+        lowered = str(value).strip().lower()
+        if lowered not in ("true", "false"): raise ValueError(f"Nilai {key} harus true/false: {value}")
+        return lowered == "true"
+    if key in INT_KEYS: return int(value)
+    if key == "secure_fib_check_price": return str(value).strip().capitalize()
+    return float(value)
+
+def parse_range(key, spec):
+    """'20:60:10' -> [20, 30, .., 60] (inklusif), '1.5,3,5' -> daftar nilai, 'true,false' untuk boolean."""
+    if key not in SWEEP_KEYS: raise ValueError(f"Parameter tidak bisa di-sweep: {key} (pilihan: {', '.join(SWEEP_KEYS)})")
+    if ':' in spec:
+        parts = spec.split(':')
+        if len(parts) != 3: raise ValueError(f"Range harus start:stop:step, bukan '{spec}'")
+        start, stop, step = (float(p) for p in parts)
+        if step <= 0: raise ValueError(f"Step range {key} harus > 0")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [_convert(key, round(start + i * step, 10)) for i in range(max(count, 0))]
+    return [_convert(key, v) for v in spec.split(',') if v.strip()]
+
+def build_grid(ranges, base_settings):
+    """Produk kartesius semua range; key yang tidak di-sweep memakai nilai dari base_settings."""
+    keys = [k for k in SWEEP_KEYS if k in ranges]
+    fixed = {k: _convert(k, base_settings[k]) for k in SWEEP_KEYS if k not in ranges}
+    return [dict(fixed, **dict(zip(keys, values))) for values in itertools.product(*(ranges[k] for k in keys))]
+
+
+# --- SHARED MEMORY ---
+def _attach_shared(name):
+    # Segment milik proses induk (yang juga meng-unlink); worker Pool berbagi resource tracker dengan induk
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class SharedArrays:
+    """Kumpulan array NumPy di shared memory; spec (nama, dtype, shape) cukup kecil untuk dikirim ke worker."""
+    def __init__(self):
+        self.segments = []
+        self.spec = {}
+
+    def put(self, key, array):
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[...] = array
+        self.segments.append(shm)
+        self.spec[key] = (shm.name, array.dtype.str, array.shape)
+        return view
+
+    def close(self):
+        for shm in self.segments:
+            shm.close(); shm.unlink()
+        self.segments = []; self.spec = {}
+
+def attach_arrays(spec):
+    segments, arrays = [], {}
+    for key, (name, dtype, shape) in spec.items():
+        shm = _attach_shared(name)
+        segments.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return segments, arrays
+
+
+# --- WORKER ---
+_worker = {"segments": [], "data": None, "pivots": None, "signals": {}}
+
+def _init_worker(spec):
+    segments, arrays = attach_arrays(spec)
+    _worker["segments"] = segments # Simpan referensi agar buffer tetap hidup
+    _worker["pivots"] = arrays.pop("pivots")
+    _worker["data"] = arrays
+    _worker["signals"] = {}
+
+def _prefix_data(data, n_bars):
+    return {key: arr[:n_bars] for key, arr in data.items()}
+
+def _compute_pivot_row(task):
+    row, left_strength, right_strength = task
+    data, pivots = _worker["data"], _worker["pivots"]
+    pivots[row, 0] = find_pivots_np(data["high"], left_strength, right_strength, True)
+    pivots[row, 1] = find_pivots_np(data["low"], left_strength, right_strength, False)
+    return row
+
+def _evaluate_task(task):
+    row, n_bars, combos = task
+    data = _prefix_data(_worker["data"], n_bars)
+    full_bars = len(_worker["data"]["close"])
+    results = []
+    for combo in combos:
+        left_strength, right_strength = combo["left_strength"], combo["right_strength"]
+        signal_key = (row, n_bars, combo["enable_secure_fib"], combo["secure_fib_check_price"])
+        signals = _worker["signals"].get(signal_key)
+        if signals is None:
+            pivot_highs, pivot_lows = _worker["pivots"][row, 0, :n_bars], _worker["pivots"][row, 1, :n_bars]
+            if n_bars < full_bars: # Pivot yang baru terkonfirmasi sesudah prefix tidak boleh terlihat
+                cutoff = max(0, n_bars - right_strength)
+                pivot_highs = pivot_highs.copy(); pivot_highs[cutoff:] = False
+                pivot_lows = pivot_lows.copy(); pivot_lows[cutoff:] = False
+            signals = compute_entry_signals(data, left_strength, right_strength, combo["enable_secure_fib"],
+                                            combo["secure_fib_check_price"], pivot_highs, pivot_lows)
+            if len(_worker["signals"]) > 256: _worker["signals"].clear()
+            _worker["signals"][signal_key] = signals
+        trades = simulate_trades(data, signals, combo["profit_target_percent_activation"],
+                                 combo["trailing_stop_gap_percent"], combo["emergency_sl_percent"])
+        results.append((combo, summarize_trades(trades, n_bars)))
+    return results
+
+
+# --- SWEEP ---
+def _rank_key(rank_by, min_trades):
+    def key(result):
+        combo, summary = result
+        value = summary.get(rank_by, 0.0)
+        if isinstance(value, float) and math.isnan(value): value = -math.inf
+        return (summary["trades"] >= min_trades, value, summary["trades"])
+    return key
+
+def _make_tasks(combos, pair_rows, n_bars):
+    grouped = {}
+    for combo in combos:
+        grouped.setdefault((combo["left_strength"], combo["right_strength"]), []).append(combo)
+    tasks = []
+    for pair, group in grouped.items():
+        # Kombinasi dengan secure fib yang sama berdekatan agar cache sinyal di worker terpakai
+        group.sort(key=lambda c: (c["enable_secure_fib"], c["secure_fib_check_price"]))
+        for i in range(0, len(group), MAX_COMBOS_PER_TASK):
+            tasks.append((pair_rows[pair], n_bars, group[i:i + MAX_COMBOS_PER_TASK]))
+    return tasks
+
+def run_sweep(data, combos, mode="grid", samples=None, eta=3, workers=None, rank_by=DEFAULT_RANK_BY,
+              min_trades=1, seed=0, progress=True):
+    """Evaluasi kombinasi parameter secara paralel. Return list (combo, summary) terurut dari yang terbaik."""
+    if mode not in ("grid", "random", "halving"): raise ValueError(f"Mode sweep tidak dikenal: {mode}")
+    combos = list(combos)
+    if mode == "random" and samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    if not combos: return []
+    n_total = len(data["close"])
+    pairs = sorted({(c["left_strength"], c["right_strength"]) for c in combos})
+    pair_rows = {pair: row for row, pair in enumerate(pairs)}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(combos)))
+    rank_key = _rank_key(rank_by, min_trades)
+
+    shared = SharedArrays()
+    try:
+        for key in DATA_COLUMNS: shared.put(key, data[key] if key in data else np.full(n_total, np.nan))
+        shared.put("pivots", np.zeros((len(pairs), 2, n_total), dtype=bool))
+        with Pool(processes=workers, initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            started = time.perf_counter()
+            # Tahap 1: pivot dihitung sekali per pasangan (left, right), langsung ditulis ke shared memory
+            list(pool.imap_unordered(_compute_pivot_row, [(row, l, r) for (l, r), row in pair_rows.items()]))
+            if progress: print(f"Pivot untuk {len(pairs)} pasangan (left, right) selesai dalam {time.perf_counter() - started:.2f} detik")
+
+            # Tahap 2: evaluasi kombinasi. Successive halving memakai prefix histori yang makin panjang.
+            if mode == "halving" and len(combos) > 1:
+                rounds = max(1, math.ceil(math.log(len(combos), eta)))
+                min_bars = min(n_total, 10 * max(l + r + 1 for l, r in pairs)) # Prefix terlalu pendek tidak punya pivot
+                budgets = [max(min_bars, int(n_total / eta ** (rounds - 1 - i))) for i in range(rounds)]
+            else:
+                budgets = [n_total]
+            candidates = combos
+            for round_index, n_bars in enumerate(budgets):
+                results = []
+                for chunk in pool.imap_unordered(_evaluate_task, _make_tasks(candidates, pair_rows, n_bars)):
+                    results.extend(chunk)
+                results.sort(key=rank_key, reverse=True)
+                if progress:
+                    print(f"Ronde {round_index + 1}/{len(budgets)}: {len(candidates)} kombinasi x {n_bars} bar "
+                          f"({time.perf_counter() - started:.2f} detik)")
+                if round_index < len(budgets) - 1:
+                    candidates = [combo for combo, _ in results[:max(1, len(results) // eta)]]
+            return results
+    finally:
+        shared.close()
+
+
+# --- OUTPUT ---
+TABLE_METRICS = ("trades", "win_rate_percent", "compounded_return_percent", "max_drawdown_percent", "profit_factor")
+
+def _result_row(rank, combo, summary):
+    row = {"rank": rank}
+    row.update(combo)
+    for key in TABLE_METRICS + ("total_pnl_percent", "avg_pnl_percent", "avg_bars_held"):
+        row[key] = summary[key]
+    for reason, count in summary["exit_reasons"].items():
+        row[f"exits_{reason.lower().replace(' ', '_')}"] = count
+    return row
+
+def print_ranked_table(results, top=20):
+    header = ["#"] + ["L", "R", "Aktiv%", "Gap%", "SL%", "SecFIB", "Cek"] + ["Trades", "Win%", "Return%", "MaxDD%", "PF"]
+    print(" ".join(f"{h:>8}" for h in header))
+    for rank, (combo, summary) in enumerate(results[:top], start=1):
+        cells = [str(rank)] + [str(combo[k]) for k in SWEEP_KEYS] + \
+                [str(summary["trades"])] + [f"{summary[k]:.2f}" for k in TABLE_METRICS[1:]]
+        print(" ".join(f"{c:>8}" for c in cells))
+
+def write_results_csv(results, path):
+    rows = [_result_row(rank, combo, summary) for rank, (combo, summary) in enumerate(results, start=1)]
+    if not rows: return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader(); writer.writerows(rows)
+
+def export_best_to_settings(results, path=None):
+    """Tulis parameter baris terbaik ke settings.json. Hanya nilai parameter itu yang diganti; field lain dan
+    komentar di file tetap."""
+    from strategy_runner import update_settings_file
+    best_combo = results[0][0]
+    update_settings_file(best_combo, path)
+    return best_combo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep parameter strategi pivot/FIB secara paralel atas file OHLCV")
+    parser.add_argument("data_file")
+    parser.add_argument("--range", dest="ranges", action="append", default=[], metavar="KEY=SPEC",
+                        help="Range parameter, misal left_strength=20:60:10 atau enable_secure_fib=true,false")
+    parser.add_argument("--mode", choices=["grid", "random", "halving"], default="grid")
+    parser.add_argument("--samples", type=int, help="Jumlah sampel untuk mode random")
+    parser.add_argument("--eta", type=int, default=3, help="Faktor eliminasi successive halving")
+    parser.add_argument("--workers", type=int, help="Jumlah proses (default: semua core)")
+    parser.add_argument("--rank-by", default=DEFAULT_RANK_BY, help="Metrik ringkasan untuk ranking")
+    parser.add_argument("--min-trades", type=int, default=1, help="Kombinasi dengan trade lebih sedikit diurutkan paling bawah")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="Simpan seluruh tabel ranking ke CSV")
+    parser.add_argument("--export-best", action="store_true", help="Tulis parameter terbaik ke settings.json")
+    args = parser.parse_args(argv)
+
+    from strategy_runner import load_settings
+    base_settings = load_settings()
+    ranges = {}
+    for item in args.ranges:
+        key, sep, spec = item.partition('=')
+        if not sep: parser.error(f"--range harus berbentuk KEY=SPEC: {item}")
+        ranges[key.strip()] = parse_range(key.strip(), spec)
+    combos = build_grid(ranges, base_settings)
+    data = load_ohlcv(args.data_file)
+    print(f"{len(combos)} kombinasi, {len(data['close'])} bar, mode {args.mode}")
+
+    started = time.perf_counter()
+    results = run_sweep(data, combos, mode=args.mode, samples=args.samples, eta=args.eta, workers=args.workers,
+                        rank_by=args.rank_by, min_trades=args.min_trades, seed=args.seed)
+    print(f"Sweep selesai dalam {time.perf_counter() - started:.2f} detik\n")
+    print_ranked_table(results, args.top)
+    if args.csv: write_results_csv(results, args.csv)
+    if args.export_best and results:
+        export_best_to_settings(results)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+# --- REPLAY DIPERCEPAT + MOCK CRYPTOCOMPARE ---
+# Server HTTP lokal pengganti /data/v2/histominute|histohour|histoday yang menyajikan candle dari file
+# (.csv/.npz, format backtest.load_ohlcv) atau data sintetis, menurut clock virtual yang bisa dipercepat
+# (mis. 1000x) atau melompat (speedup 0: waktu hanya maju saat loop tidur). Latency, error HTTP, dan
+# balasan rate limit bisa disuntikkan. Harness menjalankan loop live asli (run_live_loop) terhadap server ini
+# dengan waktu virtual menggantikan time.sleep, lalu melaporkan throughput, latency keputusan, dan selisih
+# trade terhadap backtest offline atas data yang sama.
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from backtest import EXIT_OPEN, load_ohlcv, parse_setting_overrides, run_backtest
+
+ENDPOINT_SECONDS = {"histominute": 60, "histohour": 3600, "histoday": 86400}
+TIMEFRAME_ENDPOINTS = {"minute": "histominute", "hour": "histohour", "day": "histoday"}
+RATE_LIMIT_MESSAGE = "You are over your rate limit please upgrade your account!"
+FORMING_MODES = ("partial", "final") # Candle yang masih terbentuk: sebagian (realistis) atau nilai akhir (bocor)
+
+
+class ReplayFinished(Exception):
+    """Clock virtual sudah melewati akhir data: loop live dihentikan."""
+
+
+# --- CLOCK VIRTUAL ---
+class VirtualClock:
+    """speedup > 0: waktu virtual berjalan speedup x waktu nyata, sleep() tidur 1/speedup-nya.
+    speedup = 0: waktu hanya maju lewat sleep() (tanpa menunggu sungguhan, deterministik)."""
+    def __init__(self, start, speedup=0.0, end=None):
+        self.speedup = speedup
+        self.end = end
+        self._lock = threading.Lock()
+        self._virtual_start = float(start)
+        self._real_start = time.monotonic()
+
+    def time(self):
+        with self._lock:
+            if not self.speedup: return self._virtual_start
+            return self._virtual_start + (time.monotonic() - self._real_start) * self.speedup
+
+    def sleep(self, seconds):
+        seconds = max(0.0, seconds)
+        if self.end is not None and self.time() + seconds > self.end: raise ReplayFinished()
+        if self.speedup:
+            time.sleep(seconds / self.speedup)
+        else:
+            with self._lock: self._virtual_start += seconds
+
+    def as_time_module(self):
+        """Objek pengganti modul time untuk strategy_runner / scheduler (perf_counter tetap nyata)."""
+        return types.SimpleNamespace(time=self.time, sleep=self.sleep, monotonic=self.time, perf_counter=time.perf_counter)
+
+
+# --- DATA CANDLE ---
+def infer_timeframe_seconds(times):
+    if len(times) < 2: raise ValueError("Butuh minimal 2 candle untuk menentukan timeframe data")
+    return int(np.median(np.diff(times)))
+
+def resample(data, timeframe_seconds):
+    """Agregasi candle ke timeframe lebih besar (bucket = time - time % timeframe)."""
+    buckets = data["time"] - data["time"] % timeframe_seconds
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {"time": buckets[starts], "open": data["open"][starts],
+            "high": np.maximum.reduceat(data["high"], starts), "low": np.minimum.reduceat(data["low"], starts),
+            "close": data["close"][ends], "volume": np.add.reduceat(np.nan_to_num(data["volume"]), starts)}
+
+class CandleFeed:
+    """Candle yang terlihat pada waktu `now`: bar dengan time <= now; bar terakhir (belum close) dibentuk dari
+    candle dasar yang sudah close + open candle dasar yang sedang berjalan (mode partial)."""
+    def __init__(self, data, forming="partial"):
+        if forming not in FORMING_MODES: raise ValueError(f"forming harus salah satu dari {FORMING_MODES}")
+        self.data = data
+        self.base_seconds = infer_timeframe_seconds(data["time"])
+        self.forming = forming
+        self._bars = {self.base_seconds: data}
+        self._lock = threading.Lock()
+
+    def bars(self, timeframe_seconds):
+        if timeframe_seconds < self.base_seconds:
+            raise ValueError(f"Data dasar {self.base_seconds}s tidak bisa disajikan sebagai timeframe {timeframe_seconds}s")
+        with self._lock:
+            if timeframe_seconds not in self._bars: self._bars[timeframe_seconds] = resample(self.data, timeframe_seconds)
+            return self._bars[timeframe_seconds]
+
+    def _forming_bar(self, bucket_time, now):
+        base = self.data
+        first = int(np.searchsorted(base["time"], bucket_time))
+        stop = int(np.searchsorted(base["time"], now, side="right"))
+        if stop <= first: return None # Belum ada candle dasar di bucket ini (data tidak rata dengan batas timeframe)
+        closed = slice(first, stop - 1) if base["time"][stop - 1] + self.base_seconds > now else slice(first, stop)
+        running_open = base["open"][stop - 1] if closed.stop < stop else None
+        highs, lows = list(base["high"][closed]), list(base["low"][closed])
+        if running_open is not None: highs.append(running_open); lows.append(running_open)
+        close = running_open if running_open is not None else base["close"][stop - 1]
+        return (int(bucket_time), float(base["open"][first]), float(max(highs)), float(min(lows)), float(close),
+                float(np.nansum(base["volume"][closed])))
+
+    def histo(self, timeframe_seconds, limit, to_ts=None, now=None):
+        """limit+1 candle terakhir dengan time <= min(toTs, now), format Data.Data CryptoCompare."""
+        bars = self.bars(timeframe_seconds)
+        end = now if to_ts is None else min(int(to_ts), now)
+        stop = int(np.searchsorted(bars["time"], end, side="right"))
+        start = max(0, stop - (int(limit) + 1))
+        columns = [bars[name][start:stop].tolist() for name in ("time", "open", "high", "low", "close", "volume")]
+        rows = list(zip(*columns))
+        if rows and self.forming == "partial" and rows[-1][0] + timeframe_seconds > now:
+            forming_bar = self._forming_bar(rows[-1][0], now)
+            if forming_bar is None: rows.pop()
+            else: rows[-1] = forming_bar
+        return [{"time": int(t), "open": o, "high": h, "low": l, "close": c, "volumefrom": v, "volumeto": v * c,
+                 "conversionType": "direct", "conversionSymbol": ""} for t, o, h, l, c, v in rows]
+
+
+# --- MOCK SERVER ---
+class _MockHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.mock.handle(self)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockCryptoCompareServer:
+    """Server lokal /data/v2/histo*. latency/jitter dalam detik nyata; error_rate & rate_limit_rate = peluang per
+    request; rate_limit_per_second = limit request per detik virtual (di atasnya dibalas pesan rate limit), sama
+    dengan clock budget rate limit client saat replay."""
+    def __init__(self, feed, clock, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 rate_limit_per_second=0, seed=0, host="127.0.0.1", port=0):
+        self.feed = feed
+        self.clock = clock
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.rate_limit_rate = error_rate, rate_limit_rate
+        self.rate_limit_per_second = rate_limit_per_second
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "ok": 0, "errors_injected": 0, "rate_limited": 0, "bad_requests": 0}
+        self._lock = threading.Lock()
+        self._second, self._second_count = None, 0
+        self.httpd = ThreadingHTTPServer((host, port), _MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/data/v2"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-cryptocompare", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+    def _count(self, key):
+        with self._lock: self.stats[key] += 1
+
+    def _decide(self):
+        """Return "error", "rate_limit", atau None untuk request ini."""
+        with self._lock:
+            self.stats["requests"] += 1
+            second = int(self.clock.time())
+            if second != self._second: self._second, self._second_count = second, 0
+            self._second_count += 1
+            if self.rate_limit_per_second and self._second_count > self.rate_limit_per_second: return "rate_limit"
+            roll = self.random.random()
+            if roll < self.error_rate: return "error"
+            if roll < self.error_rate + self.rate_limit_rate: return "rate_limit"
+            return None
+
+    def _send(self, handler, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0: time.sleep(delay)
+        outcome = self._decide()
+        if outcome == "error":
+            self._count("errors_injected")
+            self._send(handler, self.random.choice((500, 502, 503)), {"Response": "Error", "Message": "Injected error"})
+            return
+        if outcome == "rate_limit":
+            self._count("rate_limited")
+            self._send(handler, 200, {"Response": "Error", "Message": RATE_LIMIT_MESSAGE, "Type": 99, "Data": {}})
+            return
+        try:
+            timeframe_seconds = ENDPOINT_SECONDS[endpoint]
+            rows = self.feed.histo(timeframe_seconds, int(params.get("limit", 1999)), params.get("toTs"), self.clock.time())
+        except (KeyError, ValueError) as e:
+            self._count("bad_requests")
+            self._send(handler, 200, {"Response": "Error", "Message": f"Bad request: {e}", "Data": {}})
+            return
+        self._count("ok")
+        self._send(handler, 200, {"Response": "Success", "Message": "", "HasWarning": False, "Type": 100,
+                                  "Data": {"Aggregated": False, "TimeFrom": rows[0]["time"] if rows else None,
+                                           "TimeTo": rows[-1]["time"] if rows else None, "Data": rows}})
+
+
+# --- HARNESS ---
+class _TradeEventCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def emit(self, record):
+        self.events.append(dict(record.msg))
+
+@contextmanager
+def live_replay_environment(clock, base_url, quiet=True):
+    """strategy_runner memakai clock virtual + server mock, tanpa notifikasi; event trade ditangkap di memori."""
+    import cryptocompare_client
+    import feed_cache
+    import scheduler
+    import strategy_runner as runner
+    from event_log import TRADE_EVENT_LOGGER
+    virtual_time = clock.as_time_module()
+    saved = (runner.time, scheduler.time, feed_cache.time, cryptocompare_client.BASE_URL, runner.notify_signal, cryptocompare_client._shared_client)
+    events_logger = logging.getLogger(TRADE_EVENT_LOGGER)
+    saved_events = (events_logger.level, events_logger.propagate)
+    root = logging.getLogger(); saved_level = root.level
+    collector = _TradeEventCollector()
+    runner.time = scheduler.time = feed_cache.time = virtual_time
+    cryptocompare_client.BASE_URL = base_url
+    runner.notify_signal = lambda *args, **kwargs: None
+    cryptocompare_client.configure_client(sleep=clock.sleep, clock=clock.time, backoff_base=1.0)
+    events_logger.setLevel(logging.INFO); events_logger.propagate = False; events_logger.addHandler(collector)
+    if quiet: root.setLevel(logging.WARNING) # Bukan logging.disable: logger trade_events harus tetap aktif
+    try:
+        yield runner, collector
+    finally:
+        runner.time, scheduler.time, feed_cache.time, cryptocompare_client.BASE_URL, runner.notify_signal, cryptocompare_client._shared_client = saved
+        events_logger.removeHandler(collector); events_logger.setLevel(saved_events[0]); events_logger.propagate = saved_events[1]
+        root.setLevel(saved_level)
+
+def _epoch(value):
+    from datetime import datetime, timezone
+    if isinstance(value, datetime): return int(value.replace(tzinfo=timezone.utc).timestamp())
+    return int(value)
+
+def live_trades(events):
+    """Pasangkan event entry/exit jadi trade (format mirip ledger backtest)."""
+    trades, current = [], None
+    for event in events:
+        if event["event"] == "entry":
+            current = {"entry_time": _epoch(event["bar_time"]), "entry_price": event["price"]}
+        elif event["event"] == "exit" and current is not None:
+            current.update(exit_time=_epoch(event["bar_time"]), exit_price=event["price"], exit_reason=event["reason"],
+                           pnl_percent=event["pnl_percent"])
+            trades.append(current); current = None
+    if current is not None: trades.append(dict(current, exit_reason=EXIT_OPEN))
+    return trades
+
+def compare_trades(live, reference):
+    """Selisih trade live vs backtest: dicocokkan per waktu entry."""
+    by_entry = {t["entry_time"]: t for t in reference}
+    matched = [(t, by_entry[t["entry_time"]]) for t in live if t["entry_time"] in by_entry]
+    live_entries = {t["entry_time"] for t in live}
+    same_exit = sum(1 for a, b in matched if a["exit_reason"] == b["exit_reason"] and
+                    (a["exit_reason"] == EXIT_OPEN or (a["exit_time"], a["exit_price"]) == (b["exit_time"], b["exit_price"])))
+    closed_pnl = lambda trades: float(sum(t["pnl_percent"] for t in trades if t["exit_reason"] != EXIT_OPEN))
+    return {"live_trades": len(live), "backtest_trades": len(reference), "matched_entries": len(matched),
+            "identical_trades": same_exit, "only_live": len(live) - len(matched),
+            "only_backtest": sum(1 for t in reference if t["entry_time"] not in live_entries),
+            "max_entry_price_diff": max((abs(a["entry_price"] - b["entry_price"]) for a, b in matched), default=0.0),
+            "live_total_pnl_percent": closed_pnl(live), "backtest_total_pnl_percent": closed_pnl(reference)}
+
+def _latency_summary(values, scale=1.0):
+    if not values: return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"p50": round(float(p50) * scale, 3), "p95": round(float(p95) * scale, 3), "max": round(float(max(values)) * scale, 3)}
+
+def run_replay(data, settings, speedup=0.0, start_bar=None, forming="partial", latency=0.0, jitter=0.0, error_rate=0.0,
+               rate_limit_rate=0.0, rate_limit_per_second=0, seed=0, quiet=True):
+    """Jalankan loop live terhadap mock server dari bar start_bar sampai akhir data. Return dict laporan."""
+    feed = CandleFeed(data, forming)
+    timeframe = settings.get("timeframe", "hour")
+    timeframe_seconds = ENDPOINT_SECONDS[TIMEFRAME_ENDPOINTS[timeframe]]
+    bars = feed.bars(timeframe_seconds)
+    n_bars = len(bars["time"])
+    min_bars = settings["left_strength"] + settings["right_strength"] + 1
+    if start_bar is None: start_bar = min(n_bars - 1, max(2 * min_bars, 500))
+    if not 0 < start_bar < n_bars: raise ValueError(f"start_bar harus di antara 1 dan {n_bars - 1}")
+    settings = dict(settings, api_key=settings.get("api_key") or "replay", enable_candle_store=False,
+                    enable_checkpoint=False, enable_email_notifications=False, enable_metrics=False)
+    start_time = int(bars["time"][start_bar]) + settings.get("candle_close_grace_seconds", 2)
+    end_time = int(bars["time"][-1]) + timeframe_seconds
+    clock = VirtualClock(start_time, speedup, end=end_time)
+    server = MockCryptoCompareServer(feed, clock, latency, jitter, error_rate, rate_limit_rate, rate_limit_per_second, seed).start()
+    polls, process_seconds, close_lags = [], [], []
+    real_started = time.perf_counter()
+    try:
+        with live_replay_environment(clock, server.base_url, quiet) as (runner_module, collector):
+            runner = runner_module.make_runner(settings)
+            runner.fetch_limit = min(runner.fetch_limit, start_bar) # Warmup hanya dari histori sebelum start_bar
+            if not runner.initialize(): raise RuntimeError("Warmup gagal: server mock tidak mengembalikan data")
+            collector.events.clear() # Event warmup bukan bagian replay
+            poll = runner.poll
+            def recorded_poll():
+                stats = poll()
+                polls.append(stats)
+                if stats.get("new_bars"):
+                    process_seconds.append(stats["total"]); close_lags.append(stats.get("close_lag", 0.0))
+                return stats
+            runner.poll = recorded_poll
+            try:
+                runner_module.run_live_loop(runner)
+            except ReplayFinished:
+                pass
+            events = list(collector.events)
+            client_stats = runner_module.get_client()
+            retries = client_stats.retries
+    finally:
+        server.stop()
+    real_seconds = time.perf_counter() - real_started
+    replayed_bars = n_bars - start_bar
+    reference = [t for t in run_backtest(bars, settings)[0] if t["entry_bar"] >= start_bar]
+    trades = live_trades(events)
+    return {
+        "bars": replayed_bars, "virtual_seconds": end_time - start_time, "real_seconds": round(real_seconds, 3),
+        "effective_speedup": round((end_time - start_time) / real_seconds, 1) if real_seconds > 0 else 0.0,
+        "throughput": {"bars_per_second": round(replayed_bars / real_seconds, 1) if real_seconds > 0 else 0.0,
+                       "polls": len(polls), "failed_polls": sum(1 for p in polls if not p["ok"]),
+                       "polls_per_second": round(len(polls) / real_seconds, 1) if real_seconds > 0 else 0.0},
+        "decision_latency_ms": _latency_summary(process_seconds, 1000.0),
+        "close_lag_seconds": _latency_summary(close_lags),
+        "server": dict(server.stats), "client_retries": retries,
+        "trade_events": len(events), "divergence": compare_trades(trades, reference),
+    }
+
+
+# --- CLI ---
+def print_report(report):
+    print("\n--- Replay ---")
+    print(f"{report['bars']} bar, {report['virtual_seconds'] / 3600:.1f} jam virtual dalam {report['real_seconds']:.2f}s "
+          f"(~{report['effective_speedup']:.0f}x)")
+    throughput = report["throughput"]
+    print(f"Throughput: {throughput['bars_per_second']} bar/s, {throughput['polls']} poll ({throughput['failed_polls']} gagal), "
+          f"{throughput['polls_per_second']} poll/s")
+    latency = report["decision_latency_ms"]; lag = report["close_lag_seconds"]
+    print(f"Latency keputusan (poll dengan bar baru): p50 {latency['p50']} ms, p95 {latency['p95']} ms, max {latency['max']} ms")
+    print(f"Jeda sejak candle close (virtual): p50 {lag['p50']} s, p95 {lag['p95']} s, max {lag['max']} s")
+    print(f"Server: {report['server']} | retry client: {report['client_retries']}")
+    print("\n--- Selisih vs Backtest ---")
+    for key, value in report["divergence"].items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay loop live terhadap mock CryptoCompare lokal dengan waktu virtual")
+    parser.add_argument("data_file", nargs="?", help="File OHLCV .csv/.npz (tanpa file: data sintetis)")
+    parser.add_argument("--synthetic-bars", type=int, default=3000, help="Jumlah candle sintetis jika tanpa file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speedup", type=float, default=0.0, help="Kecepatan clock virtual (0 = lompat, tanpa menunggu)")
+    parser.add_argument("--start-bar", type=int, help="Bar pertama yang diproses live (sebelumnya = histori warmup)")
+    parser.add_argument("--forming", choices=FORMING_MODES, default="partial", help="Isi candle yang masih terbentuk")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang HTTP 5xx per request")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Peluang balasan rate limit per request")
+    parser.add_argument("--rate-limit-per-second", type=int, default=0, help="Limit request per detik virtual di server (0 = tanpa)")
+    parser.add_argument("--set", dest="overrides", action="append", metavar="KEY=VALUE", help="Override settings strategi")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan log INFO loop live")
+    parser.add_argument("--json", help="Simpan laporan ke file JSON")
+    args = parser.parse_args(argv)
+
+    from strategy_runner import load_settings
+    settings = load_settings()
+    settings.update(parse_setting_overrides(args.overrides))
+    if args.data_file:
+        data = load_ohlcv(args.data_file)
+    else:
+        from benchmark import generate_ohlcv
+        timeframe_seconds = ENDPOINT_SECONDS[TIMEFRAME_ENDPOINTS[settings.get("timeframe", "hour")]]
+        data = generate_ohlcv(args.synthetic_bars, seed=args.seed, timeframe_seconds=timeframe_seconds)
+    report = run_replay(data, settings, args.speedup, args.start_bar, args.forming, args.latency_ms / 1000.0,
+                        args.jitter_ms / 1000.0, args.error_rate, args.rate_limit_rate, args.rate_limit_per_second,
+                        args.seed, quiet=not args.verbose)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f: json.dump(report, f, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
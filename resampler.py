@@ -0,0 +1,44 @@
+# --- RESAMPLER MENIT -> TIMEFRAME BESAR ---
+# Satu stream candle menit per instrumen dipakai untuk membangun bar hour/day secara inkremental (O(1) per menit).
+# Menit terakhir boleh direvisi (candle menit yang masih terbentuk): agregat menit-menit yang sudah final
+# disimpan terpisah dari menit terakhir, jadi revisi cukup mengganti menit terakhir tanpa menghitung ulang bucket.
+MINUTE_SECONDS = 60
+BAR_FIELDS = ("time", "open", "high", "low", "close", "volume") # Urutan field tuple bar
+
+
+def _merge(aggregate, minute):
+    """aggregate (open, high, low, close, volume) + menit (time, open, high, low, close, volume)."""
+    _, open_, high, low, close, volume = minute
+    if aggregate is None: return (open_, high, low, close, volume)
+    return (aggregate[0], max(aggregate[1], high), min(aggregate[2], low), close, aggregate[4] + volume)
+
+
+class IncrementalResampler:
+    def __init__(self, timeframe_seconds):
+        self.timeframe_seconds = timeframe_seconds
+        self.bucket_time = None
+        self.partial = False  # True jika menit pertama bucket tidak ada (mis. feed mulai di tengah bucket)
+        self._closed = None   # Agregat menit-menit final di bucket ini
+        self._last = None     # Menit terakhir (time, open, high, low, close, volume), bisa masih berubah
+
+    def current(self):
+        """Bar bucket saat ini (time, open, high, low, close, volume) atau None."""
+        if self._last is None: return None
+        return (self.bucket_time,) + _merge(self._closed, self._last)
+
+    def update(self, time, open_, high, low, close, volume):
+        """Masukkan satu candle menit (baru atau revisi menit terakhir). Return list bar yang berubah:
+        [bar bucket lama (final), bar bucket baru] saat bucket berganti, selain itu [bar bucket saat ini].
+        Menit yang lebih lama dari menit terakhir diabaikan (return [])."""
+        if self._last is not None and time < self._last[0]: return []
+        bucket = time - time % self.timeframe_seconds
+        changed = []
+        if self.bucket_time is None or bucket != self.bucket_time:
+            if self.bucket_time is not None: changed.append(self.current())
+            self.bucket_time, self._closed, self._last = bucket, None, None
+            self.partial = time != bucket
+        elif time > self._last[0]: # Menit baru: menit sebelumnya sudah final
+            self._closed = _merge(self._closed, self._last)
+        self._last = (time, open_, high, low, close, volume)
+        changed.append(self.current())
+        return changed
@@ -0,0 +1,117 @@
+# --- RING BUFFER CANDLE ---
+# Jendela candle berkapasitas tetap (array NumPy yang dialokasikan sekali) untuk loop live.
+# Bar diberi index absolut (0, 1, 2, ... sejak start) sehingga index yang disimpan di strategy_state
+# tetap konsisten walaupun bar lama sudah tertimpa. Append dan update candle terakhir O(1);
+# memori dan biaya per refresh tidak bertambah selama proses berjalan.
+from datetime import datetime, timezone
+
+import numpy as np
+
+CANDLE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class CandleView:
+    """Akses satu candle di buffer tanpa menyalin (mirip baris DataFrame: candle['close'], 'high' in candle, .name)."""
+    __slots__ = ("_buffer", "_pos", "index")
+
+    def __init__(self, buffer, index):
+        self._buffer = buffer
+        self.index = index
+        self._pos = buffer._position(index)
+
+    def __getitem__(self, column):
+        return self._buffer.columns[column][self._pos]
+
+    def __contains__(self, column):
+        return column in self._buffer.columns
+
+    @property
+    def time(self):
+        return int(self._buffer.time[self._pos])
+
+    @property
+    def name(self):
+        return self._buffer.datetime_at(self.index)
+
+
+class CandleRingBuffer:
+    def __init__(self, capacity):
+        if capacity < 2: raise ValueError("Kapasitas ring buffer minimal 2")
+        self.capacity = int(capacity)
+        self.time = np.zeros(self.capacity, dtype=np.int64)
+        self.columns = {name: np.full(self.capacity, np.nan) for name in CANDLE_COLUMNS}
+        self.total = 0 # Jumlah bar yang pernah masuk = index absolut bar berikutnya
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def first_index(self):
+        return self.total - len(self)
+
+    @property
+    def last_index(self):
+        return self.total - 1
+
+    @property
+    def last_time(self):
+        return int(self.time[(self.total - 1) % self.capacity]) if self.total else None
+
+    def _position(self, index):
+        if not self.first_index <= index < self.total:
+            raise IndexError(f"Bar {index} di luar jendela buffer [{self.first_index}, {self.total})")
+        return index % self.capacity
+
+    def time_at(self, index):
+        return int(self.time[self._position(index)])
+
+    def datetime_at(self, index):
+        return datetime.fromtimestamp(self.time_at(index), timezone.utc).replace(tzinfo=None)
+
+    def value(self, column, index):
+        return self.columns[column][self._position(index)]
+
+    def candle(self, index=None):
+        return CandleView(self, self.last_index if index is None else index)
+
+    def _write(self, pos, time_value, open_, high, low, close, volume):
+        self.time[pos] = time_value
+        columns = self.columns
+        columns["open"][pos] = open_; columns["high"][pos] = high; columns["low"][pos] = low
+        columns["close"][pos] = close; columns["volume"][pos] = volume
+
+    def append(self, time_value, open_, high, low, close, volume):
+        """Tambah bar baru (menimpa bar tertua jika penuh). Return index absolut bar tersebut."""
+        self._write(self.total % self.capacity, time_value, open_, high, low, close, volume)
+        self.total += 1
+        return self.total - 1
+
+    def update_last(self, open_, high, low, close, volume):
+        """Perbarui candle terakhir in place (candle yang masih terbentuk)."""
+        pos = (self.total - 1) % self.capacity
+        self._write(pos, self.time[pos], open_, high, low, close, volume)
+
+    def upsert(self, time_value, open_, high, low, close, volume):
+        """Return index absolut jika bar baru di-append, None jika candle terakhir di-update / bar lebih lama diabaikan."""
+        last_time = self.last_time
+        if last_time is not None and time_value < last_time: return None
+        if last_time is not None and time_value == last_time:
+            self.update_last(open_, high, low, close, volume)
+            return None
+        return self.append(time_value, open_, high, low, close, volume)
+
+    def load(self, data, total):
+        """Isi ulang buffer dari dict array (mis. checkpoint); bar terakhir mendapat index absolut total-1."""
+        n_bars = min(len(data["time"]), self.capacity, total)
+        self.total = total
+        for offset in range(n_bars):
+            i = len(data["time"]) - n_bars + offset
+            self._write((total - n_bars + offset) % self.capacity, data["time"][i], data["open"][i], data["high"][i],
+                        data["low"][i], data["close"][i], data["volume"][i])
+
+    def to_arrays(self):
+        """Salinan isi buffer terurut dari bar tertua (untuk tampilan / export)."""
+        order = np.arange(self.first_index, self.total) % self.capacity
+        data = {"time": self.time[order]}
+        data.update({name: values[order] for name, values in self.columns.items()})
+        return data
@@ -0,0 +1,41 @@
+# --- SCHEDULER CANDLE CLOSE ---
+# Ganti polling interval tetap: bangun tepat setelah batas candle berikutnya (+ grace agar API sempat
+# mempublikasikan bar baru), ulangi tiap retry_seconds jika bar belum muncul, dan (opsional) poll candle
+# yang masih terbentuk lebih jarang selama ada posisi terbuka untuk memantau stop.
+import time
+
+REASON_CLOSE = "close"     # Menunggu candle close / bar baru
+REASON_RETRY = "retry"     # Bar baru belum dipublikasikan API, coba lagi
+REASON_FORMING = "forming" # Pantau candle yang masih terbentuk (posisi terbuka)
+
+
+class CandleCloseScheduler:
+    def __init__(self, timeframe_seconds, grace_seconds=2.0, retry_seconds=5.0, forming_poll_seconds=0, clock=None):
+        self.timeframe_seconds = timeframe_seconds
+        self.grace_seconds = grace_seconds
+        self.retry_seconds = retry_seconds
+        self.forming_poll_seconds = forming_poll_seconds
+        self.clock = time.time if clock is None else clock # Dicari saat dibuat: ikut clock virtual replay.py
+
+    @classmethod
+    def from_settings(cls, settings, timeframe_seconds, clock=None):
+        return cls(timeframe_seconds, settings.get("candle_close_grace_seconds", 2.0),
+                   settings.get("candle_close_retry_seconds", 5.0), settings.get("forming_poll_seconds", 0), clock)
+
+    def next_close(self, now=None):
+        """Epoch detik batas candle berikutnya (= waktu buka bar berikutnya)."""
+        now = self.clock() if now is None else now
+        return now - now % self.timeframe_seconds + self.timeframe_seconds
+
+    def plan(self, last_bar_time, in_position=False, now=None):
+        """Return (epoch bangun, alasan). last_bar_time = waktu buka bar terakhir yang diketahui (bisa masih terbentuk)."""
+        now = self.clock() if now is None else now
+        if last_bar_time is None: return now, REASON_RETRY
+        close_wake = last_bar_time + self.timeframe_seconds + self.grace_seconds
+        if now >= close_wake:
+            wake, reason = now + self.retry_seconds, REASON_RETRY
+        else:
+            wake, reason = close_wake, REASON_CLOSE
+        if in_position and self.forming_poll_seconds and now + self.forming_poll_seconds < wake:
+            wake, reason = now + self.forming_poll_seconds, REASON_FORMING
+        return wake, reason
@@ -1,13 +1,26 @@
-import requests
-import pandas as pd
 import time
+STARTUP_PERF_COUNTER = time.perf_counter() # Awal cold start (sebelum import modul lain)
+import numpy as np
 import json
+import re
 import os
 import logging
-from datetime import datetime
-import smtplib # Untuk email
-from email.mime.text import MIMEText # Untuk email
+import threading
+from datetime import datetime, timezone
 import sys # Untuk cek platform (beep)
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from candle_store import CandleStore, TIMEFRAME_SECONDS, arrays_to_frame
+from notifier import NotificationDispatcher
+from checkpoint import checkpoint_path, load_checkpoint, save_checkpoint, settings_fingerprint
+from metrics import configure_metrics, inc, observe, time_stage
+from scheduler import CandleCloseScheduler
+from resampler import BAR_FIELDS, IncrementalResampler, MINUTE_SECONDS
+from ring_buffer import CandleRingBuffer
+from event_log import configure_logging, trade_event
+from feed_cache import configure_feed_cache, feed_key, shared_feed_cache
+from analytics import DEFAULT_RECENT_TRADES, format_summary, register as register_analytics, snapshot_all
 
 # --- ANSI COLOR CODES ---
 class AnsiColors:
@@ -23,26 +36,16 @@ class AnsiColors:
 
 # --- KONFIGURASI LOGGING ---
 # Kita akan handle warna langsung di print/logging calls untuk konsol
-# File log tidak akan punya kode ANSI
-file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+# File log tidak akan punya kode ANSI (di-strip oleh writer, lihat event_log.py)
+# Semua handler jalan di thread writer di belakang antrian; file dirotasi sesuai log_max_bytes / log_rotate_when
 console_formatter = logging.Formatter(f'%(asctime)s - {AnsiColors.BOLD}%(levelname)s{AnsiColors.ENDC} - %(message)s') # Pesan akan diwarnai manual
-
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-# Handler untuk file
-fh = logging.FileHandler("trading_log.txt", mode='a')
-fh.setFormatter(file_formatter)
-logger.addHandler(fh)
-
-# Handler untuk konsol
-ch = logging.StreamHandler()
-ch.setFormatter(console_formatter) # Pesan akan diwarnai manual saat logging.info dipanggil
-logger.addHandler(ch)
+configure_logging(console_formatter=console_formatter)
 
 
 SETTINGS_FILE = "settings.json"
 CRYPTOCOMPARE_MAX_LIMIT = 1999
+startup_budget_seconds = 1.0 # Batas cold start sampai fetch pertama (diatur lewat settings "startup_budget_seconds")
+first_fetch_seconds = None
 
 # --- FUNGSI BEEP ---
 def play_notification_sound():
@@ -58,40 +61,49 @@ def play_notification_sound():
         logging.warning(f"Tidak bisa memainkan suara notifikasi: {e}")
 
 # --- FUNGSI EMAIL ---
+# Email + beep dikirim lewat NotificationDispatcher (thread background, koneksi SMTP dipakai ulang,
+# sinyal berdekatan digabung jadi satu digest) sehingga loop strategi tidak pernah menunggu SMTP.
+notification_dispatcher = None
+_dispatcher_lock = threading.Lock() # Runner multi-pair bisa memanggil dari beberapa thread sekaligus
+
+def get_notification_dispatcher(settings=None):
+    global notification_dispatcher
+    with _dispatcher_lock:
+        if notification_dispatcher is None:
+            settings = settings or {}
+            notification_dispatcher = NotificationDispatcher(
+                max_queue=settings.get("notification_queue_size", 100),
+                overflow_policy=settings.get("notification_overflow_policy", "drop_oldest"),
+                batch_window=settings.get("notification_batch_seconds", 2.0),
+                sound_fn=play_notification_sound)
+        return notification_dispatcher
+
 def send_email_notification(subject, body_text, settings):
+    """Masukkan email ke antrian dispatcher (non-blocking)."""
     if not settings.get("enable_email_notifications", False):
         return
+    get_notification_dispatcher(settings).submit_email(subject, body_text, settings)
 
-    sender_email = settings.get("email_sender_address")
-    sender_password = settings.get("email_sender_app_password") # Gunakan App Password!
-    receiver_email = settings.get("email_receiver_address")
+def notify_signal(subject, body_text, settings):
+    """Beep + email untuk sinyal entry/exit, keduanya dikerjakan di thread dispatcher."""
+    dispatcher = get_notification_dispatcher(settings)
+    dispatcher.submit_sound()
+    send_email_notification(subject, body_text, settings)
 
-    if not all([sender_email, sender_password, receiver_email]):
-        logging.warning("Konfigurasi email tidak lengkap. Notifikasi email dilewati.")
-        return
+def flush_notifications(timeout=10):
+    """Tunggu notifikasi yang masih di antrian terkirim (dipanggil saat program berhenti)."""
+    if notification_dispatcher is not None and not notification_dispatcher.flush(timeout):
+        logging.warning(f"{AnsiColors.ORANGE}Sebagian notifikasi belum terkirim saat program berhenti.{AnsiColors.ENDC}")
 
-    msg = MIMEText(body_text)
-    msg['Subject'] = subject
-    msg['From'] = sender_email
-    msg['To'] = receiver_email
 
-    try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server: # Port SSL untuk Gmail
-            smtp_server.login(sender_email, sender_password)
-            smtp_server.sendmail(sender_email, receiver_email, msg.as_string())
-        logging.info(f"{AnsiColors.CYAN}Notifikasi email berhasil dikirim ke {receiver_email}{AnsiColors.ENDC}")
-    except Exception as e:
-        logging.error(f"{AnsiColors.RED}Gagal mengirim email notifikasi: {e}{AnsiColors.ENDC}")
+# --- FUNGSI PENGATURAN ---
+# settings.json boleh berisi komentar // dan /* */ serta koma di akhir objek/list (format contoh di repo)
+_JSON_COMMENT_PATTERN = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/|,(?=\s*[}\]])', re.DOTALL)
 
+def parse_commented_json(text):
+    return json.loads(_JSON_COMMENT_PATTERN.sub(lambda m: m.group(1) or "", text))
 
-# --- FUNGSI PENGATURAN ---
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                logging.error("Error membaca settings.json. Menggunakan default.")
+def default_settings():
     return {
         "api_key": "YOUR_API_KEY_HERE", "symbol": "BTC", "currency": "USD", "exchange": "CCCAGG",
         "timeframe": "hour", "refresh_interval_seconds": 60,
@@ -101,13 +113,98 @@ def load_settings():
         "enable_email_notifications": False, # Email nonaktif by default
         "email_sender_address": "pengirim@gmail.com",
         "email_sender_app_password": "xxxx xxxx xxxx xxxx", # HARUS APP PASSWORD
-        "email_receiver_address": "penerima@example.com"
+        "email_receiver_address": "penerima@example.com",
+        "enable_candle_store": True, "candle_store_dir": "candle_data", # Cache candle lokal antar run
+        "candle_store_history_bars": 0, # Target total candle tersimpan (backfill dengan toTs), 0 = tidak backfill
+        "warmup_bars": CRYPTOCOMPARE_MAX_LIMIT, # Candle histori untuk warmup saat store sudah berisi (diambil dari store)
+        "instruments": [], # Multi-pair: list override per pair, mis. {"symbol": "ETH", "timeframe": "minute", "left_strength": 20}
+        "max_concurrent_fetches": 8,
+        "ring_buffer_margin": 64, # Kapasitas buffer candle live = left + right + 1 + margin
+        "smtp_host": "smtp.gmail.com", "smtp_port": 465, "smtp_use_ssl": True, # Bisa diarahkan ke SMTP lokal untuk test
+        "notification_batch_seconds": 2.0, # Sinyal dalam jendela ini digabung jadi satu email digest
+        "notification_queue_size": 100, "notification_overflow_policy": "drop_oldest", # atau "drop_newest"
+        "enable_checkpoint": True, "checkpoint_dir": "checkpoints", # Snapshot state -> restart tanpa replay warmup
+        "checkpoint_interval_seconds": 0, # 0 = simpan setiap ada candle baru diproses
+        "enable_metrics": False, # Metrics Prometheus (histogram durasi tahap, counter bar/error/sinyal)
+        "metrics_http_port": 0, "metrics_file": "", "metrics_file_interval_seconds": 15, # 0 / "" = exporter tsb. nonaktif
+        "poll_schedule": "candle_close", # "candle_close" = bangun setelah batas candle & evaluasi bar yang baru close, "interval" = tiap refresh_interval_seconds
+        "candle_close_grace_seconds": 2, "candle_close_retry_seconds": 5, # Jeda setelah close & interval ulang jika bar belum ada
+        "forming_poll_seconds": 0, # >0: saat posisi terbuka, cek candle berjalan (stop) tiap N detik
+        "feed_timeframes": [], # Mis. ["minute", "hour", "day"]: satu feed menit, bar hour/day di-resample lokal
+        "minute_stop_checks": False, # True: stop dieksekusi di candle menit (exit lebih cepat, beda dari backtest per bar)
+        "log_file": "trading_log.txt", "log_max_bytes": 10485760, "log_backup_count": 5, # Rotasi log teks per ukuran...
+        "log_rotate_when": "", # ...atau per waktu, mis. "midnight" (kosong = per ukuran)
+        "trade_events_file": "trade_events.jsonl", # Event trade (pivot/FIB/entry/exit/PnL) sebagai JSONL, "" = nonaktif
+        "startup_budget_seconds": 1.0, # Peringatan jika cold start sampai fetch pertama lebih lama dari ini
+        "analytics_recent_trades": 50, # Jumlah trade terakhir yang disimpan analitik live (statistik lain berupa agregat)
+        "enable_feed_cache": True, # Strategi di feed yang sama berbagi fetch + candle (request bersamaan digabung)
+        "feed_cache_max_age_seconds": 5, "feed_cache_max_feeds": 32 # Umur maks data cache & jumlah feed sebelum LRU evict
     }
 
-def save_settings(settings):
-    with open(SETTINGS_FILE, 'w') as f:
-        json.dump(settings, f, indent=4)
-    logging.info(f"{AnsiColors.CYAN}Pengaturan disimpan ke settings.json{AnsiColors.ENDC}")
+def load_settings(path=None):
+    """Default + isi file settings (key yang tidak ada di file memakai default)."""
+    path = path or SETTINGS_FILE
+    settings = default_settings()
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            try:
+                settings.update(parse_commented_json(f.read()))
+            except json.JSONDecodeError as e:
+                logging.error(f"Error membaca {path} ({e}). Menggunakan default.")
+    return settings
+
+# Token JSON: string, komentar, kata (angka / true / false / null), atau satu karakter tanda baca
+_JSON_TOKEN_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|//[^\n]*|/\*.*?\*/|[-+.\w]+|\S', re.DOTALL)
+
+def _json_value_end(tokens, i):
+    """Index token terakhir dari nilai yang dimulai di tokens[i] (objek / list dilompati sampai kurung penutupnya)."""
+    if tokens[i].group() not in ("{", "["): return i
+    depth = 0
+    for j in range(i, len(tokens)):
+        word = tokens[j].group()
+        if word in ("{", "["): depth += 1
+        elif word in ("}", "]"):
+            depth -= 1
+            if depth == 0: return j
+    raise ValueError("Kurung JSON tidak seimbang")
+
+def update_settings_file(values, path=None):
+    """Ganti hanya nilai key di `values` pada objek teratas file settings; komentar, format, dan objek bersarang
+    (mis. "instruments") tetap. Key yang belum ada ditambahkan sebelum kurung tutup objek teratas."""
+    path = path or SETTINGS_FILE
+    text = ""
+    if os.path.exists(path):
+        with open(path, 'r') as f: text = f.read()
+    if not text.strip(): text = "{\n}\n"
+    tokens = [t for t in _JSON_TOKEN_PATTERN.finditer(text) if not t.group().startswith(('//', '/*'))]
+    if not tokens or tokens[0].group() != "{": raise ValueError(f"{path} bukan objek JSON")
+    pending, pieces, pos = dict(values), [], 0
+    depth, i, last_end, close = 0, 0, 0, None
+    while i < len(tokens):
+        word = tokens[i].group()
+        if word in ("{", "["): depth += 1
+        elif word in ("}", "]"):
+            depth -= 1
+            if depth == 0: close = tokens[i].start(); break
+        elif depth == 1 and word.startswith('"') and i + 2 < len(tokens) and tokens[i + 1].group() == ":":
+            key = json.loads(word)
+            if key in pending: # Ganti seluruh nilai key ini (skalar, objek, atau list)
+                end = _json_value_end(tokens, i + 2)
+                pieces += [text[pos:tokens[i + 2].start()], json.dumps(pending.pop(key))]
+                pos = last_end = tokens[end].end()
+                i = end + 1
+                continue
+        last_end = tokens[i].end()
+        i += 1
+    if close is None: raise ValueError(f"{path} bukan objek JSON")
+    if pending: # Key baru: sisipkan sebelum kurung tutup objek teratas (koma setelah nilai terakhir jika perlu)
+        entries = ",\n".join(f"    {json.dumps(key)}: {json.dumps(value)}" for key, value in pending.items())
+        comma = "" if text[last_end - 1] in "{," else ","
+        pieces += [text[pos:last_end], comma, text[last_end:close].rstrip(), "\n", entries, "\n"]
+        pos = close
+    pieces.append(text[pos:])
+    with open(path, 'w') as f: f.write("".join(pieces))
+    logging.info(f"{AnsiColors.CYAN}Pengaturan {', '.join(values)} diperbarui di {path}{AnsiColors.ENDC}")
 
 def settings_menu(current_settings):
     print(f"\n{AnsiColors.HEADER}--- Menu Pengaturan ---{AnsiColors.ENDC}")
@@ -146,53 +243,179 @@ def settings_menu(current_settings):
         new_settings["email_sender_app_password"] = input(f"App Password Email Pengirim [{current_settings.get('email_sender_app_password','')}]: ") or current_settings.get('email_sender_app_password','')
         new_settings["email_receiver_address"] = input(f"Email Penerima [{current_settings.get('email_receiver_address','')}]: ") or current_settings.get('email_receiver_address','')
         
-        save_settings(new_settings)
+        changed = {key: value for key, value in new_settings.items() if current_settings.get(key) != value}
+        if changed: update_settings_file(changed) # Hanya key yang diubah; komentar & key lain di file tetap
         return new_settings
     except ValueError:
         print(f"{AnsiColors.RED}Input tidak valid. Pengaturan tidak diubah.{AnsiColors.ENDC}")
         return current_settings
 
-# --- FUNGSI PENGAMBILAN DATA --- (fetch_candles sama seperti versi sebelumnya)
-def fetch_candles(symbol, currency, limit, exchange_name, api_key, timeframe="hour"):
+# --- FUNGSI PENGAMBILAN DATA ---
+# Request lewat client bersama (cryptocompare_client.py): session keep-alive, retry/backoff, budget rate limit
+# requests (lewat cryptocompare_client) baru di-import saat client pertama kali dibutuhkan
+def get_client():
+    from cryptocompare_client import get_client as shared_client
+    return shared_client()
+
+def configure_client(**kwargs):
+    from cryptocompare_client import configure_client as configure_shared_client
+    return configure_shared_client(**kwargs)
+
+def configure_startup_budget(settings):
+    global startup_budget_seconds
+    startup_budget_seconds = float(settings.get("startup_budget_seconds", startup_budget_seconds))
+
+def _record_first_fetch():
+    global first_fetch_seconds
+    first_fetch_seconds = time.perf_counter() - STARTUP_PERF_COUNTER
+    observe("strategy_stage_seconds", first_fetch_seconds, stage="startup")
+    color = AnsiColors.ORANGE if first_fetch_seconds > startup_budget_seconds else AnsiColors.CYAN
+    logging.info(f"{color}Cold start sampai fetch pertama: {first_fetch_seconds * 1000:.0f} ms (budget {startup_budget_seconds * 1000:.0f} ms){AnsiColors.ENDC}")
+
+def fetch_candle_arrays(symbol, currency, limit, exchange_name, api_key, timeframe="hour", to_ts=None):
+    """Candle sebagai dict array (time int64 epoch detik, open/high/low/close/volume float64), didecode langsung
+    dari JSON tanpa DataFrame. Return None jika gagal / tidak ada data.
+    Jika cache feed bersama aktif, candle terbaru (tanpa toTs) diambil lewat cache: array-nya read-only."""
+    if first_fetch_seconds is None: _record_first_fetch()
+    cache = shared_feed_cache()
+    if cache is None or to_ts is not None: # Paging histori (toTs) tidak lewat cache
+        return _request_candle_arrays(symbol, currency, limit, exchange_name, api_key, timeframe, to_ts)
+    return cache.get(feed_key(symbol, currency, exchange_name, timeframe), TIMEFRAME_SECONDS.get(timeframe, 3600), limit,
+                     lambda n: _request_candle_arrays(symbol, currency, n, exchange_name, api_key, timeframe))
+
+def _request_candle_arrays(symbol, currency, limit, exchange_name, api_key, timeframe="hour", to_ts=None):
+    import requests
+    from cryptocompare_client import decode_histo
     if timeframe == "minute": api_endpoint = "histominute"
     elif timeframe == "day": api_endpoint = "histoday"
     else: api_endpoint = "histohour"
-    url = f"https://min-api.cryptocompare.com/data/v2/{api_endpoint}"
     params = {"fsym": symbol, "tsym": currency, "limit": limit, "api_key": api_key}
     if exchange_name and exchange_name.upper() != "CCCAGG": params["e"] = exchange_name
+    if to_ts is not None: params["toTs"] = int(to_ts) # Paging mundur: candle terakhir <= toTs
     try:
-        logging.debug(f"Fetching data from: {url} with params: {params}")
-        response = requests.get(url, params=params)
-        response.raise_for_status() 
-        data = response.json()
+        logging.debug("Fetching data from: %s with params: %s", api_endpoint, params)
+        data = get_client().get_histo(api_endpoint, params)
         if data.get('Response') == 'Error':
+            inc("strategy_api_errors_total", kind="api_error")
             logging.error(f"{AnsiColors.RED}API Error CryptoCompare: {data.get('Message', 'N/A')}{AnsiColors.ENDC} (Params: fsym={symbol}, tsym={currency}, exch={exchange_name or 'CCCAGG'}, lim={limit}, tf={timeframe})")
-            return pd.DataFrame()
+            return None
         if 'Data' not in data or 'Data' not in data['Data']:
             logging.error(f"{AnsiColors.RED}Format data API tidak sesuai.{AnsiColors.ENDC} Respons: {data}")
-            return pd.DataFrame()
-        df = pd.DataFrame(data['Data']['Data'])
-        if df.empty: logging.info("Tidak ada data candle dari API."); return pd.DataFrame()
-        df['timestamp'] = pd.to_datetime(df['time'], unit='s')
-        df = df.set_index('timestamp')
-        expected_cols = ['open', 'high', 'low', 'close', 'volumefrom']
-        for col in expected_cols:
-            if col not in df.columns:
-                logging.warning(f"Kolom '{col}' tidak ditemukan! Mengisi dengan NA."); df[col] = pd.NA
-        df = df[expected_cols]; df.rename(columns={'volumefrom': 'volume'}, inplace=True)
-        return df
-    except requests.exceptions.RequestException as e: logging.error(f"{AnsiColors.RED}Kesalahan koneksi: {e}{AnsiColors.ENDC}"); return pd.DataFrame()
-    except Exception as e: logging.error(f"{AnsiColors.RED}Error fetch_candles: {e}{AnsiColors.ENDC}"); return pd.DataFrame()
+            return None
+        with time_stage("decode"):
+            candles = decode_histo(data['Data']['Data'])
+        if candles is None: logging.info("Tidak ada data candle dari API.")
+        return candles
+    except requests.exceptions.RequestException as e: inc("strategy_api_errors_total", kind="request_failed"); logging.error(f"{AnsiColors.RED}Kesalahan koneksi: {e}{AnsiColors.ENDC}"); return None
+    except Exception as e: logging.error(f"{AnsiColors.RED}Error fetch_candles: {e}{AnsiColors.ENDC}"); return None
+
+def fetch_candles(symbol, currency, limit, exchange_name, api_key, timeframe="hour", to_ts=None):
+    """View DataFrame (index timestamp, kolom open/high/low/close/volume) untuk tampilan / export."""
+    return arrays_to_frame(fetch_candle_arrays(symbol, currency, limit, exchange_name, api_key, timeframe, to_ts))
+
+def delta_fetch_limit(last_known_ts, timeframe, max_limit=CRYPTOCOMPARE_MAX_LIMIT, now_ts=None):
+    """Limit API supaya yang diambil hanya candle terakhir yang diketahui (bisa masih terbentuk) + candle sesudahnya."""
+    if last_known_ts is None: return max_limit
+    tf_seconds = TIMEFRAME_SECONDS.get(timeframe, 3600)
+    now_ts = int(time.time()) if now_ts is None else int(now_ts)
+    current_bar_ts = now_ts - now_ts % tf_seconds
+    return int(min(max_limit, max(1, (current_bar_ts - int(last_known_ts)) // tf_seconds)))
+
+# --- CANDLE STORE LOKAL ---
+# Candle yang sudah close disimpan di disk (candle_store.py), jadi restart hanya mengambil gap sejak candle terakhir.
+_candle_stores = {} # Satu CandleStore per feed: strategi di feed yang sama berbagi store (dan lock-nya)
+_candle_stores_lock = threading.Lock()
+
+def open_candle_store(settings):
+    if not settings.get("enable_candle_store", True): return None
+    key = (settings.get("candle_store_dir", "candle_data"), settings.get('symbol'), settings.get('currency'),
+           settings.get('exchange'), settings.get('timeframe'))
+    with _candle_stores_lock:
+        if key not in _candle_stores:
+            try:
+                _candle_stores[key] = CandleStore(*key)
+            except (OSError, ValueError) as e:
+                logging.warning(f"{AnsiColors.ORANGE}Candle store tidak bisa dibuka ({e}). Lanjut tanpa store.{AnsiColors.ENDC}")
+                return None
+        return _candle_stores[key]
+
+def _fetch_page_fn(settings):
+    def fetch_page(limit, to_ts):
+        return fetch_candle_arrays(settings.get('symbol'), settings.get('currency'), limit, settings.get('exchange'),
+                                   settings.get('api_key'), settings.get('timeframe'), to_ts=to_ts)
+    return fetch_page
+
+def store_closed_candles(candle_store, data):
+    """Simpan candle yang sudah close (semua kecuali yang terakhir) yang menyambung isi store tanpa lubang.
+    Candle yang sudah ada diabaikan; candle sesudah lubang tidak disimpan (lubang itu tidak bisa diisi lagi)."""
+    if candle_store is None or data is None or len(data["time"]) < 2: return 0
+    try:
+        with candle_store.lock:
+            closed = {name: values[:-1] for name, values in data.items()}
+            rows = candle_store.contiguous(closed)
+            if len(rows["time"]) == 0 and closed["time"][-1] > (candle_store.last_time or 0):
+                logging.warning(f"{AnsiColors.ORANGE}Candle baru tidak menyambung candle store (terakhir "
+                                f"{candle_store.last_time}), tidak disimpan.{AnsiColors.ENDC}")
+            return candle_store.append(rows)
+    except OSError as e:
+        logging.warning(f"{AnsiColors.ORANGE}Gagal menulis candle store: {e}{AnsiColors.ENDC}")
+        return 0
+
+def load_initial_candles(settings, candle_store, limit):
+    """Data awal (dict array) untuk warmup: dari store + gap sejak candle tersimpan terakhir, atau fetch penuh jika
+    store kosong. Return None jika tidak ada data."""
+    if candle_store is None: return _fetch_page_fn(settings)(limit, None)
+    with candle_store.lock: # Strategi lain di feed yang sama bisa sedang mengisi store yang sama
+        return _load_initial_candles(settings, candle_store, limit)
+
+def _load_initial_candles(settings, candle_store, limit):
+    fetch_page = _fetch_page_fn(settings)
+    if candle_store.count == 0:
+        data = fetch_page(limit, None)
+        if data is None: return data
+        store_closed_candles(candle_store, data)
+    else:
+        last_stored = datetime.fromtimestamp(candle_store.last_time, timezone.utc).strftime('%Y-%m-%d %H:%M')
+        logging.info(f"Candle store: {candle_store.count} candle tersimpan (terakhir {last_stored}). Hanya mengambil gap...")
+        gap = candle_store.fill_gap(fetch_page, int(time.time()), limit)
+        if len(gap["time"]) == 0: # Gap belum bisa diisi: warmup dari fetch biasa, store tidak diubah (dicoba lagi nanti)
+            logging.warning(f"{AnsiColors.ORANGE}Gap candle store sejak {last_stored} tidak bisa diambil utuh.{AnsiColors.ENDC}")
+            return fetch_page(limit, None)
+        store_closed_candles(candle_store, gap)
+        if candle_store.last_time < int(gap["time"][-1]) - candle_store.timeframe_seconds:
+            # Gap berlubang: store berhenti sebelum candle terakhir, histori store tidak bersambung ke candle berjalan
+            stored_until = datetime.fromtimestamp(candle_store.last_time, timezone.utc).strftime('%Y-%m-%d %H:%M')
+            logging.warning(f"{AnsiColors.ORANGE}Gap candle store berlubang (tersimpan sampai {stored_until}). Warmup dari fetch penuh.{AnsiColors.ENDC}")
+            data = fetch_page(limit, None)
+            if data is None: return data
+        else:
+            warmup_bars = settings.get("warmup_bars", limit)
+            stored = candle_store.tail(warmup_bars)
+            older = stored["time"] < gap["time"][-1]
+            data = {name: np.concatenate([stored[name][older], gap[name][-1:]]) for name in gap} # + candle yang masih terbentuk
+            if older.sum() < warmup_bars:
+                logging.warning(f"{AnsiColors.ORANGE}Warmup hanya {older.sum()} candle dari {warmup_bars} yang diminta (isi candle store kurang).{AnsiColors.ENDC}")
+
+    history_target = settings.get("candle_store_history_bars", 0)
+    if history_target > candle_store.count:
+        try:
+            added = candle_store.backfill(fetch_page, history_target - candle_store.count, limit)
+            logging.info(f"Backfill candle store: {added} candle lama ditambahkan (total {candle_store.count}).")
+        except OSError as e:
+            logging.warning(f"{AnsiColors.ORANGE}Backfill candle store gagal: {e}{AnsiColors.ENDC}")
+    return data
 
 
 # --- LOGIKA STRATEGI --- (strategy_state dan find_pivots sama)
-strategy_state = {
-    "last_signal_type": 0, "final_pivot_high_price_confirmed": None, "final_pivot_low_price_confirmed": None,
-    "high_price_for_fib": None, "high_bar_index_for_fib": None, "active_fib_level": None,
-    "active_fib_line_start_index": None, "entry_price_custom": None, "highest_price_for_trailing": None,
-    "trailing_tp_active_custom": False, "current_trailing_stop_level": None,
-    "emergency_sl_level_custom": None, "position_size": 0,
-}
+def new_strategy_state():
+    return {
+        "last_signal_type": 0, "final_pivot_high_price_confirmed": None, "final_pivot_low_price_confirmed": None,
+        "high_price_for_fib": None, "high_bar_index_for_fib": None, "active_fib_level": None,
+        "active_fib_line_start_index": None, "entry_price_custom": None, "highest_price_for_trailing": None,
+        "trailing_tp_active_custom": False, "current_trailing_stop_level": None,
+        "emergency_sl_level_custom": None, "position_size": 0,
+    }
+strategy_state = new_strategy_state()
 def find_pivots(series_list, left_strength, right_strength, is_high=True):
     pivots = [None] * len(series_list)
     if len(series_list) < left_strength + right_strength + 1: return pivots
@@ -212,58 +435,257 @@ def find_pivots(series_list, left_strength, right_strength, is_high=True):
         if is_pivot: pivots[i] = series_list[i] 
     return pivots
 
-def run_strategy_logic(df, settings):
+# --- PIVOT ENGINE STREAMING ---
+# Versi inkremental find_pivots: tiap bar baru hanya mengonfirmasi satu kandidat
+# (bar ke-(n-1-right_strength)), memakai deque monoton untuk max/min jendela kiri & kanan.
+# Biaya O(1) amortized per bar. Aturan tie sama persis dengan find_pivots:
+# sisi kiri strict (> / <), sisi kanan non-strict (>= / <=).
+class PivotEngine:
+    def __init__(self, left_strength, right_strength):
+        self.left_strength = left_strength
+        self.right_strength = right_strength
+        self.bar_count = 0
+        self.last_result = (None, None)
+        self.series_key = None # Penanda seri DataFrame yang sedang diikuti (lihat _sync_pivot_engine)
+        self._window = deque(maxlen=left_strength + right_strength + 1) # (high, low) bar terakhir
+        self._left_highs, self._left_lows = deque(), deque()   # (index, nilai) bar e-left .. e-1
+        self._right_highs, self._right_lows = deque(), deque() # (index, nilai) bar e+1 .. terakhir
+
+    @property
+    def event_index(self):
+        """Index bar kandidat pivot yang dikonfirmasi oleh bar terakhir."""
+        return self.bar_count - 1 - self.right_strength
+
+    @property
+    def last_bar(self):
+        return self._window[-1] if self._window else None
+
+    @staticmethod
+    def _push(dq, index, value, is_high):
+        if is_high:
+            while dq and dq[-1][1] <= value: dq.pop()
+        else:
+            while dq and dq[-1][1] >= value: dq.pop()
+        dq.append((index, value))
+
+    def _confirm(self):
+        if self.bar_count < self.left_strength + self.right_strength + 1:
+            return (None, None)
+        high_e, low_e = self._window[-(self.right_strength + 1)]
+        is_pivot_high = (not self._left_highs or high_e > self._left_highs[0][1]) and \
+                        (not self._right_highs or high_e >= self._right_highs[0][1])
+        is_pivot_low = (not self._left_lows or low_e < self._left_lows[0][1]) and \
+                       (not self._right_lows or low_e <= self._right_lows[0][1])
+        return (high_e if is_pivot_high else None, low_e if is_pivot_low else None)
+
+    def on_bar(self, high, low):
+        """Tambahkan satu bar baru. Return (pivot_high, pivot_low) di event_index (None jika bukan pivot)."""
+        t = self.bar_count
+        e = t - self.right_strength
+        self._window.append((high, low))
+        self.bar_count += 1
+
+        self._push(self._right_highs, t, high, True)
+        self._push(self._right_lows, t, low, False)
+        while self._right_highs and self._right_highs[0][0] <= e: self._right_highs.popleft()
+        while self._right_lows and self._right_lows[0][0] <= e: self._right_lows.popleft()
+
+        # Bar e-1 baru saja keluar dari jendela kanan dan masuk ke jendela kiri
+        if self.left_strength > 0 and e - 1 >= 0:
+            prev_high, prev_low = self._window[-(self.right_strength + 2)]
+            self._push(self._left_highs, e - 1, prev_high, True)
+            self._push(self._left_lows, e - 1, prev_low, False)
+        while self._left_highs and self._left_highs[0][0] < e - self.left_strength: self._left_highs.popleft()
+        while self._left_lows and self._left_lows[0][0] < e - self.left_strength: self._left_lows.popleft()
+
+        self.last_result = self._confirm()
+        return self.last_result
+
+    def replace_last(self, high, low):
+        """Ganti nilai bar terakhir (candle yang masih terbentuk lalu diperbarui API). Biaya O(left+right)."""
+        if not self._window: return self.on_bar(high, low)
+        self._window[-1] = (high, low)
+        return self._rebuild()
+
+    def restore(self, bars, bar_count):
+        """Pulihkan engine (mis. dari checkpoint): bars = (high, low) bar-bar terakhir s/d bar ke-(bar_count-1)."""
+        self.bar_count = bar_count
+        self._window.clear(); self._window.extend(bars[-self._window.maxlen:])
+        return self._rebuild()
+
+    def _rebuild(self):
+        for dq in (self._left_highs, self._left_lows, self._right_highs, self._right_lows): dq.clear()
+        t = self.bar_count - 1
+        e = t - self.right_strength
+        first_index = t - len(self._window) + 1
+        for offset, (bar_high, bar_low) in enumerate(self._window):
+            index = first_index + offset
+            if index > e:
+                self._push(self._right_highs, index, bar_high, True)
+                self._push(self._right_lows, index, bar_low, False)
+            elif e - self.left_strength <= index < e:
+                self._push(self._left_highs, index, bar_high, True)
+                self._push(self._left_lows, index, bar_low, False)
+        self.last_result = self._confirm()
+        return self.last_result
+
+pivot_engine = None
+
+# --- STATE PER INSTRUMEN ---
+class PairLogAdapter(logging.LoggerAdapter):
+    """Tambahkan label instrumen di depan pesan log (tanpa label untuk mode satu pair)."""
+    def process(self, msg, kwargs):
+        prefix = self.extra.get("prefix")
+        return (f"{prefix} {msg}" if prefix else msg), kwargs
+
+class StrategyContext:
+    """State strategi milik satu instrumen: pengganti global strategy_state + pivot_engine."""
+    def __init__(self, label=""):
+        self.label = label
+        self.state = new_strategy_state()
+        self.pivot_engine = None
+        self.analytics = None # TradeAnalytics (analytics.py), diisi InstrumentRunner
+        self.log = PairLogAdapter(logging.getLogger(), {"prefix": label})
+
+def _series_key(high_at, low_at, time_at, n_bars):
+    """Waktu bar pertama & terakhir + harga bar sebelum terakhir (sudah close) dari n_bars bar pertama seri."""
+    key = (time_at(0), time_at(n_bars - 1))
+    return key + (high_at(n_bars - 2), low_at(n_bars - 2)) if n_bars >= 2 else key
+
+def _sync_pivot_engine(high_at, low_at, n_bars, left_strength, right_strength, context=None, time_at=None):
+    """Bawa pivot engine sampai bar ke-(n_bars-1) dan return pivot (high, low) di bar event-nya.
+    high_at/low_at/time_at: fungsi index bar -> harga / waktu (kolom DataFrame atau ring buffer). Dengan time_at,
+    engine dibangun ulang jika seri bukan lanjutan dari yang sudah dilihat (DataFrame instrumen lain / histori
+    ditulis ulang)."""
+    global pivot_engine
+    engine = pivot_engine if context is None else context.pivot_engine
+    if engine is not None and time_at is not None and 0 < engine.bar_count <= n_bars and \
+       engine.series_key != _series_key(high_at, low_at, time_at, engine.bar_count):
+        engine = None
+    if engine is None or engine.bar_count > n_bars or \
+       (engine.left_strength, engine.right_strength) != (left_strength, right_strength):
+        engine = PivotEngine(left_strength, right_strength)
+        if context is None: pivot_engine = engine
+        else: context.pivot_engine = engine
+    if engine.bar_count > 0: # Candle terakhir yang sudah diproses mungkin masih terbentuk saat itu
+        last_idx = engine.bar_count - 1
+        latest_bar = (high_at(last_idx), low_at(last_idx))
+        if latest_bar != engine.last_bar: engine.replace_last(*latest_bar)
+    for i in range(engine.bar_count, n_bars):
+        engine.on_bar(high_at(i), low_at(i))
+    if time_at is not None and n_bars > 0: engine.series_key = _series_key(high_at, low_at, time_at, n_bars)
+    return engine.last_result
+
+def run_strategy_logic(df, settings, context=None):
     global strategy_state 
+    state = strategy_state if context is None else context.state # State per instrumen (multi-pair)
+    log = logging.getLogger() if context is None else context.log
     # ... (reset state & setup awal sama) ...
-    strategy_state["final_pivot_high_price_confirmed"] = None
-    strategy_state["final_pivot_low_price_confirmed"] = None
+    state["final_pivot_high_price_confirmed"] = None
+    state["final_pivot_low_price_confirmed"] = None
     left_strength = settings['left_strength']
     right_strength = settings['right_strength']
     required_cols = ['high', 'low', 'open', 'close']
     if df.empty or not all(col in df.columns for col in required_cols):
-        logging.warning(f"{AnsiColors.ORANGE}DataFrame kosong/kurang kolom di run_strategy_logic.{AnsiColors.ENDC}")
+        log.warning(f"{AnsiColors.ORANGE}DataFrame kosong/kurang kolom di run_strategy_logic.{AnsiColors.ENDC}")
         return
 
-    raw_pivot_highs = find_pivots(df['high'].tolist(), left_strength, right_strength, is_high=True)
-    raw_pivot_lows  = find_pivots(df['low'].tolist(),  left_strength, right_strength, is_high=False)
-    current_bar_index_in_df = len(df) - 1 
+    # Pivot dikonfirmasi inkremental oleh pivot_engine (tidak hitung ulang seluruh histori tiap bar)
+    highs, lows = df['high'], df['low']
+    raw_pivot_high_price_at_event, raw_pivot_low_price_at_event = _sync_pivot_engine(
+        lambda i: highs.iat[i], lambda i: lows.iat[i], len(df), left_strength, right_strength, context, lambda i: df.index[i])
+    current_bar_index_in_df = len(df) - 1
     if current_bar_index_in_df < 0 : return
+    _apply_strategy_bar(state, log, settings, current_bar_index_in_df, df.iloc[current_bar_index_in_df],
+                        raw_pivot_high_price_at_event, raw_pivot_low_price_at_event, lambda i: df.index[i],
+                        context.analytics if context is not None else None)
 
-    idx_pivot_event_high = current_bar_index_in_df - right_strength
-    raw_pivot_high_price_at_event = None
-    if idx_pivot_event_high >= 0 and idx_pivot_event_high < len(raw_pivot_highs):
-        raw_pivot_high_price_at_event = raw_pivot_highs[idx_pivot_event_high]
+def run_strategy_on_buffer(buffer, bar_index, settings, context):
+    """Sama dengan run_strategy_logic, tapi membaca bar langsung dari CandleRingBuffer (tanpa slice/copy DataFrame)."""
+    state, log = context.state, context.log
+    state["final_pivot_high_price_confirmed"] = None
+    state["final_pivot_low_price_confirmed"] = None
+    highs, lows = buffer.columns['high'], buffer.columns['low']
+    capacity = buffer.capacity
+    raw_pivot_high_price_at_event, raw_pivot_low_price_at_event = _sync_pivot_engine(
+        lambda i: highs[i % capacity], lambda i: lows[i % capacity], bar_index + 1,
+        settings['left_strength'], settings['right_strength'], context)
+    _apply_strategy_bar(state, log, settings, bar_index, buffer.candle(bar_index),
+                        raw_pivot_high_price_at_event, raw_pivot_low_price_at_event, buffer.datetime_at, context.analytics)
+
+def _active_stop(state):
+    """Stop yang berlaku untuk posisi terbuka: (level, alasan). Trailing stop dipakai jika aktif dan lebih tinggi."""
+    final_stop_for_exit = state["emergency_sl_level_custom"]
+    exit_comment = "Emergency SL"
+    if state["trailing_tp_active_custom"] and state["current_trailing_stop_level"] is not None:
+        if final_stop_for_exit is None or state["current_trailing_stop_level"] > final_stop_for_exit :
+            final_stop_for_exit = state["current_trailing_stop_level"]
+            exit_comment = "Trailing Stop"
+    return final_stop_for_exit, exit_comment
+
+def _exit_position(state, log, settings, exit_price, exit_comment, timestamp, analytics=None):
+    """Tutup posisi: log, metrics, analitik, notifikasi, reset state trading."""
+    # Merah untuk SL, biru untuk trailing stop (bisa jadi TP) kecuali hasilnya rugi
+    exit_color = AnsiColors.BLUE if exit_comment == "Trailing Stop" else AnsiColors.RED
+    pnl = 0.0
+    if state["entry_price_custom"] is not None and state["entry_price_custom"] != 0:
+         pnl = (exit_price - state["entry_price_custom"]) / state["entry_price_custom"] * 100.0
+    if exit_comment == "Trailing Stop" and pnl < 0:
+        exit_color = AnsiColors.RED
+
+    log_msg = f"EXIT ORDER @ {exit_price:.5f} by {exit_comment}. PnL: {pnl:.2f}%"
+    log.info(f"{exit_color}{AnsiColors.BOLD}{log_msg}{AnsiColors.ENDC}")
+    inc("strategy_signals_total", type="exit", reason=exit_comment)
+    trade_event("exit", settings, timestamp, price=exit_price, reason=exit_comment,
+                entry_price=state["entry_price_custom"], pnl_percent=pnl)
+    if analytics is not None: analytics.on_exit(timestamp, state["entry_price_custom"], exit_price, exit_comment, pnl)
+    email_subject = f"Trade Closed: {settings['symbol']}-{settings['currency']} ({exit_comment})"
+    email_body = f"Trade closed for {settings['symbol']}-{settings['currency']} on {settings['exchange']}.\n\n" \
+                 f"Exit Price: {exit_price:.5f}\n" \
+                 f"Reason: {exit_comment}\n" \
+                 f"Entry Price: {state.get('entry_price_custom', 0):.5f}\n" \
+                 f"PnL: {pnl:.2f}%\n" \
+                 f"Timestamp: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+    notify_signal(email_subject, email_body, settings)
+
+    # Reset state trading
+    state["position_size"] = 0; state["entry_price_custom"] = None
+    state["highest_price_for_trailing"] = None; state["trailing_tp_active_custom"] = False
+    state["current_trailing_stop_level"] = None; state["emergency_sl_level_custom"] = None
 
+def _apply_strategy_bar(state, log, settings, current_bar_index_in_df, current_candle,
+                        raw_pivot_high_price_at_event, raw_pivot_low_price_at_event, bar_time, analytics=None):
+    """Logika pivot -> FIB -> entry -> manajemen posisi untuk satu bar. bar_time: index bar -> timestamp (untuk log)."""
+    right_strength = settings['right_strength']
+    idx_pivot_event_high = current_bar_index_in_df - right_strength
     idx_pivot_event_low = current_bar_index_in_df - right_strength
-    raw_pivot_low_price_at_event = None
-    if idx_pivot_event_low >= 0 and idx_pivot_event_low < len(raw_pivot_lows):
-        raw_pivot_low_price_at_event = raw_pivot_lows[idx_pivot_event_low]
-
-    if raw_pivot_high_price_at_event is not None and strategy_state["last_signal_type"] != 1:
-        strategy_state["final_pivot_high_price_confirmed"] = raw_pivot_high_price_at_event
-        strategy_state["last_signal_type"] = 1
-        logging.info(f"{AnsiColors.CYAN}PIVOT HIGH: {strategy_state['final_pivot_high_price_confirmed']:.5f} @ {df.index[idx_pivot_event_high].strftime('%Y-%m-%d %H:%M')}{AnsiColors.ENDC}")
+
+    if raw_pivot_high_price_at_event is not None and state["last_signal_type"] != 1:
+        state["final_pivot_high_price_confirmed"] = raw_pivot_high_price_at_event
+        state["last_signal_type"] = 1
+        log.info(f"{AnsiColors.CYAN}PIVOT HIGH: {state['final_pivot_high_price_confirmed']:.5f} @ {bar_time(idx_pivot_event_high).strftime('%Y-%m-%d %H:%M')}{AnsiColors.ENDC}")
+        trade_event("pivot_high", settings, current_candle.name, price=raw_pivot_high_price_at_event, pivot_time=bar_time(idx_pivot_event_high))
         
-    if raw_pivot_low_price_at_event is not None and strategy_state["last_signal_type"] != -1:
-        strategy_state["final_pivot_low_price_confirmed"] = raw_pivot_low_price_at_event
-        strategy_state["last_signal_type"] = -1
-        logging.info(f"{AnsiColors.CYAN}PIVOT LOW:  {strategy_state['final_pivot_low_price_confirmed']:.5f} @ {df.index[idx_pivot_event_low].strftime('%Y-%m-%d %H:%M')}{AnsiColors.ENDC}")
+    if raw_pivot_low_price_at_event is not None and state["last_signal_type"] != -1:
+        state["final_pivot_low_price_confirmed"] = raw_pivot_low_price_at_event
+        state["last_signal_type"] = -1
+        log.info(f"{AnsiColors.CYAN}PIVOT LOW:  {state['final_pivot_low_price_confirmed']:.5f} @ {bar_time(idx_pivot_event_low).strftime('%Y-%m-%d %H:%M')}{AnsiColors.ENDC}")
+        trade_event("pivot_low", settings, current_candle.name, price=raw_pivot_low_price_at_event, pivot_time=bar_time(idx_pivot_event_low))
 
-    current_candle = df.iloc[current_bar_index_in_df]
     # ... (Logika FIB, SecureFIB, sama, hanya tambahkan warna dan notifikasi) ...
-    if strategy_state["final_pivot_high_price_confirmed"] is not None: # High baru
-        strategy_state["high_price_for_fib"] = strategy_state["final_pivot_high_price_confirmed"]
-        strategy_state["high_bar_index_for_fib"] = idx_pivot_event_high
-        if strategy_state["active_fib_level"] is not None:
-            logging.debug("Resetting active FIB due to new High.")
-            strategy_state["active_fib_level"] = None; strategy_state["active_fib_line_start_index"] = None
-
-    if strategy_state["final_pivot_low_price_confirmed"] is not None: # Low baru
-        if strategy_state["high_price_for_fib"] is not None and strategy_state["high_bar_index_for_fib"] is not None:
-            current_low_price = strategy_state["final_pivot_low_price_confirmed"]
+    if state["final_pivot_high_price_confirmed"] is not None: # High baru
+        state["high_price_for_fib"] = state["final_pivot_high_price_confirmed"]
+        state["high_bar_index_for_fib"] = idx_pivot_event_high
+        if state["active_fib_level"] is not None:
+            log.debug("Resetting active FIB due to new High.")
+            state["active_fib_level"] = None; state["active_fib_line_start_index"] = None
+
+    if state["final_pivot_low_price_confirmed"] is not None: # Low baru
+        if state["high_price_for_fib"] is not None and state["high_bar_index_for_fib"] is not None:
+            current_low_price = state["final_pivot_low_price_confirmed"]
             current_low_bar_index = idx_pivot_event_low
-            if current_low_bar_index > strategy_state["high_bar_index_for_fib"]:
-                calculated_fib_level = (strategy_state["high_price_for_fib"] + current_low_price) / 2.0
+            if current_low_bar_index > state["high_bar_index_for_fib"]:
+                calculated_fib_level = (state["high_price_for_fib"] + current_low_price) / 2.0
                 is_fib_late = False
                 if settings["enable_secure_fib"]:
                     price_to_check_str = settings["secure_fib_check_price"].lower()
@@ -272,106 +694,466 @@ def run_strategy_logic(df, settings):
                     if price_val_current_candle > calculated_fib_level: is_fib_late = True
                 
                 if is_fib_late:
-                    logging.info(f"{AnsiColors.ORANGE}FIB Terlambat ({calculated_fib_level:.5f}), Harga Cek ({settings['secure_fib_check_price']}: {price_val_current_candle:.5f}) > FIB.{AnsiColors.ENDC}")
-                    strategy_state["active_fib_level"] = None; strategy_state["active_fib_line_start_index"] = None
+                    log.info(f"{AnsiColors.ORANGE}FIB Terlambat ({calculated_fib_level:.5f}), Harga Cek ({settings['secure_fib_check_price']}: {price_val_current_candle:.5f}) > FIB.{AnsiColors.ENDC}")
+                    trade_event("fib_late", settings, current_candle.name, fib_level=calculated_fib_level, check_price=price_val_current_candle)
+                    state["active_fib_level"] = None; state["active_fib_line_start_index"] = None
                 else:
-                    logging.info(f"{AnsiColors.CYAN}FIB 0.5 Aktif: {calculated_fib_level:.5f}{AnsiColors.ENDC} (H: {strategy_state['high_price_for_fib']:.2f}, L: {current_low_price:.2f})")
-                    strategy_state["active_fib_level"] = calculated_fib_level
-                    strategy_state["active_fib_line_start_index"] = current_low_bar_index
-                strategy_state["high_price_for_fib"] = None; strategy_state["high_bar_index_for_fib"] = None
+                    log.info(f"{AnsiColors.CYAN}FIB 0.5 Aktif: {calculated_fib_level:.5f}{AnsiColors.ENDC} (H: {state['high_price_for_fib']:.2f}, L: {current_low_price:.2f})")
+                    trade_event("fib_active", settings, current_candle.name, fib_level=calculated_fib_level,
+                                high=state['high_price_for_fib'], low=current_low_price)
+                    state["active_fib_level"] = calculated_fib_level
+                    state["active_fib_line_start_index"] = current_low_bar_index
+                state["high_price_for_fib"] = None; state["high_bar_index_for_fib"] = None
 
-    if strategy_state["active_fib_level"] is not None and strategy_state["active_fib_line_start_index"] is not None: # Cek Entry
+    if state["active_fib_level"] is not None and state["active_fib_line_start_index"] is not None: # Cek Entry
         is_bullish_candle = current_candle['close'] > current_candle['open']
-        is_closed_above_fib = current_candle['close'] > strategy_state["active_fib_level"]
+        is_closed_above_fib = current_candle['close'] > state["active_fib_level"]
         if is_bullish_candle and is_closed_above_fib:
-            if strategy_state["position_size"] == 0: 
-                strategy_state["position_size"] = 1 # Atau qty lain
+            if state["position_size"] == 0: 
+                state["position_size"] = 1 # Atau qty lain
                 entry_px = current_candle['close']
-                strategy_state["entry_price_custom"] = entry_px
-                strategy_state["highest_price_for_trailing"] = entry_px
-                strategy_state["trailing_tp_active_custom"] = False
-                strategy_state["current_trailing_stop_level"] = None
+                state["entry_price_custom"] = entry_px
+                state["highest_price_for_trailing"] = entry_px
+                state["trailing_tp_active_custom"] = False
+                state["current_trailing_stop_level"] = None
                 emerg_sl = entry_px * (1 - settings["emergency_sl_percent"] / 100.0)
-                strategy_state["emergency_sl_level_custom"] = emerg_sl
+                state["emergency_sl_level_custom"] = emerg_sl
                 
-                log_msg = f"BUY ENTRY @ {entry_px:.5f} (FIB {strategy_state['active_fib_level']:.5f} dilewati). Emerg SL: {emerg_sl:.5f}"
-                logging.info(f"{AnsiColors.GREEN}{AnsiColors.BOLD}{log_msg}{AnsiColors.ENDC}")
-                play_notification_sound()
+                log_msg = f"BUY ENTRY @ {entry_px:.5f} (FIB {state['active_fib_level']:.5f} dilewati). Emerg SL: {emerg_sl:.5f}"
+                log.info(f"{AnsiColors.GREEN}{AnsiColors.BOLD}{log_msg}{AnsiColors.ENDC}")
+                inc("strategy_signals_total", type="entry")
+                trade_event("entry", settings, current_candle.name, price=entry_px, fib_level=state['active_fib_level'], emergency_sl=emerg_sl)
+                if analytics is not None: analytics.on_entry(current_candle.name, entry_px)
                 email_subject = f"BUY Signal: {settings['symbol']}-{settings['currency']}"
                 email_body = f"New BUY signal triggered for {settings['symbol']}-{settings['currency']} on {settings['exchange']}.\n\n" \
                              f"Entry Price: {entry_px:.5f}\n" \
-                             f"FIB Level: {strategy_state['active_fib_level']:.5f}\n" \
+                             f"FIB Level: {state['active_fib_level']:.5f}\n" \
                              f"Emergency SL: {emerg_sl:.5f}\n" \
                              f"Timestamp: {current_candle.name.strftime('%Y-%m-%d %H:%M:%S')}"
-                send_email_notification(email_subject, email_body, settings)
+                notify_signal(email_subject, email_body, settings)
             
-            strategy_state["active_fib_level"] = None; strategy_state["active_fib_line_start_index"] = None
+            state["active_fib_level"] = None; state["active_fib_line_start_index"] = None
 
-    if strategy_state["position_size"] > 0: # Manajemen Posisi
-        strategy_state["highest_price_for_trailing"] = max(strategy_state.get("highest_price_for_trailing", current_candle['high']) , current_candle['high'])
-        if not strategy_state["trailing_tp_active_custom"] and strategy_state["entry_price_custom"] is not None:
-            profit_percent = ((strategy_state["highest_price_for_trailing"] - strategy_state["entry_price_custom"]) / strategy_state["entry_price_custom"]) * 100.0 if strategy_state["entry_price_custom"] != 0 else 0
+    if state["position_size"] > 0: # Manajemen Posisi
+        state["highest_price_for_trailing"] = max(state.get("highest_price_for_trailing", current_candle['high']) , current_candle['high'])
+        if not state["trailing_tp_active_custom"] and state["entry_price_custom"] is not None:
+            profit_percent = ((state["highest_price_for_trailing"] - state["entry_price_custom"]) / state["entry_price_custom"]) * 100.0 if state["entry_price_custom"] != 0 else 0
             if profit_percent >= settings["profit_target_percent_activation"]:
-                strategy_state["trailing_tp_active_custom"] = True
-                logging.info(f"{AnsiColors.BLUE}Trailing TP Aktif. Profit: {profit_percent:.2f}%, High: {strategy_state['highest_price_for_trailing']:.5f}{AnsiColors.ENDC}")
-
-        if strategy_state["trailing_tp_active_custom"] and strategy_state["highest_price_for_trailing"] is not None:
-            potential_new_stop_price = strategy_state["highest_price_for_trailing"] * (1 - (settings["trailing_stop_gap_percent"] / 100.0))
-            if strategy_state["current_trailing_stop_level"] is None or potential_new_stop_price > strategy_state["current_trailing_stop_level"]:
-                strategy_state["current_trailing_stop_level"] = potential_new_stop_price
-                logging.debug(f"Trailing SL update: {strategy_state['current_trailing_stop_level']:.5f}")
-        
-        final_stop_for_exit = strategy_state["emergency_sl_level_custom"]
-        exit_comment = "Emergency SL"
-        exit_color = AnsiColors.RED # Warna default untuk SL
-        if strategy_state["trailing_tp_active_custom"] and strategy_state["current_trailing_stop_level"] is not None:
-            if final_stop_for_exit is None or strategy_state["current_trailing_stop_level"] > final_stop_for_exit :
-                final_stop_for_exit = strategy_state["current_trailing_stop_level"]
-                exit_comment = "Trailing Stop"
-                # Jika trailing stop, bisa jadi TP, jadi warna biru
-                exit_color = AnsiColors.BLUE 
+                state["trailing_tp_active_custom"] = True
+                log.info(f"{AnsiColors.BLUE}Trailing TP Aktif. Profit: {profit_percent:.2f}%, High: {state['highest_price_for_trailing']:.5f}{AnsiColors.ENDC}")
+
+        if state["trailing_tp_active_custom"] and state["highest_price_for_trailing"] is not None:
+            potential_new_stop_price = state["highest_price_for_trailing"] * (1 - (settings["trailing_stop_gap_percent"] / 100.0))
+            if state["current_trailing_stop_level"] is None or potential_new_stop_price > state["current_trailing_stop_level"]:
+                state["current_trailing_stop_level"] = potential_new_stop_price
+                log.debug("Trailing SL update: %.5f", potential_new_stop_price)
         
+        final_stop_for_exit, exit_comment = _active_stop(state)
         if final_stop_for_exit is not None and current_candle['low'] <= final_stop_for_exit:
             exit_price = min(current_candle['open'], final_stop_for_exit) 
-            pnl = 0.0
-            if strategy_state["entry_price_custom"] is not None and strategy_state["entry_price_custom"] != 0:
-                 pnl = (exit_price - strategy_state["entry_price_custom"]) / strategy_state["entry_price_custom"] * 100.0
-            
-            # Jika pnl negatif meski dari Trailing Stop, kembalikan ke merah
-            if exit_comment == "Trailing Stop" and pnl < 0:
-                exit_color = AnsiColors.RED
-
-            log_msg = f"EXIT ORDER @ {exit_price:.5f} by {exit_comment}. PnL: {pnl:.2f}%"
-            logging.info(f"{exit_color}{AnsiColors.BOLD}{log_msg}{AnsiColors.ENDC}")
-            play_notification_sound()
-            email_subject = f"Trade Closed: {settings['symbol']}-{settings['currency']} ({exit_comment})"
-            email_body = f"Trade closed for {settings['symbol']}-{settings['currency']} on {settings['exchange']}.\n\n" \
-                         f"Exit Price: {exit_price:.5f}\n" \
-                         f"Reason: {exit_comment}\n" \
-                         f"Entry Price: {strategy_state.get('entry_price_custom', 0):.5f}\n" \
-                         f"PnL: {pnl:.2f}%\n" \
-                         f"Timestamp: {current_candle.name.strftime('%Y-%m-%d %H:%M:%S')}"
-            send_email_notification(email_subject, email_body, settings)
-
-            # Reset state trading
-            strategy_state["position_size"] = 0; strategy_state["entry_price_custom"] = None
-            strategy_state["highest_price_for_trailing"] = None; strategy_state["trailing_tp_active_custom"] = False
-            strategy_state["current_trailing_stop_level"] = None; strategy_state["emergency_sl_level_custom"] = None
+            _exit_position(state, log, settings, exit_price, exit_comment, current_candle.name, analytics)
     
-    if strategy_state["position_size"] > 0:
+    if state["position_size"] > 0 and log.isEnabledFor(logging.DEBUG):
         # ... (log debug Posisi Aktif sama) ...
-        plot_stop_level = strategy_state.get("emergency_sl_level_custom")
-        if strategy_state.get("trailing_tp_active_custom") and strategy_state.get("current_trailing_stop_level") is not None:
-            emergency_sl = strategy_state.get("emergency_sl_level_custom")
-            current_trailing_sl = strategy_state.get("current_trailing_stop_level")
+        plot_stop_level = state.get("emergency_sl_level_custom")
+        if state.get("trailing_tp_active_custom") and state.get("current_trailing_stop_level") is not None:
+            emergency_sl = state.get("emergency_sl_level_custom")
+            current_trailing_sl = state.get("current_trailing_stop_level")
             if emergency_sl is not None and current_trailing_sl is not None and current_trailing_sl > emergency_sl: plot_stop_level = current_trailing_sl
             elif current_trailing_sl is not None and emergency_sl is None: plot_stop_level = current_trailing_sl
-        entry_price_display = strategy_state.get('entry_price_custom', 0)
+        entry_price_display = state.get('entry_price_custom', 0)
         sl_display_str = f'{plot_stop_level:.5f}' if plot_stop_level is not None else 'N/A'
-        logging.debug(f"Posisi Aktif. Entry: {entry_price_display:.5f}, Current SL: {sl_display_str}")
+        log.debug("Posisi Aktif. Entry: %.5f, Current SL: %s", entry_price_display, sl_display_str)
+
+
+# --- RUNNER PER INSTRUMEN ---
+def ring_buffer_capacity(settings):
+    """Bar yang benar-benar dibutuhkan strategi (left + right + 1) ditambah margin."""
+    return settings.get('left_strength', 50) + settings.get('right_strength', 150) + 1 + settings.get('ring_buffer_margin', 64)
+
+class InstrumentRunner:
+    """Satu instrumen (symbol/currency/exchange/timeframe + parameter strategi) dengan state dan data sendiri.
+    Candle live disimpan di CandleRingBuffer berkapasitas tetap, jadi memori tidak tumbuh selama proses berjalan."""
+    def __init__(self, settings, label="", routine_log_level=logging.INFO):
+        self.settings = settings
+        self.label = label
+        self.context = StrategyContext(label)
+        self.log = self.context.log
+        self.routine_log_level = routine_log_level # Pesan rutin per siklus (debug di mode multi-pair)
+        self.fetch_limit = CRYPTOCOMPARE_MAX_LIMIT
+        self.candle_store = None
+        self.buffer = CandleRingBuffer(ring_buffer_capacity(settings))
+        self.last_poll_stats = {}
+        self.last_processed_index = None
+        self.checkpoint_path = checkpoint_path(settings) if settings.get("enable_checkpoint", True) else None
+        self._last_checkpoint_at = 0.0
+        self.scheduler = None
+        if settings.get("poll_schedule", "candle_close") == "candle_close":
+            self.scheduler = CandleCloseScheduler.from_settings(settings, TIMEFRAME_SECONDS.get(settings.get('timeframe'), 3600))
+        # Mode candle close: bar dievaluasi sekali saat sudah close (bar sesudahnya muncul), sama dengan backtest.
+        # Mode interval (perilaku lama): bar dievaluasi saat pertama muncul, selagi masih terbentuk.
+        self.evaluate_closed_bars = self.scheduler is not None
+        self.next_poll_reason = None
+        self._stop_alert_bar = None
+        if shared_feed_cache() is not None: # Feed yang masih dipakai runner tidak di-evict dari cache
+            shared_feed_cache().subscribe(feed_key(settings.get('symbol'), settings.get('currency'), settings.get('exchange'),
+                                                   settings.get('timeframe')), owner=self)
+        self.analytics = self.context.analytics = register_analytics(
+            label or instrument_label(settings), settings.get("analytics_recent_trades", DEFAULT_RECENT_TRADES))
+
+    @property
+    def refresh_interval(self):
+        return self.settings.get('refresh_interval_seconds', 15)
+
+    def seconds_until_next_poll(self):
+        """Jeda sampai poll berikutnya: interval tetap, atau sesuai batas candle jika poll_schedule = candle_close."""
+        if self.scheduler is None:
+            self.next_poll_reason = None
+            return self.refresh_interval
+        wake_at, self.next_poll_reason = self.scheduler.plan(self.buffer.last_time, self.context.state["position_size"] > 0)
+        return max(0.0, wake_at - time.time())
+
+    def check_intrabar_stop(self):
+        """Peringatan (sekali per bar) jika candle yang masih terbentuk sudah menyentuh stop. Exit tetap diputuskan
+        saat bar baru diproses, sama seperti backtest."""
+        state = self.context.state
+        if state["position_size"] <= 0 or self.buffer.total == 0: return False
+        stop_level = _active_stop(state)[0]
+        last_index = self.buffer.last_index
+        if stop_level is None or self.buffer.value('low', last_index) > stop_level or self._stop_alert_bar == last_index: return False
+        self._stop_alert_bar = last_index
+        self.log.warning(f"{AnsiColors.ORANGE}Candle berjalan menyentuh stop {stop_level:.5f} (low {self.buffer.value('low', last_index):.5f}). Exit dikonfirmasi saat candle close.{AnsiColors.ENDC}")
+        return True
+
+    @property
+    def min_bars(self):
+        return self.settings.get('left_strength', 50) + self.settings.get('right_strength', 150) + 1
+
+    def _evaluate_bar(self, bar_index):
+        """Bar live: strategi + analitik (equity mark-to-market pada close bar tsb.)."""
+        self._process_bar(bar_index)
+        if self.context.analytics is not None:
+            self.context.analytics.on_bar(self.buffer.datetime_at(bar_index), self.buffer.value('close', bar_index), self.context.state)
+
+    def _process_bar(self, bar_index):
+        self.last_processed_index = bar_index
+        if bar_index + 1 < self.min_bars: return
+        with time_stage("strategy"):
+            run_strategy_on_buffer(self.buffer, bar_index, self.settings, self.context)
+        inc("strategy_bars_processed_total")
+
+    # --- CHECKPOINT ---
+    def save_checkpoint(self):
+        """Simpan snapshot state + buffer (atomik). Return True jika tersimpan."""
+        if self.checkpoint_path is None or self.buffer.total == 0: return False
+        engine = self.context.pivot_engine
+        meta = {"fingerprint": settings_fingerprint(self.settings), "buffer_total": self.buffer.total,
+                "engine_bar_count": engine.bar_count if engine is not None else 0,
+                "last_processed_index": self.last_processed_index,
+                "last_processed_time": self.buffer.time_at(self.last_processed_index) if self.last_processed_index is not None else None,
+                "state": self.context.state, "saved_at": int(time.time())}
+        try:
+            save_checkpoint(self.checkpoint_path, meta, self.buffer.to_arrays())
+        except (OSError, TypeError, ValueError) as e:
+            self.log.warning(f"{AnsiColors.ORANGE}Gagal menyimpan checkpoint ({e}).{AnsiColors.ENDC}")
+            return False
+        self._last_checkpoint_at = time.monotonic()
+        return True
+
+    def _maybe_checkpoint(self):
+        interval = self.settings.get("checkpoint_interval_seconds", 0) # 0 = setiap ada bar baru diproses
+        if time.monotonic() - self._last_checkpoint_at >= interval: self.save_checkpoint()
+
+    def restore_checkpoint(self):
+        """Pulihkan state dari checkpoint (tanpa replay warmup). Return False jika tidak ada / tidak cocok / terlalu lama."""
+        if self.checkpoint_path is None: return False
+        try:
+            loaded = load_checkpoint(self.checkpoint_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.log.warning(f"{AnsiColors.ORANGE}Checkpoint tidak bisa dibaca ({e}). Warmup penuh.{AnsiColors.ENDC}")
+            return False
+        if loaded is None: return False
+        meta, arrays = loaded
+        if meta.get("fingerprint") != settings_fingerprint(self.settings):
+            self.log.info(f"{AnsiColors.ORANGE}Settings strategi berubah sejak checkpoint terakhir. Warmup penuh.{AnsiColors.ENDC}")
+            return False
+        last_time = int(arrays["time"][-1]) if len(arrays["time"]) else None
+        if last_time is None: return False
+        missing_bars = (int(time.time()) - last_time) // TIMEFRAME_SECONDS.get(self.settings.get('timeframe'), 3600)
+        if missing_bars >= self.fetch_limit: # Gap tidak bisa diambil dalam satu delta fetch
+            self.log.info(f"{AnsiColors.ORANGE}Checkpoint terlalu lama ({missing_bars} candle). Warmup penuh.{AnsiColors.ENDC}")
+            return False
+
+        buffer = CandleRingBuffer(self.buffer.capacity)
+        buffer.load(arrays, meta["buffer_total"])
+        engine = None
+        if meta["engine_bar_count"] > 0:
+            engine = PivotEngine(self.settings['left_strength'], self.settings['right_strength'])
+            first_bar = max(0, meta["engine_bar_count"] - engine._window.maxlen)
+            try:
+                bars = [(buffer.value('high', i), buffer.value('low', i)) for i in range(first_bar, meta["engine_bar_count"])]
+            except IndexError:
+                self.log.info(f"{AnsiColors.ORANGE}Checkpoint tidak memuat cukup candle untuk pivot. Warmup penuh.{AnsiColors.ENDC}")
+                return False
+            engine.restore(bars, meta["engine_bar_count"])
+        self.buffer = buffer
+        self.context.pivot_engine = engine
+        self.context.state = new_strategy_state()
+        self.context.state.update(meta["state"])
+        self.last_processed_index = meta["last_processed_index"]
+        self._last_checkpoint_at = time.monotonic()
+
+        last_dt = datetime.fromtimestamp(meta["last_processed_time"] or last_time, timezone.utc)
+        self.log.info(f"{AnsiColors.CYAN}State dipulihkan dari checkpoint (bar terakhir diproses {last_dt.strftime('%Y-%m-%d %H:%M')}). Warmup dilewati.{AnsiColors.ENDC}")
+        if self.context.state["position_size"] > 0:
+            self.log.info(f"{AnsiColors.GREEN}Posisi terbuka dilanjutkan. Entry: {self.context.state['entry_price_custom']:.5f}{AnsiColors.ENDC}")
+        return True
+
+    @contextmanager
+    def analytics_detached(self):
+        """Replay warmup tidak boleh tercatat di analitik live: context.analytics = None selama blok."""
+        self.context.analytics = None
+        try:
+            yield
+        finally:
+            self.context.analytics = self.analytics
+
+    def initialize(self):
+        """Pulihkan state dari checkpoint jika ada; jika tidak, ambil data awal lalu replay histori. Return False jika tidak ada data."""
+        settings = self.settings
+        self.candle_store = open_candle_store(settings)
+        if self.restore_checkpoint(): return True
+        data = load_initial_candles(settings, self.candle_store, self.fetch_limit)
+        if data is None or len(data["time"]) == 0:
+            self.log.error(f"{AnsiColors.RED}Tidak ada data awal. Periksa setting & koneksi. Menghentikan.{AnsiColors.ENDC}")
+            return False
+
+        state = self.context.state
+        n_bars = len(data["time"])
+        self.log.info(f"Memproses {max(0, n_bars - 1)} candle historis awal untuk inisialisasi state...")
+        with self.analytics_detached():
+            for i in range(n_bars):
+                bar_index = self.buffer.append(data["time"][i], data["open"][i], data["high"][i], data["low"][i],
+                                               data["close"][i], data["volume"][i])
+                if i == n_bars - 1: break # Candle terakhir masih terbentuk, diproses saat live
+                self._process_bar(bar_index)
+                if state["position_size"] > 0: # Reset jika ada trade saat pemanasan
+                    state["position_size"] = 0; state["entry_price_custom"] = None
+                    state["emergency_sl_level_custom"] = None
+        self.log.info(f"{AnsiColors.CYAN}Inisialisasi state selesai.{AnsiColors.ENDC}")
+        self.save_checkpoint()
+        return True
+
+    def ingest(self, data, stats=None, verbose=True):
+        """Masukkan candle (dict array, terurut; candle terakhir boleh masih terbentuk): simpan yang sudah close,
+        update candle terakhir / append candle baru, evaluasi bar baru (mode candle close: bar yang baru close).
+        Return jumlah bar yang dievaluasi."""
+        buffer = self.buffer
+        with time_stage("merge"):
+            store_closed_candles(self.candle_store, data)
+        first_new_index = buffer.total
+        for i in range(len(data["time"])):
+            # Candle yang sudah ada (yang tadinya masih terbentuk) di-update in place, candle baru di-append
+            bar_index = buffer.upsert(data["time"][i], data["open"][i], data["high"][i], data["low"][i],
+                                      data["close"][i], data["volume"][i])
+            if bar_index is not None and not self.evaluate_closed_bars:
+                self._evaluate_bar(bar_index)
+                # Waktu buka bar baru = waktu close candle sebelumnya
+                observe("strategy_decision_lag_seconds", time.time() - data["time"][i])
+        last_new_index = buffer.total - 1
+        if self.evaluate_closed_bars and buffer.total:
+            # Semua bar sebelum bar terakhir (yang masih terbentuk) sudah close; evaluasi yang belum
+            start = buffer.first_index if self.last_processed_index is None else self.last_processed_index + 1
+            first_new_index, last_new_index = max(start, buffer.first_index), buffer.last_index - 1
+            for bar_index in range(first_new_index, last_new_index + 1):
+                self._evaluate_bar(bar_index)
+                observe("strategy_decision_lag_seconds", time.time() - buffer.time_at(bar_index + 1))
+
+        num_new_candles = last_new_index - first_new_index + 1
+        if num_new_candles == 0:
+            if verbose:
+                ts_display = buffer.datetime_at(buffer.last_index).strftime('%H:%M:%S') if buffer.total else "N/A"
+                self.log.log(self.routine_log_level, f"Tidak ada candle baru sejak {ts_display}. Menunggu {self.refresh_interval} detik...")
+            return 0
+        first_new_time = buffer.datetime_at(first_new_index)
+        close_lag = time.time() - buffer.last_time # Latency keputusan relatif terhadap candle close
+        self.log.log(self.routine_log_level, f"Memproses {AnsiColors.BOLD}{num_new_candles}{AnsiColors.ENDC} candle baru (dari {first_new_time.strftime('%H:%M')} hingga {buffer.datetime_at(last_new_index).strftime('%H:%M')}), {close_lag:.1f}s setelah candle close.")
+        if stats is not None:
+            stats["close_lag"] = close_lag; stats["new_bars"] = stats.get("new_bars", 0) + num_new_candles
+        self._maybe_checkpoint()
+        return num_new_candles
+
+    def poll(self):
+        """Satu siklus: delta fetch, update candle terakhir / append candle baru, proses candle baru.
+        Return statistik (latency dalam detik)."""
+        settings, buffer = self.settings, self.buffer
+        started = time.perf_counter()
+        # Delta polling: hanya candle terakhir yang diketahui + candle sesudahnya
+        delta_limit = delta_fetch_limit(buffer.last_time, settings.get('timeframe'), self.fetch_limit)
+        data = fetch_candle_arrays(settings.get('symbol'), settings.get('currency'), delta_limit,
+                                   settings.get('exchange'), settings.get('api_key'), settings.get('timeframe'))
+        fetched = time.perf_counter()
+        stats = {"ok": data is not None, "new_bars": 0, "fetch": fetched - started, "process": 0.0}
+        if data is None:
+            self.log.warning(f"{AnsiColors.ORANGE}Gagal/tidak ada data baru. Mencoba lagi...{AnsiColors.ENDC}")
+            stats["total"] = stats["fetch"]; self.last_poll_stats = stats
+            return stats
+
+        self.ingest(data, stats)
+        stats["process"] = time.perf_counter() - fetched
+        stats["total"] = time.perf_counter() - started
+        observe("strategy_stage_seconds", stats["total"], stage="poll")
+        self.last_poll_stats = stats
+        return stats
+
+
+# --- MINUTE FEED MULTI-TIMEFRAME ---
+# Satu stream histominute per instrumen; bar hour/day dibangun inkremental (resampler.py) dan dimasukkan ke
+# InstrumentRunner per timeframe. Warmup tiap timeframe tetap dari histori timeframe-nya sendiri.
+class MinuteFeedRunner:
+    def __init__(self, settings, timeframes, label="", routine_log_level=logging.INFO):
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAME_SECONDS]
+        if unknown: raise ValueError(f"Timeframe tidak dikenal di feed_timeframes: {', '.join(unknown)}")
+        self.settings = settings
+        self.label = label
+        self.log = PairLogAdapter(logging.getLogger(), {"prefix": label})
+        self.runners = []
+        for timeframe in dict.fromkeys(timeframes):
+            sub_settings = dict(settings, timeframe=timeframe)
+            self.runners.append(InstrumentRunner(sub_settings, instrument_label(sub_settings) if label else f"[{timeframe}]",
+                                                 routine_log_level))
+        self.resamplers = {runner: IncrementalResampler(TIMEFRAME_SECONDS[runner.settings['timeframe']])
+                           for runner in self.runners if runner.settings['timeframe'] != "minute"}
+        self.minute_stop_checks = settings.get("minute_stop_checks", False)
+        self.scheduler = None
+        if settings.get("poll_schedule", "candle_close") == "candle_close":
+            self.scheduler = CandleCloseScheduler.from_settings(settings, MINUTE_SECONDS)
+        self.fetch_limit = CRYPTOCOMPARE_MAX_LIMIT
+        if shared_feed_cache() is not None:
+            shared_feed_cache().subscribe(feed_key(settings.get('symbol'), settings.get('currency'), settings.get('exchange'),
+                                                   "minute"), owner=self)
+        self.last_minute_time = None
+        self.next_poll_reason = None
+        self.last_poll_stats = {}
+
+    @property
+    def refresh_interval(self):
+        return self.settings.get('refresh_interval_seconds', 15)
+
+    def _fetch_minutes(self, limit):
+        settings = self.settings
+        return fetch_candle_arrays(settings.get('symbol'), settings.get('currency'), limit, settings.get('exchange'),
+                                   settings.get('api_key'), "minute")
+
+    def _bars_for(self, runner, minute):
+        """Bar (time, o, h, l, c, v) untuk runner dari satu candle menit. Bar bucket yang tidak lengkap (menit awal
+        tidak ada) tidak menimpa bar dari API yang sudah ada di buffer."""
+        resampler = self.resamplers.get(runner)
+        if resampler is None: return [minute]
+        was_partial = resampler.partial
+        bars = resampler.update(*minute)
+        flags = ([was_partial] if len(bars) == 2 else []) + [resampler.partial]
+        return [bar for bar, partial in zip(bars, flags) if not (partial and runner.buffer.last_time == bar[0])]
+
+    def _check_minute_stop(self, runner, minute):
+        state = runner.context.state
+        if state["position_size"] <= 0: return False
+        stop_level, exit_comment = _active_stop(state)
+        if stop_level is None or minute[3] > stop_level: return False
+        minute_time = datetime.fromtimestamp(minute[0], timezone.utc).replace(tzinfo=None)
+        runner.log.info(f"{AnsiColors.ORANGE}{exit_comment} tersentuh pada candle menit {minute_time.strftime('%Y-%m-%d %H:%M')}.{AnsiColors.ENDC}")
+        _exit_position(state, runner.log, runner.settings, min(minute[1], stop_level), exit_comment, minute_time, runner.analytics)
+        runner.save_checkpoint()
+        return True
+
+    def _dispatch(self, data, stats=None, live=True):
+        for i in range(len(data["time"])):
+            minute = (int(data["time"][i]), data["open"][i], data["high"][i], data["low"][i], data["close"][i], data["volume"][i])
+            if self.last_minute_time is not None and minute[0] < self.last_minute_time: continue
+            self.last_minute_time = minute[0]
+            for runner in self.runners:
+                bars = self._bars_for(runner, minute)
+                if bars:
+                    runner.ingest({name: np.array([bar[k] for bar in bars]) for k, name in enumerate(BAR_FIELDS)}, stats, verbose=False)
+                if live and self.minute_stop_checks: self._check_minute_stop(runner, minute)
+
+    def initialize(self):
+        """Warmup tiap timeframe, lalu isi resampler dengan menit-menit sejak awal bucket terbesar yang masih berjalan."""
+        ready = [runner.initialize() for runner in self.runners]
+        if not all(ready): return False
+        now = int(time.time())
+        largest = max(TIMEFRAME_SECONDS[runner.settings['timeframe']] for runner in self.runners)
+        minutes = self._fetch_minutes(int(min(self.fetch_limit, (now % largest) // MINUTE_SECONDS + 1)))
+        if minutes is None:
+            self.log.error(f"{AnsiColors.RED}Tidak ada data menit awal. Menghentikan.{AnsiColors.ENDC}")
+            return False
+        with ExitStack() as stack: # Menit sejak awal bucket = masih warmup, belum masuk analitik live
+            for runner in self.runners: stack.enter_context(runner.analytics_detached())
+            self._dispatch(minutes, live=False)
+        self.log.info(f"{AnsiColors.CYAN}Minute feed siap untuk timeframe: {', '.join(r.settings['timeframe'] for r in self.runners)}.{AnsiColors.ENDC}")
+        return True
+
+    def poll(self):
+        started = time.perf_counter()
+        data = self._fetch_minutes(delta_fetch_limit(self.last_minute_time, "minute", self.fetch_limit))
+        fetched = time.perf_counter()
+        stats = {"ok": data is not None, "new_bars": 0, "fetch": fetched - started, "process": 0.0}
+        if data is None:
+            self.log.warning(f"{AnsiColors.ORANGE}Gagal/tidak ada data menit baru. Mencoba lagi...{AnsiColors.ENDC}")
+        else:
+            self._dispatch(data, stats)
+        stats["process"] = time.perf_counter() - fetched
+        stats["total"] = time.perf_counter() - started
+        observe("strategy_stage_seconds", stats["total"], stage="poll")
+        self.last_poll_stats = stats
+        return stats
+
+    def seconds_until_next_poll(self):
+        if self.scheduler is None:
+            self.next_poll_reason = None
+            return self.refresh_interval
+        in_position = any(runner.context.state["position_size"] > 0 for runner in self.runners)
+        wake_at, self.next_poll_reason = self.scheduler.plan(self.last_minute_time, in_position)
+        return max(0.0, wake_at - time.time())
+
+    def check_intrabar_stop(self):
+        if self.minute_stop_checks: return False # Stop sudah dieksekusi per menit
+        return any([runner.check_intrabar_stop() for runner in self.runners])
+
+    def save_checkpoint(self):
+        return all([runner.save_checkpoint() for runner in self.runners])
+
+def make_runner(settings, label="", routine_log_level=logging.INFO):
+    """InstrumentRunner biasa, atau MinuteFeedRunner jika settings punya 'feed_timeframes'."""
+    if settings.get("feed_timeframes"):
+        return MinuteFeedRunner(settings, settings["feed_timeframes"], label, routine_log_level)
+    return InstrumentRunner(settings, label, routine_log_level)
 
 
 # --- FUNGSI UTAMA TRADING LOOP ---
+def _api_key_missing(settings):
+    return settings.get('api_key',"") == "YOUR_API_KEY_HERE" or not settings.get('api_key',"")
+
+def log_analytics_summary():
+    for label, snapshot in snapshot_all()["instruments"].items():
+        logging.info(f"{AnsiColors.CYAN}Analitik {label}: {format_summary(snapshot)}{AnsiColors.ENDC}")
+
+def run_live_loop(runner):
+    """Loop live: poll -> cek stop intrabar -> tidur sampai jadwal poll berikutnya. Berjalan sampai ada exception
+    (KeyboardInterrupt, atau ReplayFinished dari clock virtual replay.py)."""
+    while True:
+        current_loop_time = datetime.fromtimestamp(time.time())
+        logging.info(f"\n{AnsiColors.BOLD}--- Analisa Candle Baru ({current_loop_time.strftime('%Y-%m-%d %H:%M:%S')}) ---{AnsiColors.ENDC}")
+        stats = runner.poll()
+        if stats["ok"]: runner.check_intrabar_stop()
+        wait_seconds = runner.seconds_until_next_poll()
+        if not stats["ok"]:
+            time.sleep(wait_seconds)
+            continue
+        reason = f" ({runner.next_poll_reason})" if runner.next_poll_reason else ""
+        logging.info(f"{AnsiColors.BOLD}--- Selesai Loop Analisa. Menunggu {wait_seconds:.0f} detik{reason} ---{AnsiColors.ENDC}")
+        time.sleep(wait_seconds)
+
 def start_trading(settings):
     # ... (setup awal dan log info sama) ...
     display_pair = f"{settings.get('symbol','N/A')}-{settings.get('currency','N/A')}"
@@ -390,91 +1172,167 @@ def start_trading(settings):
     logging.info(f"{AnsiColors.HEADER}==============================================={AnsiColors.ENDC}")
 
 
-    if settings.get('api_key',"") == "YOUR_API_KEY_HERE" or not settings.get('api_key',""):
+    if _api_key_missing(settings):
         logging.error(f"{AnsiColors.RED}API Key belum diatur! Atur via menu Settings.{AnsiColors.ENDC}")
         return
 
-    global strategy_state # Reset state
-    strategy_state = {
-        "last_signal_type": 0, "final_pivot_high_price_confirmed": None, "final_pivot_low_price_confirmed": None,
-        "high_price_for_fib": None, "high_bar_index_for_fib": None, "active_fib_level": None,
-        "active_fib_line_start_index": None, "entry_price_custom": None, "highest_price_for_trailing": None,
-        "trailing_tp_active_custom": False, "current_trailing_stop_level": None,
-        "emergency_sl_level_custom": None, "position_size": 0,
-    }
-    
-    fetch_limit_for_api = CRYPTOCOMPARE_MAX_LIMIT
-    all_data_df = fetch_candles(settings.get('symbol'), settings.get('currency'), fetch_limit_for_api, 
-                                settings.get('exchange'), settings.get('api_key'), settings.get('timeframe'))
-
-    if all_data_df.empty:
-        logging.error(f"{AnsiColors.RED}Tidak ada data awal. Periksa setting & koneksi. Menghentikan.{AnsiColors.ENDC}")
+    configure_logging(settings)
+    if settings.get("api_rate_limits"): configure_client(rate_limits=settings["api_rate_limits"])
+    configure_feed_cache(settings)
+    configure_metrics(settings)
+    configure_startup_budget(settings)
+    try:
+        runner = make_runner(settings) # State strategi baru setiap start
+    except ValueError as e:
+        logging.error(f"{AnsiColors.RED}{e}{AnsiColors.ENDC}")
         return
-
-    logging.info(f"Memproses {max(0, len(all_data_df) - 1)} candle historis awal untuk inisialisasi state...")
-    start_warmup_processing_idx = settings.get('left_strength',50) + settings.get('right_strength',150)
-    for i in range(start_warmup_processing_idx, len(all_data_df) -1): 
-        historical_slice = all_data_df.iloc[:i+1]
-        if len(historical_slice) < start_warmup_processing_idx +1 : continue
-        run_strategy_logic(historical_slice, settings)
-        if strategy_state["position_size"] > 0: # Reset jika ada trade saat pemanasan
-            strategy_state["position_size"] = 0; strategy_state["entry_price_custom"] = None 
-            strategy_state["emergency_sl_level_custom"] = None
-    logging.info(f"{AnsiColors.CYAN}Inisialisasi state selesai.{AnsiColors.ENDC}")
+    if not runner.initialize(): return
     logging.info(f"{AnsiColors.HEADER}---------- MULAI LIVE ANALYSIS ----------{AnsiColors.ENDC}")
 
     try:
-        while True:
-            current_loop_time = datetime.now()
-            logging.info(f"\n{AnsiColors.BOLD}--- Analisa Candle Baru ({current_loop_time.strftime('%Y-%m-%d %H:%M:%S')}) ---{AnsiColors.ENDC}")
-            new_data_df = fetch_candles(settings.get('symbol'), settings.get('currency'), fetch_limit_for_api, 
-                                        settings.get('exchange'), settings.get('api_key'), settings.get('timeframe'))
-            if new_data_df.empty:
-                logging.warning(f"{AnsiColors.ORANGE}Gagal/tidak ada data baru. Mencoba lagi...{AnsiColors.ENDC}")
-                time.sleep(settings.get('refresh_interval_seconds',15))
-                continue
-            
-            last_known_index_val = all_data_df.index[-1] if not all_data_df.empty else None
-            combined_df = pd.concat([all_data_df, new_data_df])
-            combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-            combined_df.sort_index(inplace=True)
-            all_data_df = combined_df
-            
-            start_processing_idx_loc = 0
-            if last_known_index_val:
-                try:
-                    idx_loc = all_data_df.index.get_loc(last_known_index_val)
-                    start_processing_idx_loc = idx_loc + 1
-                except KeyError: 
-                    logging.warning(f"{AnsiColors.ORANGE}Index lama {last_known_index_val} tidak ditemukan. Proses beberapa bar terakhir.{AnsiColors.ENDC}")
-                    start_processing_idx_loc = max(0, len(all_data_df) - 5) 
-            else:
-                 start_processing_idx_loc = max(0, len(all_data_df) - int(fetch_limit_for_api/2) )
-                 start_processing_idx_loc = max(start_processing_idx_loc, settings.get('left_strength',50) + settings.get('right_strength',150))
-
-            if start_processing_idx_loc >= len(all_data_df):
-                ts_display = all_data_df.index[-1].strftime('%H:%M:%S') if not all_data_df.empty else "N/A"
-                logging.info(f"Tidak ada candle baru sejak {ts_display}. Menunggu {settings.get('refresh_interval_seconds',15)} detik...")
-            else:
-                num_new_candles = len(all_data_df) - start_processing_idx_loc
-                logging.info(f"Memproses {AnsiColors.BOLD}{num_new_candles}{AnsiColors.ENDC} candle baru (dari {all_data_df.index[start_processing_idx_loc].strftime('%H:%M')} hingga {all_data_df.index[-1].strftime('%H:%M')}).")
-                for i in range(start_processing_idx_loc, len(all_data_df)):
-                    current_processing_slice = all_data_df.iloc[:i+1] 
-                    if len(current_processing_slice) < settings.get('left_strength',50) + settings.get('right_strength',150) + 1: continue 
-                    # log analisa candle individu bisa di-debug jika terlalu verbose
-                    # logging.debug(f"Menganalisa candle: {current_processing_slice.index[-1].strftime('%H:%M')} (Close: {current_processing_slice.iloc[-1]['close']:.5f})")
-                    run_strategy_logic(current_processing_slice, settings)
-            
-            logging.info(f"{AnsiColors.BOLD}--- Selesai Loop Analisa. Menunggu {settings.get('refresh_interval_seconds',15)} detik ---{AnsiColors.ENDC}")
-            time.sleep(settings.get('refresh_interval_seconds',15))
+        run_live_loop(runner)
     except KeyboardInterrupt:
         logging.info(f"\n{AnsiColors.ORANGE}Proses trading dihentikan oleh pengguna.{AnsiColors.ENDC}")
     except Exception as e:
         logging.exception(f"{AnsiColors.RED}Error tak terduga di loop trading utama: {e}{AnsiColors.ENDC}")
     finally:
+        runner.save_checkpoint()
+        flush_notifications()
+        log_analytics_summary()
         logging.info(f"{AnsiColors.HEADER}================ STRATEGY STOP ================{AnsiColors.ENDC}")
 
 
+# --- MULTI-PAIR RUNNER ---
+# Banyak instrumen dalam satu proses: state per instrumen terisolasi (InstrumentRunner), fetch dijalankan
+# bersamaan di thread pool terbatas, semua berbagi satu connection pool + rate limiter (cryptocompare_client).
+def build_instrument_settings(base_settings, instruments):
+    """Tiap konfigurasi instrumen (dict override) digabung dengan settings dasar."""
+    merged_list = []
+    for instrument in instruments:
+        merged = {k: v for k, v in base_settings.items() if k != "instruments"}
+        merged.update(instrument)
+        merged_list.append(merged)
+    return merged_list
+
+def instrument_label(settings):
+    return f"[{settings.get('symbol','N/A')}-{settings.get('currency','N/A')} {settings.get('exchange','CCCAGG')} {settings.get('timeframe','hour')}]"
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))]
+
+class MultiPairRunner:
+    def __init__(self, instrument_settings, max_workers=8, latency_history=100):
+        self.runners, seen = [], {}
+        for s in instrument_settings:
+            label = instrument_label(s)
+            seen[label] = seen.get(label, 0) + 1
+            if seen[label] > 1: label = f"{label}#{seen[label]}" # Beberapa konfigurasi strategi di feed yang sama
+            self.runners.append(make_runner(s, label, routine_log_level=logging.DEBUG))
+        self.max_workers = max(1, min(max_workers, len(self.runners) or 1))
+        self.latency_history = {r.label: deque(maxlen=latency_history) for r in self.runners}
+        self.cycles = 0
+
+    def _run_concurrently(self, executor, runners, method_name):
+        futures = {executor.submit(getattr(runner, method_name)): runner for runner in runners}
+        results = {}
+        for future in as_completed(futures):
+            runner = futures[future]
+            try:
+                results[runner] = future.result()
+            except Exception as e:
+                runner.log.exception(f"{AnsiColors.RED}Error {method_name}: {e}{AnsiColors.ENDC}")
+                results[runner] = None
+        return results
+
+    def latency_report(self):
+        """Latency total per pair (detik) dari siklus-siklus terakhir: p50, p95, max, terakhir."""
+        report = {}
+        for label, history in self.latency_history.items():
+            values = sorted(history)
+            report[label] = {"p50": _percentile(values, 50), "p95": _percentile(values, 95),
+                             "max": values[-1] if values else 0.0, "last": history[-1] if history else 0.0}
+        return report
+
+    def _log_cycle(self, results, wall_seconds, budget_seconds):
+        """budget_seconds = jeda terpendek sampai poll berikutnya dari pair di siklus ini (interval tetap, atau rencana
+        scheduler candle close): siklus yang lebih lama dari itu membuat poll berikutnya terlambat."""
+        totals = []
+        for runner, stats in results.items():
+            if not stats: continue
+            self.latency_history[runner.label].append(stats["total"])
+            totals.append((stats["total"], runner.label, stats))
+        totals.sort(reverse=True)
+        values = sorted(t[0] for t in totals)
+        new_bars = sum(t[2]["new_bars"] for t in totals)
+        failed = sum(1 for stats in results.values() if not stats or not stats["ok"])
+        capacity = int(len(results) * budget_seconds / wall_seconds) if wall_seconds > 0 else len(results)
+        color = AnsiColors.RED if wall_seconds > budget_seconds else AnsiColors.CYAN
+        logging.info(f"{color}Siklus #{self.cycles}: {len(results)} pair dalam {wall_seconds:.2f}s (jeda berikutnya {budget_seconds:.1f}s, "
+                     f"estimasi kapasitas ~{capacity} pair) | latency/pair p50 {_percentile(values, 50)*1000:.0f}ms, "
+                     f"p95 {_percentile(values, 95)*1000:.0f}ms, max {_percentile(values, 100)*1000:.0f}ms | "
+                     f"candle baru {new_bars}, gagal {failed}{AnsiColors.ENDC}")
+        for total, label, stats in totals[:3]:
+            logging.debug("Terlambat: %s total %.0fms (fetch %.0fms, proses %.0fms)", label, total*1000, stats['fetch']*1000, stats['process']*1000)
+        cache = shared_feed_cache()
+        if cache is not None:
+            logging.debug("Feed cache: hit %d, miss %d, digabung %d, evict %d", cache.stats["hit"], cache.stats["miss"],
+                          cache.stats["coalesced"], cache.stats["evicted"])
+
+    def run(self, max_cycles=None):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pair") as executor:
+            started = time.perf_counter()
+            init_results = self._run_concurrently(executor, self.runners, "initialize")
+            active = [r for r in self.runners if init_results.get(r)]
+            logging.info(f"{AnsiColors.CYAN}{len(active)}/{len(self.runners)} pair siap dalam {time.perf_counter() - started:.2f}s.{AnsiColors.ENDC}")
+            next_due = {runner: time.monotonic() for runner in active}
+            while active and (max_cycles is None or self.cycles < max_cycles):
+                now = time.monotonic()
+                due = [r for r in active if next_due[r] <= now]
+                if due:
+                    cycle_start = time.perf_counter()
+                    results = self._run_concurrently(executor, due, "poll")
+                    wall_seconds = time.perf_counter() - cycle_start
+                    self.cycles += 1
+                    waits = []
+                    for runner in due:
+                        if results.get(runner) and results[runner]["ok"]: runner.check_intrabar_stop()
+                        waits.append(runner.seconds_until_next_poll())
+                        next_due[runner] = time.monotonic() + waits[-1]
+                    self._log_cycle(results, wall_seconds, min(waits))
+                time.sleep(max(0.0, min(next_due.values()) - time.monotonic()))
+
+def start_multi_pair(settings):
+    instruments = settings.get("instruments") or []
+    if not instruments:
+        logging.error(f"{AnsiColors.RED}Daftar 'instruments' di settings kosong. Isi dengan list konfigurasi pair.{AnsiColors.ENDC}")
+        return
+    instrument_settings = build_instrument_settings(settings, instruments)
+    missing_key = [instrument_label(s) for s in instrument_settings if _api_key_missing(s)]
+    if missing_key:
+        logging.error(f"{AnsiColors.RED}API Key belum diatur untuk: {', '.join(missing_key)}{AnsiColors.ENDC}")
+        return
+
+    logging.info(f"{AnsiColors.HEADER}============= MULTI-PAIR START ({len(instrument_settings)} pair) ============={AnsiColors.ENDC}")
+    configure_logging(settings)
+    if settings.get("api_rate_limits"): configure_client(rate_limits=settings["api_rate_limits"])
+    configure_feed_cache(settings)
+    configure_metrics(settings)
+    configure_startup_budget(settings)
+    runner = MultiPairRunner(instrument_settings, max_workers=settings.get("max_concurrent_fetches", 8))
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        logging.info(f"\n{AnsiColors.ORANGE}Proses trading dihentikan oleh pengguna.{AnsiColors.ENDC}")
+    except Exception as e:
+        logging.exception(f"{AnsiColors.RED}Error tak terduga di loop multi-pair: {e}{AnsiColors.ENDC}")
+    finally:
+        for instrument in runner.runners: instrument.save_checkpoint()
+        flush_notifications()
+        log_analytics_summary()
+        logging.info(f"{AnsiColors.HEADER}================ MULTI-PAIR STOP ================{AnsiColors.ENDC}")
+
+
 # --- MENU UTAMA ---
 def main_menu():
     settings = load_settings()
@@ -489,7 +1347,9 @@ def main_menu():
         print("--------------------------------------")
         print(f"1. {AnsiColors.GREEN}Mulai Analisa Realtime{AnsiColors.ENDC}")
         print(f"2. {AnsiColors.ORANGE}Pengaturan{AnsiColors.ENDC}")
-        print(f"3. {AnsiColors.RED}Keluar{AnsiColors.ENDC}")
+        print(f"3. {AnsiColors.BLUE}Backtest Offline (file CSV/NPZ){AnsiColors.ENDC}")
+        print(f"4. {AnsiColors.GREEN}Mulai Multi-Pair ({len(settings.get('instruments') or [])} pair di settings){AnsiColors.ENDC}")
+        print(f"5. {AnsiColors.RED}Keluar{AnsiColors.ENDC}")
         choice = input("Pilihan Anda: ")
 
         if choice == '1':
@@ -497,10 +1357,78 @@ def main_menu():
         elif choice == '2':
             settings = settings_menu(settings)
         elif choice == '3':
+            data_path = input("Path file OHLCV (.csv/.npz): ").strip()
+            ledger_path = input("Simpan ledger ke CSV (kosongkan jika tidak): ").strip() or None
+            try:
+                from backtest import backtest
+                backtest(data_path, settings, ledger_path=ledger_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"{AnsiColors.RED}Backtest gagal: {e}{AnsiColors.ENDC}")
+        elif choice == '4':
+            start_multi_pair(settings)
+        elif choice == '5':
             logging.info("Aplikasi ditutup.")
             break
         else:
             print(f"{AnsiColors.RED}Pilihan tidak valid.{AnsiColors.ENDC}")
 
+
+# --- CLI HEADLESS (DAEMON) ---
+# python strategy_runner.py run --config settings.json --pairs BTC-USD,ETH-USD  -> langsung live tanpa menu.
+# Tanpa argumen -> menu interaktif seperti biasa.
+def _handle_sigterm(signum, frame):
+    logging.info(f"{AnsiColors.ORANGE}SIGTERM diterima, menghentikan proses...{AnsiColors.ENDC}")
+    raise KeyboardInterrupt # Ditangani loop seperti Ctrl+C: checkpoint disimpan, notifikasi & log di-flush
+
+def parse_pairs(text):
+    """'BTC-USD,ETH-USD' -> [{'symbol': 'BTC', 'currency': 'USD'}, ...]."""
+    instruments = []
+    for pair in filter(None, (p.strip() for p in text.split(','))):
+        symbol, sep, currency = pair.partition('-')
+        if not sep or not symbol or not currency: raise ValueError(f"Pair harus berbentuk SYMBOL-CURRENCY: {pair}")
+        instruments.append({"symbol": symbol.upper(), "currency": currency.upper()})
+    return instruments
+
+def run_headless(settings):
+    import signal
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    try:
+        if settings.get("instruments"): start_multi_pair(settings)
+        else: start_trading(settings)
+    except KeyboardInterrupt: # Sinyal datang sebelum loop live berjalan (mis. saat fetch awal)
+        logging.info(f"{AnsiColors.ORANGE}Dihentikan sebelum loop live dimulai.{AnsiColors.ENDC}")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main_menu()
+        return 0
+    import argparse
+    from backtest import parse_setting_overrides
+    parser = argparse.ArgumentParser(description="Crypto Strategy Runner (tanpa argumen -> menu interaktif)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Jalankan analisa realtime tanpa menu (mode daemon)")
+    run_parser.add_argument("--config", default=SETTINGS_FILE, help="File settings JSON (boleh berisi komentar //)")
+    run_parser.add_argument("--pairs", help="Mis. BTC-USD atau BTC-USD,ETH-USD (lebih dari satu -> multi-pair)")
+    run_parser.add_argument("--exchange", help="Override exchange")
+    run_parser.add_argument("--timeframe", choices=sorted(TIMEFRAME_SECONDS), help="Override timeframe")
+    run_parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                            help="Override setting lain, bisa diulang")
+    args = parser.parse_args(argv)
+
+    settings = load_settings(args.config)
+    try:
+        settings.update(parse_setting_overrides(args.overrides))
+        instruments = parse_pairs(args.pairs) if args.pairs else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.exchange: settings["exchange"] = args.exchange
+    if args.timeframe: settings["timeframe"] = args.timeframe
+    if instruments is not None:
+        if len(instruments) == 1: settings.update(instruments[0]); settings["instruments"] = []
+        else: settings["instruments"] = instruments
+    run_headless(settings)
+    return 0
+
 if __name__ == "__main__":
-    main_menu()
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# Modul repo berupa file tunggal di root (bukan package): tambahkan root ke sys.path untuk test.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def quiet_runner(monkeypatch):
+    """Tanpa file log / JSONL event dan tanpa notifikasi email selama test."""
+    import strategy_runner
+    strategy_runner.configure_logging({"log_file": "", "trade_events_file": "", "log_level": "WARNING"})
+    monkeypatch.setattr(strategy_runner, "notify_signal", lambda *args: None)
+
+
+def random_ohlcv(seed, n_bars=200, decimals=0, start_time=1_600_000_000, timeframe_seconds=3600):
+    """Random walk OHLCV. Harga dibulatkan (default ke bilangan bulat ~100) supaya banyak high/low yang sama (tie)."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars))), decimals)
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_bars))), decimals)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_bars))), decimals)
+    return {"time": start_time + timeframe_seconds * np.arange(n_bars, dtype=np.int64), "open": open_, "high": high,
+            "low": low, "close": close, "volume": rng.lognormal(3, 1, n_bars)}
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+import strategy_runner
+from backtest import run_backtest
+from conftest import random_ohlcv
+from strategy_runner import MinuteFeedRunner, default_settings, make_runner
+
+TIMEFRAMES = {"minute": 60, "hour": 3600}
+N_BARS = 600
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """fetch_candle_arrays palsu: N_BARS candle acak per timeframe, candle terakhir = candle yang sedang berjalan."""
+    now = int(time.time())
+    feeds = {tf: random_ohlcv(7, n_bars=N_BARS, decimals=2, timeframe_seconds=seconds,
+                              start_time=now - now % seconds - (N_BARS - 1) * seconds) for tf, seconds in TIMEFRAMES.items()}
+    def fetch(symbol, currency, limit, exchange_name, api_key, timeframe="hour", to_ts=None):
+        return {name: values[-(limit + 1):] for name, values in feeds[timeframe].items()}
+    monkeypatch.setattr(strategy_runner, "fetch_candle_arrays", fetch)
+    return feeds
+
+def runner_settings(**overrides):
+    return dict(default_settings(), api_key="test", left_strength=5, right_strength=5, enable_candle_store=False,
+                enable_checkpoint=False, profit_target_percent_activation=1.0, trailing_stop_gap_percent=0.5,
+                emergency_sl_percent=2.0, **overrides)
+
+def assert_no_live_trades(runner):
+    snapshot = runner.analytics.snapshot()
+    assert snapshot["trades"] == 0 and snapshot["open_position"] is None and snapshot["bars"] == 0
+    assert runner.context.analytics is runner.analytics # Terpasang lagi untuk bar live
+
+
+def test_warmup_replay_is_not_recorded_in_analytics(fake_api):
+    settings = runner_settings()
+    data = {name: values[:-1] for name, values in fake_api["hour"].items()}
+    assert run_backtest(data, settings)[1]["trades"] > 0 # Replay warmup memang berisi trade
+    runner = make_runner(settings, "[warmup]")
+    assert runner.initialize()
+    assert_no_live_trades(runner)
+
+def test_minute_feed_warmup_is_not_recorded_in_analytics(fake_api):
+    runner = make_runner(runner_settings(feed_timeframes=["minute", "hour"]), "[minute warmup]")
+    assert isinstance(runner, MinuteFeedRunner) and runner.initialize()
+    for sub_runner in runner.runners: assert_no_live_trades(sub_runner)
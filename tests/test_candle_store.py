@@ -0,0 +1,66 @@
+import numpy as np
+
+from candle_store import CandleStore
+from conftest import random_ohlcv
+from strategy_runner import store_closed_candles
+
+HOUR = 3600
+
+
+def make_store(tmp_path, data):
+    store = CandleStore(str(tmp_path), "BTC", "USD", "CCCAGG", "hour")
+    store.append(data)
+    return store
+
+def page_fetcher(data, fail_below=None):
+    """fetch_page(limit, to_ts) seperti CryptoCompare: limit + 1 candle terakhir sampai to_ts. Page yang dimulai
+    sebelum fail_below gagal (None)."""
+    calls = []
+    def fetch_page(limit, to_ts):
+        calls.append((limit, to_ts))
+        stop = len(data["time"]) if to_ts is None else int(np.searchsorted(data["time"], to_ts, side='right'))
+        start = max(0, stop - limit - 1)
+        if fail_below is not None and data["time"][start] < fail_below: return None
+        return {name: values[start:stop] for name, values in data.items()}
+    fetch_page.calls = calls
+    return fetch_page
+
+
+def test_fill_gap_pages_back_to_last_stored_candle(tmp_path):
+    data = random_ohlcv(0, n_bars=100, timeframe_seconds=HOUR)
+    store = make_store(tmp_path, {name: values[:30] for name, values in data.items()})
+    fetch_page = page_fetcher(data)
+    gap = store.fill_gap(fetch_page, int(data["time"][-1]), 20)
+    assert len(fetch_page.calls) > 1
+    assert store_closed_candles(store, gap) == 69
+    assert np.array_equal(store.read()["time"], data["time"][:-1])
+
+def test_fill_gap_with_failed_older_page_stores_nothing(tmp_path):
+    data = random_ohlcv(1, n_bars=100, timeframe_seconds=HOUR)
+    store = make_store(tmp_path, {name: values[:30] for name, values in data.items()})
+    gap = store.fill_gap(page_fetcher(data, fail_below=data["time"][50]), int(data["time"][-1]), 20)
+    assert len(gap["time"]) == 0
+    assert store_closed_candles(store, gap) == 0 and store.last_time == data["time"][29]
+
+def test_store_closed_candles_skips_rows_after_a_hole(tmp_path):
+    data = random_ohlcv(2, n_bars=60, timeframe_seconds=HOUR)
+    store = make_store(tmp_path, {name: values[:20] for name, values in data.items()})
+    # Fetch live yang tidak menyambung (mis. jaringan putus lebih lama dari data_limit): tidak ada yang disimpan
+    assert store_closed_candles(store, {name: values[30:] for name, values in data.items()}) == 0
+    assert store.last_time == data["time"][19]
+    # Menyambung tapi ada lubang di tengah: hanya bagian sebelum lubang
+    rows = np.r_[15:25, 27:40]
+    assert store_closed_candles(store, {name: values[rows] for name, values in data.items()}) == 5
+    assert store.last_time == data["time"][24]
+
+def test_warmup_refetches_full_window_when_gap_has_a_hole(tmp_path, monkeypatch, caplog):
+    import strategy_runner
+    data = random_ohlcv(3, n_bars=100, timeframe_seconds=HOUR)
+    store = make_store(tmp_path, {name: values[:30] for name, values in data.items()})
+    api = {name: np.delete(values, np.s_[50:55]) for name, values in data.items()} # API tanpa candle 50..54
+    fetch_page = page_fetcher(api)
+    monkeypatch.setattr(strategy_runner, "fetch_candle_arrays", lambda *args, to_ts=None: fetch_page(args[2], to_ts))
+    settings = dict(strategy_runner.default_settings(), warmup_bars=60)
+    warmup = strategy_runner._load_initial_candles(settings, store, 80)
+    assert store.last_time == data["time"][49] # Store tidak melewati lubang
+    assert np.array_equal(warmup["time"], api["time"][-81:]) and "berlubang" in caplog.text
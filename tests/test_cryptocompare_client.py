@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from cryptocompare_client import decode_histo
+
+
+def row(time, close=100.0):
+    return {"time": time, "open": close, "high": close, "low": close, "close": close, "volumefrom": 1.0}
+
+
+def test_decode_histo_drops_rows_without_time():
+    rows = [row(3600), {"open": 1.0, "close": 2.0}, dict(row(7200), time=None), row(10800, close=None)]
+    data = decode_histo(rows)
+    assert data["time"].dtype == np.int64 and data["time"].tolist() == [3600, 10800]
+    assert data["close"][0] == 100.0 and np.isnan(data["close"][1])
+
+def test_decode_histo_without_any_time_raises():
+    with pytest.raises(ValueError):
+        decode_histo([{"open": 1.0}, {"close": 2.0}])
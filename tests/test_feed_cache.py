@@ -0,0 +1,35 @@
+import types
+
+import numpy as np
+
+import feed_cache
+from feed_cache import FeedCache, configure_feed_cache, shared_feed_cache
+
+HOUR = 3600
+
+
+def candles(last_time, n_rows):
+    times = last_time - HOUR * np.arange(n_rows - 1, -1, -1, dtype=np.int64)
+    return {"time": times, "close": np.arange(n_rows, dtype=np.float64)}
+
+
+def test_disable_flag_drops_existing_cache(monkeypatch):
+    monkeypatch.setattr(feed_cache, "_shared_cache", None)
+    cache = configure_feed_cache({"enable_feed_cache": True})
+    assert cache is not None and configure_feed_cache({}) is cache
+    assert configure_feed_cache({"enable_feed_cache": False}) is None and shared_feed_cache() is None
+
+def test_cache_follows_replaced_time_module(monkeypatch):
+    """Tanpa clock eksplisit, TTL memakai feed_cache.time saat dipanggil (clock virtual replay), bukan jam dinding."""
+    cache = FeedCache(max_age=1e9)
+    now = [1_600_000_000 + 10]
+    monkeypatch.setattr(feed_cache, "time", types.SimpleNamespace(time=lambda: now[0]))
+    fetches = []
+    def fetch(limit):
+        fetches.append(now[0])
+        return candles(now[0] - now[0] % HOUR, limit + 1)
+    key = ("BTC", "USD", "CCCAGG", "hour")
+    cache.get(key, HOUR, 10, fetch); cache.get(key, HOUR, 10, fetch)
+    assert len(fetches) == 1
+    now[0] += HOUR # Candle baru dibuka di waktu virtual: cache kedaluwarsa
+    assert cache.get(key, HOUR, 10, fetch)["time"][-1] == now[0] - now[0] % HOUR and len(fetches) == 2
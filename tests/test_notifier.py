@@ -0,0 +1,183 @@
+import email
+import smtplib
+import socketserver
+import threading
+import time
+
+import pytest
+
+from notifier import OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, NotificationDispatcher
+
+
+class FakeSMTP:
+    """Koneksi SMTP palsu (lewat smtp_factory): mencatat email, bisa diputus atau ditahan saat sendmail."""
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def ehlo_or_helo_if_needed(self): pass
+    def has_extn(self, name): return True
+    def login(self, user, password): self.server.logins += 1
+
+    def sendmail(self, sender, receiver, text):
+        server = self.server
+        server.sending.set()
+        assert server.release.wait(5)
+        if server.disconnects:
+            server.disconnects -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        message = email.message_from_string(text)
+        server.sent.append((receiver, message["Subject"], message.get_payload()))
+
+    def close(self): self.closed = True
+    def quit(self): self.closed = True
+
+
+class FakeServer:
+    def __init__(self):
+        self.sent, self.connections, self.logins, self.disconnects = [], [], 0, 0
+        self.sending, self.release = threading.Event(), threading.Event()
+        self.release.set()
+
+    def factory(self, host, port, use_ssl, timeout):
+        conn = FakeSMTP(self)
+        self.connections.append(conn)
+        return conn
+
+
+def email_settings(receiver="penerima@example.com"):
+    return {"enable_email_notifications": True, "email_sender_address": "pengirim@example.com",
+            "email_sender_app_password": "secret", "email_receiver_address": receiver}
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+def make_dispatcher(server, **kwargs):
+    return NotificationDispatcher(smtp_factory=server.factory, **kwargs)
+
+
+def test_signals_within_batch_window_become_one_digest_per_receiver(server):
+    dispatcher = make_dispatcher(server, batch_window=0.3)
+    for i in range(3): dispatcher.submit_email(f"Sinyal {i}", f"isi {i}", email_settings())
+    dispatcher.submit_email("Sinyal lain", "isi lain", email_settings("lain@example.com"))
+    assert dispatcher.flush(5)
+    dispatcher.stop()
+    assert sorted(receiver for receiver, _, _ in server.sent) == ["lain@example.com", "penerima@example.com"]
+    digest = next(sent for sent in server.sent if sent[0] == "penerima@example.com")
+    assert digest[1] == "3 sinyal trading: Sinyal 0; Sinyal 1; Sinyal 2"
+    assert all(f"isi {i}" in digest[2] for i in range(3))
+    assert dispatcher.stats["emails_sent"] == 2 and dispatcher.stats["messages_sent"] == 4
+    assert len(server.connections) == 1 # Koneksi dipakai ulang untuk penerima lain dari pengirim yang sama
+
+def test_connection_is_reused_and_reconnected_once_after_disconnect(server):
+    dispatcher = make_dispatcher(server, batch_window=0)
+    dispatcher.submit_email("Pertama", "isi", email_settings()); assert dispatcher.flush(5)
+    server.disconnects = 1 # Server memutus koneksi lama: satu reconnect lalu terkirim
+    dispatcher.submit_email("Kedua", "isi", email_settings()); assert dispatcher.flush(5)
+    assert [subject for _, subject, _ in server.sent] == ["Pertama", "Kedua"]
+    assert dispatcher.stats["connects"] == 2 and server.connections[0].closed
+    assert dispatcher.stats["send_errors"] == 0
+
+    server.disconnects = 2 # Reconnect juga gagal: menyerah (tidak ada percobaan ketiga)
+    dispatcher.submit_email("Ketiga", "isi", email_settings()); assert dispatcher.flush(5)
+    dispatcher.stop()
+    assert dispatcher.stats["connects"] == 3 and dispatcher.stats["send_errors"] == 1 # Koneksi lama + satu reconnect
+    assert dispatcher.stats["emails_sent"] == 2 and len(server.sent) == 2
+
+@pytest.mark.parametrize("policy, expected", [(OVERFLOW_DROP_OLDEST, ["Sedang dikirim", "B", "C"]),
+                                              (OVERFLOW_DROP_NEWEST, ["Sedang dikirim", "A", "B"])])
+def test_overflow_policy_drops_and_counts(server, policy, expected):
+    dispatcher = make_dispatcher(server, max_queue=2, overflow_policy=policy, batch_window=0)
+    server.release.clear() # Worker tertahan di sendmail -> antrian terisi
+    dispatcher.submit_email("Sedang dikirim", "isi", email_settings())
+    assert server.sending.wait(5)
+    results = [dispatcher.submit_email(subject, "isi", email_settings()) for subject in ("A", "B", "C")]
+    assert results == [True, True, policy == OVERFLOW_DROP_OLDEST]
+    assert dispatcher.stats["dropped"] == 1
+    assert dispatcher.stats["queued"] == (4 if policy == OVERFLOW_DROP_OLDEST else 3)
+    server.release.set()
+    assert dispatcher.flush(5)
+    dispatcher.stop()
+    assert [subject for _, subject, _ in server.sent] == expected
+
+def test_flush_waits_for_batch_in_flight(server):
+    dispatcher = make_dispatcher(server, batch_window=0)
+    server.release.clear()
+    dispatcher.submit_email("Sinyal", "isi", email_settings())
+    assert server.sending.wait(5) and dispatcher.queue.qsize() == 0 # Antrian sudah kosong, email belum terkirim
+    assert not dispatcher.flush(0.2)
+    server.release.set()
+    assert dispatcher.flush(5)
+    assert [subject for _, subject, _ in server.sent] == ["Sinyal"]
+    dispatcher.stop()
+
+
+# --- SERVER SMTP LOKAL (socket sungguhan di localhost) ---
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Subset SMTP secukupnya untuk smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+    def reply(self, text):
+        self.wfile.write((text + "\r\n").encode()); self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        with server.lock: server.connections += 1
+        self.reply("220 localhost SMTP test")
+        data_lines, delivered = None, 0
+        for raw in self.rfile:
+            line = raw.decode().rstrip("\r\n")
+            if data_lines is not None:
+                if line != ".":
+                    data_lines.append(line[1:] if line.startswith("..") else line)
+                    continue
+                with server.lock: server.messages.append(email.message_from_string("\n".join(data_lines)))
+                data_lines, delivered = None, delivered + 1
+                self.reply("250 OK")
+                if server.drop_after is not None and delivered >= server.drop_after: return # Server memutus koneksi
+                continue
+            verb = line[:4].upper()
+            if verb == "EHLO": self.reply("250-localhost\r\n250 8BITMIME")
+            elif verb == "DATA": data_lines = []; self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif verb == "QUIT": self.reply("221 Bye"); return
+            else: self.reply("250 OK")
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages, self.connections, self.drop_after = [], 0, None
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def settings(self):
+        return dict(email_settings(), smtp_host="127.0.0.1", smtp_port=self.server_address[1], smtp_use_ssl=False)
+
+@pytest.fixture
+def smtp_server():
+    server = LocalSMTPServer()
+    yield server
+    server.shutdown(); server.server_close()
+
+
+def test_local_smtp_digest_and_connection_reuse(smtp_server):
+    dispatcher = NotificationDispatcher(batch_window=0.3)
+    for i in range(3): dispatcher.submit_email(f"Sinyal {i}", f"isi {i}", smtp_server.settings())
+    assert dispatcher.flush(10)
+    dispatcher.submit_email("Sinyal berikutnya", "isi", smtp_server.settings())
+    assert dispatcher.flush(10)
+    dispatcher.stop()
+    assert [m["Subject"] for m in smtp_server.messages] == ["3 sinyal trading: Sinyal 0; Sinyal 1; Sinyal 2", "Sinyal berikutnya"]
+    assert "isi 2" in smtp_server.messages[0].get_payload()
+    assert smtp_server.connections == 1 and dispatcher.stats["connects"] == 1
+
+def test_local_smtp_reconnects_after_server_closes_connection(smtp_server):
+    smtp_server.drop_after = 1 # Server menutup koneksi setiap selesai satu email
+    dispatcher = NotificationDispatcher(batch_window=0)
+    for subject in ("Pertama", "Kedua"):
+        dispatcher.submit_email(subject, "isi", smtp_server.settings())
+        assert dispatcher.flush(10)
+        time.sleep(0.05) # Beri server waktu menutup socket
+    dispatcher.stop()
+    assert [m["Subject"] for m in smtp_server.messages] == ["Pertama", "Kedua"]
+    assert smtp_server.connections == 2 and dispatcher.stats["send_errors"] == 0
@@ -0,0 +1,32 @@
+import os
+import shutil
+
+from conftest import random_ohlcv
+from backtest import run_backtest
+from optimizer import build_grid, export_best_to_settings, parse_range, run_sweep
+from strategy_runner import default_settings, load_settings
+
+EXAMPLE_SETTINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "settings.json")
+
+
+def test_sweep_with_volume_check_price_matches_backtest():
+    data = random_ohlcv(3, n_bars=300)
+    base = dict(default_settings(), left_strength=2, right_strength=2, profit_target_percent_activation=2.0,
+                trailing_stop_gap_percent=1.0, emergency_sl_percent=3.0)
+    combos = build_grid({"secure_fib_check_price": parse_range("secure_fib_check_price", "close,volume")}, base)
+    results = run_sweep(data, combos, workers=1, progress=False)
+    assert sorted(combo["secure_fib_check_price"] for combo, _ in results) == ["Close", "Volume"]
+    for combo, summary in results:
+        assert summary["trades"] == run_backtest(data, dict(base, **combo))[1]["trades"]
+
+
+def test_export_best_keeps_comments(tmp_path):
+    path = tmp_path / "settings.json"
+    shutil.copy(EXAMPLE_SETTINGS, path)
+    best = dict(left_strength=20, right_strength=40, profit_target_percent_activation=2.5, trailing_stop_gap_percent=1.0,
+                emergency_sl_percent=3.0, enable_secure_fib=False, secure_fib_check_price="Volume")
+    export_best_to_settings([(best, {})], str(path))
+    text = path.read_text()
+    assert "// Atau exchange lain yang didukung CryptoCompare" in text and "// settings.json (Contoh awal)" in text
+    settings = load_settings(str(path))
+    assert {key: settings[key] for key in best} == best and settings["exchange"] == "Coinbase"
@@ -0,0 +1,19 @@
+import pytest
+
+import feed_cache
+from benchmark import generate_ohlcv
+from replay import run_replay
+from strategy_runner import default_settings
+
+
+@pytest.mark.parametrize("forming, shared_cache", [("partial", False), ("final", False), ("partial", True)])
+def test_candle_close_schedule_matches_backtest(forming, shared_cache, monkeypatch):
+    """Poll ~2 detik setelah batas candle: bar yang baru close yang dievaluasi, bukan bar baru yang hampir kosong."""
+    settings = dict(default_settings(), left_strength=5, right_strength=5, profit_target_percent_activation=1.0,
+                    trailing_stop_gap_percent=0.5, emergency_sl_percent=2.0, poll_schedule="candle_close")
+    # Cache feed bersama yang sudah ada sebelum replay harus mengikuti clock virtual
+    monkeypatch.setattr(feed_cache, "_shared_cache", feed_cache.FeedCache() if shared_cache else None)
+    report = run_replay(generate_ohlcv(800, seed=0, timeframe_seconds=3600), settings, start_bar=200, forming=forming)
+    divergence = report["divergence"]
+    assert divergence["backtest_trades"] > 0
+    assert divergence["identical_trades"] == divergence["live_trades"] == divergence["backtest_trades"]
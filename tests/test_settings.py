@@ -0,0 +1,41 @@
+import json
+
+import strategy_runner
+from strategy_runner import load_settings, parse_commented_json, settings_menu, update_settings_file
+
+
+def write(tmp_path, text):
+    path = tmp_path / "settings.json"
+    path.write_text(text)
+    return str(path)
+
+
+def test_update_only_touches_top_level_keys(tmp_path):
+    path = write(tmp_path, '{\n    "instruments": [{"left_strength": 20, "symbol": "ETH"}], // per pair\n'
+                           '    "left_strength": 50\n}\n')
+    update_settings_file({"left_strength": 7}, path)
+    settings = parse_commented_json(open(path).read())
+    assert settings["left_strength"] == 7 and settings["instruments"] == [{"left_strength": 20, "symbol": "ETH"}]
+    assert "// per pair" in open(path).read()
+
+def test_new_keys_go_before_the_outer_closing_brace(tmp_path):
+    path = write(tmp_path, '{"a": 1, "nested": {"x": 1}}')
+    update_settings_file({"right_strength": 9, "nested": {"x": 2, "y": [1]}}, path)
+    assert json.loads(open(path).read()) == {"a": 1, "nested": {"x": 2, "y": [1]}, "right_strength": 9}
+    path = write(tmp_path, '{"a": 1, "nested": {"x": 1} /* akhir */\n}')
+    update_settings_file({"right_strength": 9}, path)
+    assert parse_commented_json(open(path).read()) == {"a": 1, "nested": {"x": 1}, "right_strength": 9}
+
+def test_settings_menu_writes_only_changed_keys(tmp_path, monkeypatch):
+    path = write(tmp_path, '// contoh\n{\n    "symbol": "BTC", // dasar\n    "left_strength": 50\n}\n')
+    monkeypatch.setattr(strategy_runner, "SETTINGS_FILE", path)
+    prompts = []
+    def fake_input(prompt):
+        prompts.append(prompt)
+        return "12" if prompt.startswith("Left Strength") else ""
+    monkeypatch.setattr("builtins.input", fake_input)
+    settings = settings_menu(load_settings(path))
+    assert settings["left_strength"] == 12 and len(prompts) > 10
+    text = open(path).read()
+    assert "// contoh" in text and "// dasar" in text
+    assert parse_commented_json(text) == {"symbol": "BTC", "left_strength": 12}
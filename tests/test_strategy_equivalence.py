@@ -0,0 +1,110 @@
+# Jalur cepat (PivotEngine streaming, backtest vektor, VectorStrategyEngine) harus mengambil keputusan yang sama
+# dengan jalur skalar. Seri acak dengan harga dibulatkan (banyak tie) dan left/right strength 0..6.
+import numpy as np
+import pytest
+
+import strategy_runner
+from analytics import TradeAnalytics
+from backtest import EXIT_OPEN, find_pivots_np, run_backtest
+from candle_store import arrays_to_frame
+from conftest import random_ohlcv
+from ring_buffer import CandleRingBuffer
+from strategy_runner import PivotEngine, StrategyContext, default_settings, find_pivots, run_strategy_on_buffer
+from vector_engine import VectorStrategyEngine
+
+STRENGTHS = [(left, right) for left in range(7) for right in range(7)]
+
+
+def engine_pivots(highs, lows, left_strength, right_strength):
+    engine = PivotEngine(left_strength, right_strength)
+    pivot_highs, pivot_lows = [None] * len(highs), [None] * len(lows)
+    for high, low in zip(highs, lows):
+        pivot_high, pivot_low = engine.on_bar(high, low)
+        if pivot_high is not None: pivot_highs[engine.event_index] = pivot_high
+        if pivot_low is not None: pivot_lows[engine.event_index] = pivot_low
+    return pivot_highs, pivot_lows
+
+
+@pytest.mark.parametrize("left_strength, right_strength", STRENGTHS)
+@pytest.mark.parametrize("seed", range(8))
+def test_pivot_paths_match_find_pivots(seed, left_strength, right_strength):
+    data = random_ohlcv(seed)
+    highs, lows = data["high"].tolist(), data["low"].tolist()
+    expected_highs = find_pivots(highs, left_strength, right_strength, True)
+    expected_lows = find_pivots(lows, left_strength, right_strength, False)
+    assert engine_pivots(highs, lows, left_strength, right_strength) == (expected_highs, expected_lows)
+    assert find_pivots_np(data["high"], left_strength, right_strength, True).tolist() == [p is not None for p in expected_highs]
+    assert find_pivots_np(data["low"], left_strength, right_strength, False).tolist() == [p is not None for p in expected_lows]
+
+
+def test_pivot_tie_rule_left_strict_right_non_strict():
+    highs = [1, 3, 3, 1, 1]
+    lows = [5, 2, 2, 5, 5]
+    # Bar 1: tie di kanan (boleh) -> pivot; bar 2: tie di kiri (tidak boleh) -> bukan pivot
+    assert find_pivots(highs, 1, 1, True) == [None, 3, None, None, None]
+    assert find_pivots(lows, 1, 1, False) == [None, 2, None, None, None]
+    assert engine_pivots(highs, lows, 1, 1) == ([None, 3, None, None, None], [None, 2, None, None, None])
+
+
+def test_run_strategy_logic_rebuilds_pivot_engine_for_unrelated_frames(monkeypatch):
+    """Engine global dipakai ulang antar panggilan: DataFrame lain (waktu sama, harga beda) tidak boleh dapat pivot basi."""
+    monkeypatch.setattr(strategy_runner, "strategy_state", strategy_runner.new_strategy_state())
+    monkeypatch.setattr(strategy_runner, "pivot_engine", None)
+    frames = [arrays_to_frame(random_ohlcv(seed, n_bars=150)) for seed in (1, 2)]
+    settings = dict(default_settings(), left_strength=3, right_strength=2)
+    for n_bars in range(8, 150, 3):
+        for df in frames:
+            strategy_runner.run_strategy_logic(df.iloc[:n_bars], settings)
+            fresh = PivotEngine(3, 2)
+            for high, low in zip(df["high"].iloc[:n_bars], df["low"].iloc[:n_bars]): fresh.on_bar(high, low)
+            assert strategy_runner.pivot_engine.last_result == fresh.last_result, n_bars
+
+
+# --- BACKTEST VEKTOR vs run_strategy_on_buffer ---
+def scalar_trades(data, settings):
+    """Jalankan jalur skalar bar per bar. Return (trade yang sudah close, posisi masih terbuka?)."""
+    n_bars = len(data["time"])
+    buffer, context = CandleRingBuffer(n_bars), StrategyContext()
+    context.analytics = TradeAnalytics(recent_trades=n_bars) # Mencatat entry/exit tiap trade
+    for i in range(n_bars):
+        bar_index = buffer.append(*(data[name][i] for name in ("time", "open", "high", "low", "close", "volume")))
+        run_strategy_on_buffer(buffer, bar_index, settings, context)
+    trades = [(t["entry_price"], t["exit_price"], t["reason"]) for t in context.analytics.recent]
+    return trades, context.state["position_size"] > 0
+
+
+@pytest.mark.parametrize("secure_fib_check_price", ("Close", "High", "Volume"))
+@pytest.mark.parametrize("left_strength, right_strength", ((0, 0), (1, 0), (0, 2), (2, 2), (3, 5), (6, 4)))
+@pytest.mark.parametrize("seed", range(12))
+def test_backtest_matches_scalar_strategy(seed, left_strength, right_strength, secure_fib_check_price):
+    data = random_ohlcv(seed, n_bars=300)
+    settings = dict(default_settings(), left_strength=left_strength, right_strength=right_strength,
+                    profit_target_percent_activation=2.0, trailing_stop_gap_percent=1.0,
+                    emergency_sl_percent=3.0, secure_fib_check_price=secure_fib_check_price)
+    trades, summary = run_backtest(data, settings)
+    expected = [(t["entry_price"], t["exit_price"], t["exit_reason"]) for t in trades if t["exit_reason"] != EXIT_OPEN]
+    assert scalar_trades(data, settings) == (expected, summary["open_position"])
+
+
+# --- VectorStrategyEngine vs run_strategy_on_buffer ---
+@pytest.mark.parametrize("left_strength, right_strength", ((0, 0), (1, 0), (0, 3), (2, 2), (5, 3)))
+@pytest.mark.parametrize("seed", range(6))
+def test_vector_engine_matches_scalar_state(seed, left_strength, right_strength):
+    rng = np.random.default_rng(seed)
+    n_instruments, n_bars = 6, 250
+    series = [random_ohlcv(seed * 100 + i, n_bars=n_bars) for i in range(n_instruments)]
+    columns = {name: np.stack([s[name] for s in series], axis=1) for name in ("open", "high", "low", "close", "volume")}
+    active = rng.random((n_bars, n_instruments)) > 0.2 # Instrumen tanpa bar baru ikut dilewati
+    settings_list = [dict(default_settings(), left_strength=left_strength, right_strength=right_strength,
+                          profit_target_percent_activation=(0.5, 2.0)[i % 2], trailing_stop_gap_percent=1.0,
+                          emergency_sl_percent=(1.0, 3.0, 30.0)[i % 3], enable_secure_fib=i % 4 != 3,
+                          secure_fib_check_price=("Close", "High", "Volume")[i % 3]) for i in range(n_instruments)]
+    engine = VectorStrategyEngine(settings_list)
+    buffers = [CandleRingBuffer(left_strength + right_strength + 10) for _ in range(n_instruments)]
+    contexts = [StrategyContext() for _ in range(n_instruments)]
+    for t in range(n_bars):
+        engine.step(*(columns[name][t] for name in ("open", "high", "low", "close", "volume")), active=active[t])
+        for i in np.flatnonzero(active[t]):
+            bar_index = buffers[i].append(series[i]["time"][t], *(columns[name][t, i] for name in ("open", "high", "low", "close", "volume")))
+            run_strategy_on_buffer(buffers[i], bar_index, settings_list[i], contexts[i])
+            assert engine.state_dict(i) == contexts[i].state, (t, i)
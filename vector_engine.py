@@ -0,0 +1,207 @@
+# --- ENGINE VEKTOR MULTI-INSTRUMEN ---
+# Struct-of-arrays: tiap field strategy_state (lihat new_strategy_state di strategy_runner.py) disimpan sebagai
+# array NumPy berindeks instrumen, dan step() memajukan semua instrumen satu bar sekaligus: konfirmasi pivot,
+# FIB 0.5 (+ Secure FIB), entry, aktivasi trailing, dan exit stop. Keputusan identik dengan _apply_strategy_bar
+# yang dipanggil bar per bar (urutan operasi float sama; dicek di tests/test_strategy_equivalence.py), tanpa log /
+# notifikasi. Pivot butuh jendela left + right + 1 bar yang sama, jadi satu engine = satu pasang
+# (left_strength, right_strength); parameter lain (trailing, SL, Secure FIB) boleh berbeda per instrumen.
+# Saat ini hanya dipakai stage vector_step di benchmark.py; runner live (MultiPairRunner) tetap memakai jalur skalar.
+import numpy as np
+
+from backtest import EXIT_EMERGENCY_SL, EXIT_TRAILING_STOP, OHLCV_COLUMNS, _secure_fib_column
+
+NO_INDEX = -1 # Pengganti None untuk field index bar
+PROBE_BARS = 4 # Tetangga kiri/kanan yang dicek sebelum memindai jendela pivot penuh
+
+
+class VectorStrategyEngine:
+    def __init__(self, settings_list):
+        if not settings_list: raise ValueError("settings_list kosong")
+        strengths = {(s['left_strength'], s['right_strength']) for s in settings_list}
+        if len(strengths) > 1:
+            raise ValueError(f"Satu engine hanya untuk satu pasang (left_strength, right_strength), dapat: {sorted(strengths)}")
+        self.left_strength, self.right_strength = strengths.pop()
+        self.size = n = len(settings_list)
+        self.window = self.left_strength + self.right_strength + 1
+        self.profit_target_percent_activation = np.array([s["profit_target_percent_activation"] for s in settings_list], dtype=np.float64)
+        self.trailing_stop_gap_percent = np.array([s["trailing_stop_gap_percent"] for s in settings_list], dtype=np.float64)
+        self.emergency_sl_percent = np.array([s["emergency_sl_percent"] for s in settings_list], dtype=np.float64)
+        self.enable_secure_fib = np.array([bool(s["enable_secure_fib"]) for s in settings_list])
+        self.secure_fib_column = np.array([OHLCV_COLUMNS.index(_secure_fib_column(s)) for s in settings_list])
+
+        # Jendela pivot (ring per instrumen): baris bar_count % window
+        self.bar_count = np.zeros(n, dtype=np.int64)
+        self._highs = np.zeros((self.window, n)); self._lows = np.zeros((self.window, n))
+
+        self.last_signal_type = np.zeros(n, dtype=np.int8)
+        self.final_pivot_high_price_confirmed = np.full(n, np.nan)
+        self.final_pivot_low_price_confirmed = np.full(n, np.nan)
+        self.high_price_for_fib = np.full(n, np.nan)
+        self.high_bar_index_for_fib = np.full(n, NO_INDEX, dtype=np.int64)
+        self.active_fib_level = np.full(n, np.nan)
+        self.active_fib_line_start_index = np.full(n, NO_INDEX, dtype=np.int64)
+        self.entry_price_custom = np.full(n, np.nan)
+        self.highest_price_for_trailing = np.full(n, np.nan)
+        self.trailing_tp_active_custom = np.zeros(n, dtype=bool)
+        self.current_trailing_stop_level = np.full(n, np.nan)
+        self.emergency_sl_level_custom = np.full(n, np.nan)
+        self.position_size = np.zeros(n, dtype=np.int8)
+
+    def _window_rows(self, columns, ages):
+        return (self.bar_count[columns] - 1 - ages) % self.window # (len(ages), k)
+
+    def _pivot_masks(self, highs, lows, right_rows, left_rows):
+        """Aturan tie sama dengan find_pivots: kiri strict, kanan non-strict. highs/lows[0] = bar event."""
+        is_high = np.ones(highs.shape[1], dtype=bool); is_low = np.ones(highs.shape[1], dtype=bool)
+        if right_rows.stop > right_rows.start:
+            is_high &= highs[0] >= highs[right_rows].max(axis=0)
+            is_low &= lows[0] <= lows[right_rows].min(axis=0)
+        if left_rows.stop > left_rows.start:
+            is_high &= highs[0] > highs[left_rows].max(axis=0)
+            is_low &= lows[0] < lows[left_rows].min(axis=0)
+        return is_high, is_low
+
+    def _confirm_pivots(self, columns):
+        """Pivot (high, low) di bar event = bar_count - 1 - right_strength untuk instrumen `columns`.
+        Return (mask high, mask low, harga high, harga low)."""
+        left, right = self.left_strength, self.right_strength
+        # Saring dulu dengan PROBE_BARS tetangga terdekat (syarat perlu), jendela penuh hanya untuk sisanya
+        probe_right, probe_left = min(right, PROBE_BARS), min(left, PROBE_BARS)
+        ages = np.r_[right, right - probe_right:right, right + 1:right + 1 + probe_left][:, None]
+        rows = self._window_rows(columns, ages)
+        highs, lows = self._highs[rows, columns], self._lows[rows, columns]
+        is_high, is_low = self._pivot_masks(highs, lows, slice(1, 1 + probe_right), slice(1 + probe_right, len(ages)))
+        event_high, event_low = highs[0], lows[0]
+        if probe_right < right or probe_left < left:
+            survivors = np.flatnonzero(is_high | is_low)
+            if len(survivors):
+                ages = np.r_[right, 0:right, right + 1:self.window][:, None]
+                rows = self._window_rows(columns[survivors], ages)
+                full_high, full_low = self._pivot_masks(self._highs[rows, columns[survivors]], self._lows[rows, columns[survivors]],
+                                                        slice(1, 1 + right), slice(1 + right, self.window))
+                is_high[survivors] &= full_high; is_low[survivors] &= full_low
+        return is_high, is_low, event_high, event_low
+
+    def step(self, open_, high, low, close, volume=None, active=None):
+        """Majukan instrumen `active` (mask bool, default semua) satu bar. Argumen = array harga per instrumen
+        (nilai instrumen yang tidak aktif diabaikan). Return dict mask event + harga exit / PnL per instrumen."""
+        n = self.size
+        open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+        volume = np.full(n, np.nan) if volume is None else np.asarray(volume, dtype=np.float64)
+        active = np.ones(n, dtype=bool) if active is None else np.asarray(active, dtype=bool)
+        columns = np.flatnonzero(active)
+        self._highs[self.bar_count[columns] % self.window, columns] = high[columns]
+        self._lows[self.bar_count[columns] % self.window, columns] = low[columns]
+        self.bar_count[columns] += 1
+        bar_index = self.bar_count - 1
+        event_index = bar_index - self.right_strength
+
+        # Pivot terkonfirmasi (hanya instrumen yang sudah punya satu jendela penuh)
+        pivot_high = np.zeros(n, dtype=bool); pivot_low = np.zeros(n, dtype=bool)
+        pivot_high_price = np.full(n, np.nan); pivot_low_price = np.full(n, np.nan)
+        ready = columns[self.bar_count[columns] >= self.window]
+        if len(ready):
+            pivot_high[ready], pivot_low[ready], pivot_high_price[ready], pivot_low_price[ready] = self._confirm_pivots(ready)
+        self.final_pivot_high_price_confirmed[columns] = np.nan
+        self.final_pivot_low_price_confirmed[columns] = np.nan
+        new_high = pivot_high & (self.last_signal_type != 1)
+        self.final_pivot_high_price_confirmed[new_high] = pivot_high_price[new_high]
+        self.last_signal_type[new_high] = 1
+        new_low = pivot_low & (self.last_signal_type != -1)
+        self.final_pivot_low_price_confirmed[new_low] = pivot_low_price[new_low]
+        self.last_signal_type[new_low] = -1
+
+        # FIB: high baru mereset FIB aktif, low baru sesudah high membentuk FIB 0.5
+        self.high_price_for_fib[new_high] = pivot_high_price[new_high]
+        self.high_bar_index_for_fib[new_high] = event_index[new_high]
+        self.active_fib_level[new_high] = np.nan; self.active_fib_line_start_index[new_high] = NO_INDEX
+        fib_event = new_low & (self.high_bar_index_for_fib != NO_INDEX) & (event_index > self.high_bar_index_for_fib)
+        fib_level = (self.high_price_for_fib + pivot_low_price) / 2.0
+        prices = np.stack((open_, high, low, close, volume))
+        check_price = prices[self.secure_fib_column, np.arange(n)]
+        fib_late = fib_event & self.enable_secure_fib & (check_price > fib_level)
+        fib_active = fib_event & ~fib_late
+        self.active_fib_level[fib_late] = np.nan; self.active_fib_line_start_index[fib_late] = NO_INDEX
+        self.active_fib_level[fib_active] = fib_level[fib_active]
+        self.active_fib_line_start_index[fib_active] = event_index[fib_active]
+        self.high_price_for_fib[fib_event] = np.nan; self.high_bar_index_for_fib[fib_event] = NO_INDEX
+
+        # Entry: candle bullish close di atas FIB aktif (FIB terpakai walau sudah ada posisi)
+        fib_crossed = active & (self.active_fib_line_start_index != NO_INDEX) & (close > open_) & (close > self.active_fib_level)
+        entry = fib_crossed & (self.position_size == 0)
+        entry_fib_level = np.where(entry, self.active_fib_level, np.nan)
+        self.position_size[entry] = 1
+        self.entry_price_custom[entry] = close[entry]
+        self.highest_price_for_trailing[entry] = close[entry]
+        self.trailing_tp_active_custom[entry] = False
+        self.current_trailing_stop_level[entry] = np.nan
+        self.emergency_sl_level_custom[entry] = close[entry] * (1 - self.emergency_sl_percent[entry] / 100.0)
+        self.active_fib_level[fib_crossed] = np.nan; self.active_fib_line_start_index[fib_crossed] = NO_INDEX
+
+        # Manajemen posisi: highest, aktivasi trailing, update trailing stop, exit
+        in_position = active & (self.position_size > 0)
+        entry_price = self.entry_price_custom
+        highest = np.where(in_position, np.maximum(self.highest_price_for_trailing, high), self.highest_price_for_trailing)
+        self.highest_price_for_trailing = highest
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_percent = np.where(entry_price != 0, ((highest - entry_price) / entry_price) * 100.0, 0.0)
+        trailing_activated = in_position & ~self.trailing_tp_active_custom & ~np.isnan(entry_price) & \
+                             (profit_percent >= self.profit_target_percent_activation)
+        self.trailing_tp_active_custom |= trailing_activated
+        new_stop = highest * (1 - (self.trailing_stop_gap_percent / 100.0))
+        raise_stop = in_position & self.trailing_tp_active_custom & ~np.isnan(highest) & \
+                     (np.isnan(self.current_trailing_stop_level) | (new_stop > self.current_trailing_stop_level))
+        self.current_trailing_stop_level[raise_stop] = new_stop[raise_stop]
+
+        stop_level, by_trailing = self.active_stop()
+        exit_ = in_position & ~np.isnan(stop_level) & (low <= stop_level)
+        exit_price = np.where(exit_, np.minimum(open_, stop_level), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl = np.where(exit_ & ~np.isnan(entry_price) & (entry_price != 0),
+                           (exit_price - entry_price) / entry_price * 100.0, np.where(exit_, 0.0, np.nan))
+        self.position_size[exit_] = 0; self.entry_price_custom[exit_] = np.nan
+        self.highest_price_for_trailing[exit_] = np.nan; self.trailing_tp_active_custom[exit_] = False
+        self.current_trailing_stop_level[exit_] = np.nan; self.emergency_sl_level_custom[exit_] = np.nan
+
+        return {"pivot_high": new_high, "pivot_low": new_low, "fib_active": fib_active, "fib_late": fib_late,
+                "fib_level": np.where(fib_event, fib_level, np.nan), "entry": entry, "entry_fib_level": entry_fib_level,
+                "trailing_activated": trailing_activated, "exit": exit_, "exit_by_trailing": exit_ & by_trailing,
+                "exit_price": exit_price, "pnl_percent": pnl}
+
+    def active_stop(self):
+        """Versi vektor _active_stop: (level stop per instrumen, mask 'trailing stop yang dipakai')."""
+        trailing = self.current_trailing_stop_level
+        emergency = self.emergency_sl_level_custom
+        by_trailing = self.trailing_tp_active_custom & ~np.isnan(trailing) & (np.isnan(emergency) | (trailing > emergency))
+        return np.where(by_trailing, trailing, emergency), by_trailing
+
+    def run(self, open_, high, low, close, volume=None):
+        """Replay histori berbentuk (bar, instrumen), mis. untuk warmup. Return jumlah entry dan exit per instrumen."""
+        entries = np.zeros(self.size, dtype=np.int64); exits = np.zeros(self.size, dtype=np.int64)
+        for t in range(len(close)):
+            events = self.step(open_[t], high[t], low[t], close[t], None if volume is None else volume[t])
+            entries += events["entry"]; exits += events["exit"]
+        return entries, exits
+
+    def state_dict(self, i):
+        """State instrumen ke-i dalam format new_strategy_state() (NaN / NO_INDEX -> None)."""
+        def value(array):
+            item = array[i].item()
+            return None if item is None or item != item or (array.dtype == np.int64 and item == NO_INDEX) else item
+        return {
+            "last_signal_type": int(self.last_signal_type[i]),
+            "final_pivot_high_price_confirmed": value(self.final_pivot_high_price_confirmed),
+            "final_pivot_low_price_confirmed": value(self.final_pivot_low_price_confirmed),
+            "high_price_for_fib": value(self.high_price_for_fib), "high_bar_index_for_fib": value(self.high_bar_index_for_fib),
+            "active_fib_level": value(self.active_fib_level), "active_fib_line_start_index": value(self.active_fib_line_start_index),
+            "entry_price_custom": value(self.entry_price_custom), "highest_price_for_trailing": value(self.highest_price_for_trailing),
+            "trailing_tp_active_custom": bool(self.trailing_tp_active_custom[i]),
+            "current_trailing_stop_level": value(self.current_trailing_stop_level),
+            "emergency_sl_level_custom": value(self.emergency_sl_level_custom), "position_size": int(self.position_size[i]),
+        }
+
+
+def exit_reason(events, i):
+    """Alasan exit instrumen ke-i dari hasil step() (nama sama dengan backtest / log live), atau None."""
+    if not events["exit"][i]: return None
+    return EXIT_TRAILING_STOP if events["exit_by_trailing"][i] else EXIT_EMERGENCY_SL